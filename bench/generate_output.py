@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""
+    Generator of synthetic Robot Framework output XML files, to benchmark the import to XRAY.
+
+    The size of the run (tests, suite nesting, steps per test), the ratio of failed tests, the density of log and
+    screenshot keywords and the layout of the tags can be configured. Screenshots are written to a directory next to
+    the output file, drawn from a pool of files so that repeated evidences can be measured as well.
+
+    Example:
+
+        python generate_output.py output.xml --tests 5000 --depth 3 --steps 10 --failure-ratio 0.2
+
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape, quoteattr
+
+DATE_FORMAT = '%Y%m%d %H:%M:%S.%f'
+START_DATE = datetime(2018, 1, 1, 10, 0, 0)
+SCREENSHOTS_DIR = 'screenshots'
+LOG_KEYWORD = 'Log'
+SCREENSHOT_KEYWORD = 'Capture Page Screenshot'
+LOG_LEVELS = ['INFO', 'WARN', 'ERROR']
+
+
+class _Clock:
+    """
+    Class that gives increasing Robot Framework timestamps
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.now = START_DATE
+
+    def tick(self, max_ms=500):
+        self.now += timedelta(milliseconds=self.rng.randint(1, max_ms))
+        # Robot Framework writes milliseconds
+        return self.now.strftime(DATE_FORMAT)[:-3]
+
+
+class OutputGenerator:
+    """
+    Class that writes a synthetic Robot Framework output XML file
+
+    Args:
+        tests (int): Number of test cases
+        depth (int): Number of suite levels below the top suite
+        suites (int): Number of child suites of each suite
+        steps (int): Number of steps (top level keywords) per test case
+        failure_ratio (float): Ratio of failed test cases
+        log_density (float): Probability of a step having a Log keyword
+        screenshot_density (float): Probability of a step having a screenshot keyword
+        tags (int): Number of tags per test case, besides the JIRA tags
+        tag_pool (int): Number of different tags
+        test_execs (int): Number of JIRA_TESTEXEC keys the tests are spread over. 0 for new test executions only
+        screenshots (int): Number of different screenshot files
+        screenshot_size (int): Size in bytes of each screenshot file
+        project (str): Jira project of the test keys
+        seed (int): Seed of the random generator, so that the same file is generated again
+    """
+
+    def __init__(self, tests=1000, depth=2, suites=3, steps=8, failure_ratio=0.1, log_density=0.3,
+                 screenshot_density=0.2, tags=2, tag_pool=10, test_execs=0, screenshots=20, screenshot_size=50 * 1024,
+                 project='BENCH', seed=0):
+        self.tests = tests
+        self.depth = depth
+        self.suites = suites
+        self.steps = steps
+        self.failure_ratio = failure_ratio
+        self.log_density = log_density
+        self.screenshot_density = screenshot_density
+        self.tags = tags
+        self.tag_pool = tag_pool
+        self.test_execs = test_execs
+        self.screenshots = screenshots
+        self.screenshot_size = screenshot_size
+        self.project = project
+        self.rng = random.Random(seed)
+        self.clock = _Clock(self.rng)
+        self.test_count = 0
+
+    def write(self, path):
+        """
+        Write the output XML file and its screenshots
+
+        :param path: Path to the output XML file
+        :return:
+            Number of test cases written
+        """
+        if self.screenshots and self.screenshot_density:
+            self._write_screenshots(os.path.join(os.path.dirname(os.path.abspath(path)), SCREENSHOTS_DIR))
+
+        leaves = self.suites ** self.depth
+        # tests per leaf suite, the first leaves take the remainder
+        self._tests_per_leaf = [self.tests // leaves + (1 if index < self.tests % leaves else 0)
+                                for index in range(leaves)]
+        self._leaf = 0
+
+        with open(path, 'w', encoding='utf-8') as output:
+            output.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            output.write('<robot generator="Benchmark" generated={}>\n'.format(quoteattr(self.clock.tick())))
+            self._write_suite(output, 'Bench', 's1', self.depth)
+            output.write('<statistics></statistics>\n<errors></errors>\n</robot>\n')
+        return self.test_count
+
+    def _write_screenshots(self, directory):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        for index in range(self.screenshots):
+            with open(os.path.join(directory, 'shot{}.png'.format(index)), 'wb') as screenshot:
+                screenshot.write(os.urandom(self.screenshot_size))
+
+    def _write_suite(self, output, name, suite_id, depth):
+        start = self.clock.tick()
+        output.write('<suite id={} name={}>\n'.format(quoteattr(suite_id), quoteattr(name)))
+        if depth:
+            for index in range(self.suites):
+                self._write_suite(output, '{} {}'.format(name, index + 1), '{}-s{}'.format(suite_id, index + 1),
+                                  depth - 1)
+        else:
+            for index in range(self._tests_per_leaf[self._leaf]):
+                self._write_test(output, '{}-t{}'.format(suite_id, index + 1))
+            self._leaf += 1
+        output.write('<status status="PASS" starttime="{}" endtime="{}"></status>\n'.format(start, self.clock.tick()))
+        output.write('</suite>\n')
+
+    def _write_keyword(self, output, name, status, kw_type=None, args=(), messages=(), children=()):
+        start = self.clock.tick()
+        output.write('<kw name={}{}>'.format(quoteattr(name), ' type="{}"'.format(kw_type) if kw_type else ''))
+        if args:
+            output.write('<arguments>{}</arguments>'.format(''.join('<arg>{}</arg>'.format(escape(arg))
+                                                                    for arg in args)))
+        for level, text in messages:
+            output.write('<msg timestamp="{}" level="{}">{}</msg>'.format(self.clock.tick(10), level, escape(text)))
+        for child in children:
+            child()
+        output.write('<status status="{}" starttime="{}" endtime="{}"></status></kw>\n'.format(status, start,
+                                                                                            self.clock.tick()))
+
+    def _screenshot(self, output):
+        shot = '{}/shot{}.png'.format(SCREENSHOTS_DIR, self.rng.randrange(self.screenshots))
+        return lambda: self._write_keyword(output, SCREENSHOT_KEYWORD, 'PASS',
+                                           messages=[('INFO', '<img src="{}" width="800px">'.format(shot))])
+
+    def _log(self, output):
+        level = self.rng.choice(LOG_LEVELS)
+        return lambda: self._write_keyword(output, LOG_KEYWORD, 'PASS', args=['Message {}'.format(self.test_count),
+                                                                              level])
+
+    def _write_test(self, output, test_id):
+        self.test_count += 1
+        start = self.clock.tick()
+        failed_step = self.rng.randrange(self.steps) if self.steps and self.rng.random() < self.failure_ratio \
+            else None
+        output.write('<test id={} name={}>\n'.format(quoteattr(test_id),
+                                                      quoteattr('Test {}'.format(self.test_count))))
+        self._write_keyword(output, 'Open Application', 'PASS', kw_type='setup')
+
+        for step in range(self.steps):
+            children = []
+            if self.rng.random() < self.log_density:
+                children.append(self._log(output))
+            if self.screenshots and self.rng.random() < self.screenshot_density:
+                children.append(self._screenshot(output))
+            status = 'FAIL' if step == failed_step else 'PASS'
+            messages = [('FAIL', 'Step {} failed'.format(step + 1))] if status == 'FAIL' else []
+            self._write_keyword(output, 'Step {}'.format(step + 1), status, args=['value {}'.format(step)],
+                                messages=messages, children=children)
+            if status == 'FAIL':
+                # the keywords after a failure are not run, only the teardown
+                break
+
+        teardown = [self._screenshot(output)] if failed_step is not None and self.screenshots else []
+        self._write_keyword(output, 'Close Application', 'PASS', kw_type='teardown', children=teardown)
+
+        output.write('<tags>')
+        tags = ['JIRA_TEST:{}-{}'.format(self.project, self.test_count)]
+        if self.test_execs:
+            tags.append('JIRA_TESTEXEC:{}-E{}'.format(self.project, self.test_count % self.test_execs + 1))
+        tags += ['tag{}'.format(tag) for tag in self.rng.sample(range(self.tag_pool), min(self.tags, self.tag_pool))]
+        output.write(''.join('<tag>{}</tag>'.format(escape(tag)) for tag in tags))
+        output.write('</tags>\n')
+
+        status = 'FAIL' if failed_step is not None else 'PASS'
+        message = 'Step {} failed'.format(failed_step + 1) if failed_step is not None else ''
+        output.write('<status status="{}" starttime="{}" endtime="{}">{}</status>\n</test>\n'.format(
+            status, start, self.clock.tick(), escape(message)))
+
+
+def add_generator_arguments(parser):
+    """
+    Add the options of the generator to an argument parser
+
+    :param parser: Argument parser
+    """
+    parser.add_argument('--tests', type=int, default=1000, help='Number of test cases')
+    parser.add_argument('--depth', type=int, default=2, help='Number of suite levels below the top suite')
+    parser.add_argument('--suites', type=int, default=3, help='Number of child suites of each suite')
+    parser.add_argument('--steps', type=int, default=8, help='Number of steps per test case')
+    parser.add_argument('--failure-ratio', type=float, default=0.1, help='Ratio of failed test cases')
+    parser.add_argument('--log-density', type=float, default=0.3, help='Probability of a step having a Log keyword')
+    parser.add_argument('--screenshot-density', type=float, default=0.2,
+                        help='Probability of a step having a screenshot keyword')
+    parser.add_argument('--tags', type=int, default=2, help='Number of tags per test case, besides the JIRA tags')
+    parser.add_argument('--tag-pool', type=int, default=10, help='Number of different tags')
+    parser.add_argument('--test-execs', type=int, default=0,
+                        help='Number of JIRA_TESTEXEC keys the tests are spread over. 0 for new test executions')
+    parser.add_argument('--screenshots', type=int, default=20, help='Number of different screenshot files')
+    parser.add_argument('--screenshot-size', type=int, default=50 * 1024, help='Size in bytes of each screenshot')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator')
+
+
+def generator_from_arguments(args):
+    """
+    Create a generator from parsed arguments
+
+    :param args: Parsed arguments, with the options of add_generator_arguments
+    :return:
+        OutputGenerator
+    """
+    return OutputGenerator(tests=args.tests, depth=args.depth, suites=args.suites, steps=args.steps,
+                           failure_ratio=args.failure_ratio, log_density=args.log_density,
+                           screenshot_density=args.screenshot_density, tags=args.tags, tag_pool=args.tag_pool,
+                           test_execs=args.test_execs, screenshots=args.screenshots,
+                           screenshot_size=args.screenshot_size, seed=args.seed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic Robot Framework output XML file')
+    parser.add_argument('output', help='Path to the output XML file')
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    count = generator_from_arguments(args).write(args.output)
+    print('{} tests written to {} ({:.1f} MB)'.format(count, args.output, os.path.getsize(args.output) / 1e6))
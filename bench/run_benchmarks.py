@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+"""
+    Benchmarks of the import of Robot Framework output files to XRAY.
+
+    Each phase runs in a process of its own, so that its peak memory is measured apart:
+        parse: no_filtering_import of the output file
+        filter: filtering_import of the output file, by a tag
+        todict: todict serialization of the test executions (and json.dumps)
+        stream: streamed JSON serialization of the test executions, as sent to XRAY
+        upload: upload of the test executions to a stub XRAY server
+
+    The output file is generated with generate_output.py options, unless one is given. Results can be saved as a
+    baseline, and later runs compared with it, failing if a phase is slower than the baseline beyond a tolerance.
+
+    Examples:
+
+        python run_benchmarks.py --tests 5000 --save-baseline baseline.json
+        python run_benchmarks.py --tests 5000 --baseline baseline.json --tolerance 0.1
+
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from generate_output import add_generator_arguments, generator_from_arguments
+from stub_xray import StubXray
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+PHASES = ['parse', 'filter', 'todict', 'stream', 'upload']
+SUMMARY = 'Benchmark {}'
+SUMMARY_FILTERS = 'Benchmark {} with filters: {}'
+EVIDENCES_ALL = 'All'
+MB = 1024 * 1024
+# Arguments that do not change the results compared with a baseline
+IGNORED_PARAMETERS = ('baseline', 'save_baseline', 'phase', 'phases', 'tolerance', 'repeat', 'file')
+
+
+def _peak_rss():
+    """
+    Get the peak resident set size of this process
+
+    :return:
+        Size in bytes, None if it can not be measured
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _count_tests(test_execs):
+    return sum(len(test_exec.tests) for test_exec in test_execs.values())
+
+
+def _parse(rfw2xray, args):
+    return rfw2xray.no_filtering_import(args.file, True, EVIDENCES_ALL, workers=args.workers, summary=SUMMARY)
+
+
+def run_phase(phase, args):
+    """
+    Run a benchmark phase in this process
+
+    :param phase: Name of the phase
+    :param args: Parsed arguments
+    :return:
+        Dict with the seconds taken, the tests and bytes processed and the peak RSS
+    """
+    sys.path.insert(0, SRC_DIR)
+    import rfw2xray_export as rfw2xray
+
+    input_bytes = os.path.getsize(args.file)
+    stub = None
+
+    if phase == 'parse':
+        start = time.time()
+        test_execs = _parse(rfw2xray, args)
+        elapsed = time.time() - start
+        processed_bytes = input_bytes
+
+    elif phase == 'filter':
+        start = time.time()
+        test_execs = rfw2xray.filtering_import(args.file, True, EVIDENCES_ALL, {'tag': [args.filter_tag]}, 'AND',
+                                               workers=args.workers, summary=SUMMARY_FILTERS)
+        elapsed = time.time() - start
+        processed_bytes = input_bytes
+
+    elif phase == 'todict':
+        test_execs = _parse(rfw2xray, args)
+        start = time.time()
+        processed_bytes = len(json.dumps(rfw2xray.todict(test_execs)).encode('utf-8'))
+        elapsed = time.time() - start
+
+    elif phase == 'stream':
+        test_execs = _parse(rfw2xray, args)
+        start = time.time()
+        processed_bytes = sum(len(chunk) for test_exec in test_execs.values()
+                              for chunk in rfw2xray.stream_json(test_exec))
+        elapsed = time.time() - start
+
+    elif phase == 'upload':
+        test_execs = _parse(rfw2xray, args)
+        stub = StubXray(latency=args.latency).start()
+        rfw2xray.jira_address = stub.url
+        rfw2xray.endpoint = rfw2xray.constants.ENDPOINT_DEFAULT
+        rfw2xray.username = rfw2xray.password = 'bench'
+        rfw2xray.session = rfw2xray.create_session(args.concurrency)
+        start = time.time()
+        rfw2xray.upload(test_execs, False, concurrency=args.concurrency, chunk_tests=args.chunk_tests)
+        elapsed = time.time() - start
+        processed_bytes = stub.bytes_received
+        stub.stop()
+
+    else:
+        raise ValueError('Unknown phase ' + phase)
+
+    result = {'seconds': elapsed, 'tests': _count_tests(test_execs), 'bytes': processed_bytes,
+              'peak_rss': _peak_rss()}
+    if stub is not None:
+        result['requests'] = stub.requests
+    return result
+
+
+def _run_phase_process(phase, args):
+    """
+    Run a benchmark phase in a new process, keeping the best time of args.repeat runs
+
+    :return:
+        Dict with the results of the phase
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--phase', phase, '--file', args.file,
+               '--workers', str(args.workers), '--concurrency', str(args.concurrency),
+               '--chunk-tests', str(args.chunk_tests), '--latency', str(args.latency),
+               '--filter-tag', args.filter_tag]
+    best = None
+    for _ in range(args.repeat):
+        output = subprocess.check_output(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+        # the import prints its progress, the result is the last line
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def _report(results, baseline=None, tolerance=0.0):
+    """
+    Print the results of the phases, compared with the baseline if any
+
+    :return:
+        List of the phases slower than the baseline beyond the tolerance
+    """
+    regressions = []
+    print('{:<8} {:>9} {:>7} {:>11} {:>9} {:>13}{}'.format('phase', 'seconds', 'tests', 'tests/s', 'MB/s',
+                                                            'peak RSS MB', '  vs baseline' if baseline else ''))
+    for phase, result in results.items():
+        seconds = max(result['seconds'], 1e-9)
+        peak_rss = '{:.1f}'.format(result['peak_rss'] / MB) if result['peak_rss'] else 'n/a'
+        line = '{:<8} {:>9.3f} {:>7} {:>11.1f} {:>9.2f} {:>13}'.format(
+            phase, result['seconds'], result['tests'], result['tests'] / seconds, result['bytes'] / MB / seconds,
+            peak_rss)
+        if baseline and phase in baseline:
+            ratio = result['seconds'] / max(baseline[phase]['seconds'], 1e-9)
+            line += '  {:.2f}x time'.format(ratio)
+            if ratio > 1 + tolerance:
+                regressions.append(phase)
+                line += ' REGRESSION'
+        print(line)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the import of Robot Framework output files to XRAY')
+    parser.add_argument('--file', help='Robot Framework output XML file. Generated with the options below if not given')
+    parser.add_argument('--phases', default=','.join(PHASES), help='Comma separated phases to run')
+    parser.add_argument('--workers', type=int, default=0, help='Number of processes parsing test cases')
+    parser.add_argument('--concurrency', type=int, default=4, help='Number of requests sent at the same time')
+    parser.add_argument('--chunk-tests', type=int, default=0, help='Maximum number of tests per import request')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the stub XRAY waits for each request')
+    parser.add_argument('--filter-tag', default='tag0', help='Tag selected by the filter phase')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs of each phase, the best time is kept')
+    parser.add_argument('--baseline', help='JSON file with the baseline results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Ratio a phase can be slower than the baseline without failing')
+    parser.add_argument('--save-baseline', help='JSON file where the results are saved as a baseline')
+    parser.add_argument('--phase', help=argparse.SUPPRESS)
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    if args.phase:
+        print(json.dumps(run_phase(args.phase, args)))
+        sys.exit(0)
+
+    workdir = None
+    if not args.file:
+        workdir = tempfile.mkdtemp(prefix='rfw2xray_bench_')
+        args.file = os.path.join(workdir, 'output.xml')
+        count = generator_from_arguments(args).write(args.file)
+        print('Generated {} tests ({:.1f} MB) in {}'.format(count, os.path.getsize(args.file) / 1e6, args.file))
+
+    results = {}
+    try:
+        for phase in args.phases.split(','):
+            results[phase] = _run_phase_process(phase, args)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir)
+
+    parameters = dict((key, value) for key, value in vars(args).items() if key not in IGNORED_PARAMETERS)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            saved = json.load(baseline_file)
+        baseline = saved['results']
+        changed = sorted(key for key in parameters if saved['parameters'].get(key) != parameters[key])
+        if changed:
+            print('Warning: the baseline was run with different ' + ', '.join(changed))
+    regressions = _report(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({'parameters': parameters, 'results': results}, baseline_file, indent=2, sort_keys=True)
+
+    if regressions:
+        print('Slower than the baseline: ' + ', '.join(regressions))
+        sys.exit(1)
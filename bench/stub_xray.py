@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+    Stub of the JIRA-XRAY API, to benchmark the uploads without a JIRA server.
+
+    Every request is read entirely (chunked or not) and answered as XRAY would, with new issue keys.
+    The stub keeps count of the requests and bytes received, and can add latency to each response.
+
+    Example:
+
+        python stub_xray.py --port 8765 --latency 0.05
+
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+IMPORT_PATH = 'import/execution'
+ATTACHMENTS_PATH = '/attachments'
+PROJECT = 'BENCH'
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubXray:
+    """
+    Class that runs the stub XRAY server in a background thread
+
+    Args:
+        port (int): Port to listen on, 0 for any free port
+        latency (float): Seconds waited before answering each request
+    """
+
+    def __init__(self, port=0, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self.bytes_received = 0
+        self._keys = itertools.count(1)
+        self._lock = threading.Lock()
+        self.server = _ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _record(self, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += size
+            return '{}-{}'.format(PROJECT, next(self._keys))
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _read_body(self):
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    size = 0
+                    while True:
+                        chunk_size = int(self.rfile.readline().strip(), 16)
+                        if not chunk_size:
+                            self.rfile.readline()
+                            return size
+                        self.rfile.read(chunk_size)
+                        self.rfile.readline()
+                        size += chunk_size
+                length = int(self.headers.get('Content-Length', 0))
+                self.rfile.read(length)
+                return length
+
+            def do_POST(self):
+                key = stub._record(self._read_body())
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if self.path.endswith(IMPORT_PATH):
+                    body = {'testExecIssue': {'id': key, 'key': key, 'self': self.path}}
+                elif self.path.endswith(ATTACHMENTS_PATH):
+                    body = [{'id': key, 'filename': 'attachment'}]
+                else:
+                    body = {'id': key, 'key': key}
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a stub of the JIRA-XRAY API')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds waited before answering each request')
+    args = parser.parse_args()
+
+    stub = StubXray(args.port, args.latency)
+    print('Stub XRAY listening on ' + stub.url)
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
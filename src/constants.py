@@ -1,4 +1,5 @@
 #####################CONSTANTS#######################
+import re
 
 ### argparser
 
@@ -35,7 +36,14 @@ EPILOG = "\n\n\nExamples: \n" \
 
 # Positional Arguments
 FILE = 'file'
-FILE_HELP = 'Robot Framework output XML file'
+FILE_NARGS = '*'
+FILE_HELP = 'Robot Framework output XML file. Files ending with .gz or .zst (needs the zstandard package) are ' \
+            'decompressed while they are parsed, and - reads the output XML from the standard input ' \
+            '(evidences are then relative to the current directory).\n' \
+            'Several files or glob patterns (e.g. "shards/output-*.xml") can be given, for example the outputs of ' \
+            'the shards of a parallel run: they are parsed concurrently with --workers, and their tests merged ' \
+            'by test execution in a single import.\n' \
+            'With --watch or --serve, the files given are imported by the daemon, each one on its own'
 
 URL = 'url'
 URL_HELP = 'Jira\'s url'
@@ -80,6 +88,31 @@ FILTER_TEST_CASE_HELP = 'Apply test case filtering in the import. Specifying tes
 
 FILTER_TEST_CASE_ACTION = 'append'
 
+FILTER_EXPRESSION = '-fx'
+FILTER_EXPRESSION_EXTENDED = '--filter-expression'
+FILTER_EXPRESSION_HELP = 'Apply a filter expression in the import. Terms are field:pattern, with the fields tag, suite ' \
+                         '(name or dotted path of any enclosing suite) and test. Patterns are exact values, globs ' \
+                         '(*, ?, [...]) or regular expressions between slashes, quoted if they have spaces. ' \
+                         'Terms are combined with NOT, AND, OR and parentheses. ' \
+                         'Filter expressions can be combined, and with other filters, always as an intersection.\n' \
+                         'Example: --filter-expression "tag:smoke* AND NOT suite:Legacy.*"'
+FILTER_EXPRESSION_ACTION = 'append'
+
+FILTER_PROFILE = '-fp'
+FILTER_PROFILE_EXTENDED = '--filter-profile'
+FILTER_PROFILE_HELP = 'Add a named filter profile, as NAME=EXPRESSION with a filter expression. ' \
+                      'Filter profiles can be combined, each one is imported as a separate test execution ' \
+                      'from a single parse of the output file. They can not be combined with other filters.\n' \
+                      'Example: --filter-profile payments="suite:Payments" --filter-profile ui="tag:ui-*"'
+FILTER_PROFILE_ACTION = 'append'
+
+FILTER_PROFILES_FILE = '-fpf'
+FILTER_PROFILES_FILE_EXTENDED = '--filter-profiles-file'
+FILTER_PROFILES_FILE_HELP = 'Path to a JSON file with named filter profiles. Each profile is either a filter ' \
+                            'expression or an object with lists of "tag", "test suite", "test case" and ' \
+                            '"expression" filters, and the filter "option".\n' \
+                            'Example: {"payments": {"test suite": ["Payments"], "tag": ["smoke"]}, "ui": "tag:ui-*"}'
+
 FILTER_OPTION = '-fo'
 FILTER_OPTION_EXTENDED = '--filter-options'
 FILTER_OPTION_DEFAULT = 'AND'
@@ -186,6 +219,263 @@ ATTACHMENT = '-att'
 ATTACHMENT_EXTENDED = '--attachment'
 ATTACHMENT_HELP = 'Add file to attachment field of test execution. To add multiple files, separate them by commas. Eg. -att file1.txt,file2.csv,file3.html'
 
+# Compress big attachments while they are uploaded
+ATTACHMENT_COMPRESSION = '-atc'
+ATTACHMENT_COMPRESSION_EXTENDED = '--attachment-compression'
+ATTACHMENT_COMPRESSION_GZIP = 'gzip'
+ATTACHMENT_COMPRESSION_ZIP = 'zip'
+ATTACHMENT_COMPRESSION_CHOICES = [ATTACHMENT_COMPRESSION_GZIP, ATTACHMENT_COMPRESSION_ZIP]
+ATTACHMENT_COMPRESSION_HELP = 'Compress the attachments bigger than the compression threshold, with gzip (log.html is ' \
+                              'attached as log.html.gz) or zip (as log.html.zip), while they are uploaded. Files ' \
+                              'already compressed, as archives and images, are attached as they are'
+
+ATTACHMENT_COMPRESSION_THRESHOLD = '-atct'
+ATTACHMENT_COMPRESSION_THRESHOLD_EXTENDED = '--attachment-compression-threshold'
+ATTACHMENT_COMPRESSION_THRESHOLD_DEFAULT = 1
+ATTACHMENT_COMPRESSION_THRESHOLD_HELP = 'Size, in MB, from which attachments are compressed.\n' \
+                                        'Default value is 1'
+
+# Parse test cases in parallel
+WORKERS = '-w'
+WORKERS_EXTENDED = '--workers'
+WORKERS_DEFAULT = 0
+WORKERS_HELP = 'Number of processes used to parse the test cases of the output file. ' \
+               'The result is the same as parsing them in a single process.\n' \
+               'Default value is 0 (no extra processes)'
+
+# Send test executions in parallel
+UPLOAD_CONCURRENCY = '-uc'
+UPLOAD_CONCURRENCY_EXTENDED = '--upload-concurrency'
+UPLOAD_CONCURRENCY_DEFAULT = 1
+UPLOAD_CONCURRENCY_HELP = 'Number of test executions sent to XRAY at the same time, over a shared pool of connections. ' \
+                          'Results are reported in the same order as in sequential mode.\n' \
+                          'Default value is 1'
+
+# Split test executions in several imports
+CHUNK_TESTS = '-ct'
+CHUNK_TESTS_EXTENDED = '--chunk-tests'
+CHUNK_TESTS_DEFAULT = 0
+CHUNK_TESTS_HELP = 'Maximum number of tests sent in a single import request. Bigger test executions are split: ' \
+                   'the first request creates the test execution and the others update it.\n' \
+                   'Default value is 0 (no limit)'
+
+CHUNK_SIZE = '-cs'
+CHUNK_SIZE_EXTENDED = '--chunk-size'
+CHUNK_SIZE_DEFAULT = 0
+CHUNK_SIZE_HELP = 'Maximum size, in MB, of a single import request, evidences included. Bigger test executions are ' \
+                  'split: the first request creates the test execution and the others update it.\n' \
+                  'Default value is 0 (no limit)'
+
+# Retry requests refused by the server and limit their rate
+RETRIES = '-rt'
+RETRIES_EXTENDED = '--retries'
+RETRIES_DEFAULT = 3
+RETRIES_HELP = 'Number of times a request is retried when the server is overloaded (HTTP 429 or 503) ' \
+               'or the connection fails.\n' \
+               'Default value is 3'
+
+RETRY_BACKOFF = '-rb'
+RETRY_BACKOFF_EXTENDED = '--retry-backoff'
+RETRY_BACKOFF_DEFAULT = 1.0
+RETRY_BACKOFF_HELP = 'Seconds to wait before the first retry, doubled for each retry (with random jitter), ' \
+                     'unless the server sets Retry-After.\n' \
+                     'Default value is 1'
+
+RATE_LIMIT = '-rl'
+RATE_LIMIT_EXTENDED = '--rate-limit'
+RATE_LIMIT_DEFAULT = 0
+RATE_LIMIT_HELP = 'Maximum number of requests per second sent to JIRA.\n' \
+                  'Default value is 0 (no limit)'
+
+# Resume an interrupted import
+RESUME = '-r'
+RESUME_EXTENDED = '--resume'
+RESUME_HELP = 'Resume a previous import of the same file, with the same options, that did not finish. ' \
+              'Test executions, chunks, attachments and test plan links already sent are skipped.'
+
+JOURNAL = '-j'
+JOURNAL_EXTENDED = '--journal'
+JOURNAL_EXTENSION = '.journal'
+JOURNAL_STDIN = 'stdin' + JOURNAL_EXTENSION
+JOURNAL_HELP = 'Path to the file where the requests already sent are recorded, to resume the import.\n' \
+               'Default value is the output file path followed by .journal (stdin.journal for the standard input). ' \
+               'The journal is deleted once the import is complete, unless an attachment or evidence failed'
+JOURNAL_KEPT = 'Journal {} kept, {} attachments or evidences failed. Run again with --resume to retry them'
+JOURNAL_UNAVAILABLE = 'Journal {} can not be written ({}), the import will not be resumable'
+
+# Size of the cache of encoded evidences
+EVIDENCE_CACHE = '-ec'
+EVIDENCE_CACHE_EXTENDED = '--evidence-cache'
+EVIDENCE_CACHE_DEFAULT = 64
+EVIDENCE_CACHE_HELP = 'Maximum size, in MB, of base64 encoded evidences kept in memory, so that identical evidences ' \
+                      'are only read and encoded once. 0 disables the cache.\n' \
+                      'Default value is 64'
+
+# Make evidences smaller before they are encoded
+EVIDENCE_MAX_DIMENSION = '-emd'
+EVIDENCE_MAX_DIMENSION_EXTENDED = '--evidence-max-dimension'
+EVIDENCE_MAX_DIMENSION_DEFAULT = 0
+EVIDENCE_MAX_DIMENSION_HELP = 'Downscale image evidences to this maximum width and height, in pixels, keeping their ' \
+                              'aspect ratio (needs the Pillow package).\n' \
+                              'Default value is 0 (no limit)'
+
+EVIDENCE_FORMAT = '-ef'
+EVIDENCE_FORMAT_EXTENDED = '--evidence-format'
+EVIDENCE_FORMAT_PNG = 'png'
+EVIDENCE_FORMAT_JPEG = 'jpeg'
+EVIDENCE_FORMAT_WEBP = 'webp'
+EVIDENCE_FORMAT_CHOICES = [EVIDENCE_FORMAT_PNG, EVIDENCE_FORMAT_JPEG, EVIDENCE_FORMAT_WEBP]
+EVIDENCE_FORMAT_HELP = 'Convert image evidences to this format, png, jpeg or webp, when it makes them smaller ' \
+                       '(needs the Pillow package).\n' \
+                       'Default value is to keep their format'
+
+EVIDENCE_QUALITY = '-eq'
+EVIDENCE_QUALITY_EXTENDED = '--evidence-quality'
+EVIDENCE_QUALITY_DEFAULT = 85
+EVIDENCE_QUALITY_HELP = 'Quality, from 1 to 100, of the image evidences saved as jpeg or webp.\n' \
+                        'Default value is 85'
+
+EVIDENCE_OPTIMIZE = '-eo'
+EVIDENCE_OPTIMIZE_EXTENDED = '--evidence-optimize'
+EVIDENCE_OPTIMIZE_HELP = 'Recompress image evidences losslessly, as small as their format allows, when it makes ' \
+                         'them smaller (needs the Pillow package).'
+
+EVIDENCE_MAX_SIZE = '-ems'
+EVIDENCE_MAX_SIZE_EXTENDED = '--evidence-max-size'
+EVIDENCE_MAX_SIZE_DEFAULT = 0
+EVIDENCE_MAX_SIZE_HELP = 'Maximum size, in KB, of each evidence. Bigger image evidences are downscaled until they ' \
+                         'fit, and evidences that still do not fit are left out of the import.\n' \
+                         'Default value is 0 (no limit)'
+
+EVIDENCE_TEST_EXEC_MAX_SIZE = '-etms'
+EVIDENCE_TEST_EXEC_MAX_SIZE_EXTENDED = '--evidence-test-exec-max-size'
+EVIDENCE_TEST_EXEC_MAX_SIZE_DEFAULT = 0
+EVIDENCE_TEST_EXEC_MAX_SIZE_HELP = 'Maximum size, in MB, of the evidences of each test execution. The evidences of ' \
+                                   'failed tests are kept first, then the others in order, and the evidences that ' \
+                                   'do not fit are left out of the import.\n' \
+                                   'Default value is 0 (no limit)'
+
+EVIDENCE_WORKERS = '-ew'
+EVIDENCE_WORKERS_EXTENDED = '--evidence-workers'
+EVIDENCE_WORKERS_DEFAULT = 0
+EVIDENCE_WORKERS_HELP = 'Number of threads processing evidences while the output file is parsed.\n' \
+                        'Default value is 0 (one per CPU)'
+
+EVIDENCE_ATTACHMENTS = '-ea'
+EVIDENCE_ATTACHMENTS_EXTENDED = '--evidence-attachments'
+EVIDENCE_ATTACHMENTS_HELP = 'Import the results without the evidence data, and then upload each evidence file as an ' \
+                            'attachment of its test execution, in parallel. An evidence that can not be uploaded is ' \
+                            'reported and does not fail the import'
+
+# Tests found in several output files
+DUPLICATE_TESTS = '-dt'
+DUPLICATE_TESTS_EXTENDED = '--duplicate-tests'
+DUPLICATE_TESTS_LAST = 'last'
+DUPLICATE_TESTS_FIRST = 'first'
+DUPLICATE_TESTS_FAIL = 'fail'
+DUPLICATE_TESTS_PASS = 'pass'
+DUPLICATE_TESTS_CHOICES = [DUPLICATE_TESTS_LAST, DUPLICATE_TESTS_FIRST, DUPLICATE_TESTS_FAIL, DUPLICATE_TESTS_PASS]
+DUPLICATE_TESTS_DEFAULT = DUPLICATE_TESTS_LAST
+# Rank of the test statuses for the rules that choose a result by status, higher is kept
+DUPLICATE_TESTS_STATUS_RANK = {
+    DUPLICATE_TESTS_FAIL: {'FAIL': 3, 'PASS': 2, 'SKIP': 1, 'NOT RUN': 0},
+    DUPLICATE_TESTS_PASS: {'PASS': 3, 'FAIL': 2, 'SKIP': 1, 'NOT RUN': 0},
+}
+DUPLICATE_TESTS_HELP = 'Result kept when the same JIRA_TEST is found in several output files, for the same test ' \
+                       'execution:\n' \
+                       '- last: The result of the last file given (as rebot --merge)\n' \
+                       '- first: The result of the first file given\n' \
+                       '- fail: A failed result, over passed and skipped ones (the last file on ties)\n' \
+                       '- pass: A passed result, over failed and skipped ones (the last file on ties)\n' \
+                       'Default value is last'
+
+# Instrumentation of the import
+STATS = '-st'
+STATS_EXTENDED = '--stats'
+STATS_STDOUT = '-'
+STATS_HELP = 'Write a JSON summary of the import: time spent parsing the XML, the tests and their steps, encoding ' \
+             'evidences and serializing JSON, counters of tests, steps, evidence and JSON bytes, and the latency, ' \
+             'retries and status codes of the requests to each endpoint. Written to the given file, or to the ' \
+             'standard output if no file is given.'
+
+PROFILE = '-pr'
+PROFILE_EXTENDED = '--profile'
+PROFILE_HELP = 'Profile the import with cProfile, writing the profile to the given file (readable with pstats). ' \
+               'Only the main thread is profiled, where the output file is parsed; the serialization and the ' \
+               'requests run in other threads are timed with --stats.'
+
+TRACE_MEMORY = '-tm'
+TRACE_MEMORY_EXTENDED = '--trace-memory'
+TRACE_MEMORY_HELP = 'Trace memory allocations with tracemalloc, writing the peak memory and the lines that ' \
+                    'allocated the most memory to the given file.'
+# Number of frames kept for each traced allocation and number of lines written
+TRACE_MEMORY_FRAMES = 1
+TRACE_MEMORY_TOP = 50
+
+# Report what would be sent to JIRA, without sending it
+DRY_RUN = '-dry'
+DRY_RUN_EXTENDED = '--dry-run'
+DRY_RUN_HELP = 'Parse and group the tests as the import would, and report what it would send to JIRA without ' \
+               'sending anything: the tests, steps and evidences of each test execution, the size of the requests ' \
+               '(computed without building them) and the number of requests and rounds of --upload-concurrency ' \
+               'requests they would take. The whole report, with the projected schedule of the requests, is ' \
+               'written as JSON to the given file, or to the standard output with -.'
+DRY_RUN_DAEMON = '--dry-run can not be used with --watch or --serve'
+
+# Daemon mode, importing the output files as they are produced
+WATCH = '-wd'
+WATCH_EXTENDED = '--watch'
+WATCH_HELP = 'Run as a daemon, importing the output files written to this directory (or its subdirectories) once ' \
+             'Robot Framework finishes them. Files already there when the daemon starts are only imported if ' \
+             'they change. The connections to JIRA, the worker processes and the evidence cache are kept between ' \
+             'imports, and the files found together are imported in a batch.'
+
+WATCH_PATTERN = '-wp'
+WATCH_PATTERN_EXTENDED = '--watch-pattern'
+WATCH_PATTERN_ACTION = 'append'
+WATCH_PATTERN_DEFAULT = ['*.xml', '*.xml.gz', '*.xml.zst']
+WATCH_PATTERN_HELP = 'Glob pattern of the names of the output files imported by --watch. Can be given several ' \
+                     'times.\n' \
+                     'Default value is *.xml, *.xml.gz and *.xml.zst'
+
+WATCH_SETTLE = '-ws'
+WATCH_SETTLE_EXTENDED = '--watch-settle'
+WATCH_SETTLE_DEFAULT = 2.0
+WATCH_SETTLE_HELP = 'Seconds an output file must be left unchanged before --watch imports it.\n' \
+                    'Default value is 2'
+
+SERVE = '-sv'
+SERVE_EXTENDED = '--serve'
+SERVE_HOST_DEFAULT = '127.0.0.1'
+SERVE_HELP = 'Run as a daemon, with a local HTTP endpoint on [HOST:]PORT where CI jobs queue their output files:\n' \
+             '- POST /import?path=FILE imports an output file the daemon can read, with its evidences\n' \
+             '- POST /import with the output XML as body (Content-Encoding: gzip if compressed) imports it; its ' \
+             'evidences must have absolute paths the daemon can read, or be left out with -es None\n' \
+             '- GET /status and GET /status?path=FILE return the state of the imports and the keys of the ' \
+             'test executions\n' \
+             'HOST defaults to 127.0.0.1. Can be used with --watch.'
+
+BATCH_WINDOW = '-bw'
+BATCH_WINDOW_EXTENDED = '--batch-window'
+BATCH_WINDOW_DEFAULT = 2.0
+BATCH_WINDOW_HELP = 'Seconds the daemon waits for more output files once one is queued, to import them in a ' \
+                    'batch: the files are parsed by the --workers processes at the same time, and their requests ' \
+                    'share the --upload-concurrency limit. Each file is imported as its own test executions.\n' \
+                    'Default value is 2'
+
+BATCH_SIZE = '-bs'
+BATCH_SIZE_EXTENDED = '--batch-size'
+BATCH_SIZE_DEFAULT = 8
+BATCH_SIZE_HELP = 'Maximum number of output files the daemon imports in a batch.\n' \
+                  'Default value is 8'
+
+MODEL_CACHE = '-mc'
+MODEL_CACHE_EXTENDED = '--model-cache'
+MODEL_CACHE_DEFAULT = 16
+MODEL_CACHE_HELP = 'Number of parsed output files the daemon keeps in memory, so that a file submitted again ' \
+                   'unchanged (e.g. after a failed upload) is not parsed again. 0 disables the cache.\n' \
+                   'Default value is 16'
+
 
 
 # TEST EXECUTION INFO KEYS
@@ -206,9 +496,42 @@ TEST_EXECUTION_INFO_TESTENVIRONMENTS_SEPERATOR = '|'
 FILTER_TAG_KEY = 'tag'
 FILTER_TEST_SUITE_KEY = 'test suite'
 FILTER_TEST_CASE_KEY = 'test case'
+FILTER_EXPRESSION_KEY = 'expression'
+FILTER_KEYS = [FILTER_TAG_KEY, FILTER_TEST_SUITE_KEY, FILTER_TEST_CASE_KEY, FILTER_EXPRESSION_KEY]
+
+## Filter profiles
+FILTER_PROFILE_KEY = 'profile'
+FILTER_PROFILE_OPTION_KEY = 'option'
+FILTER_PROFILE_SEPARATOR = '='
+FILTER_PROFILE_ERROR = 'Invalid filter profile {}: {}'
+FILTER_PROFILE_CONFLICT = 'Filter profiles can not be combined with other filters'
+FILTER_PROFILE_MESSAGE = 'Filter profile: {}'
+FILTER_PROFILE_TEST_EXEC_ID = '{} {}'
+
+## Filter expressions
+FILTER_FIELD_TAG = 'tag'
+FILTER_FIELD_SUITE = 'suite'
+FILTER_FIELD_TEST = 'test'
+FILTER_OPERATOR_AND = 'AND'
+FILTER_OPERATOR_OR = 'OR'
+FILTER_OPERATOR_NOT = 'NOT'
+FILTER_GLOB_WILDCARDS = ('*', '?', '[')
+# A parenthesis, a field:pattern term (pattern quoted, between slashes or up to a space or parenthesis) or a word
+FILTER_TOKEN_REGEX = re.compile(r'\s*(?:(?P<paren>[()])|(?P<field>\w+):(?P<pattern>"(?:[^"\\]|\\.)*"|/(?:[^/\\]|\\.)*/|[^\s()]+)'
+                                r'|(?P<word>[^\s()]+))\s*')
+FILTER_EXPRESSION_ERROR = 'Invalid filter expression: {}'
+SUITE_PATH_SEPARATOR = '.'
 
 #### XML PARSER AND CREATION OF TEST EXEC
 
+# INPUT
+INPUT_STDIN = '-'
+INPUT_GZIP_EXTENSION = '.gz'
+INPUT_ZSTANDARD_EXTENSION = '.zst'
+INPUT_ZSTANDARD_MISSING = 'Reading {} requires the zstandard package (pip install zstandard)'
+INPUT_NO_MATCH = 'No output files match {}'
+
+
 JIRA_TEST_TAG = 'JIRA_TEST'
 JIRA_TESTEXEC_TAG = 'JIRA_TESTEXEC'
 NO_TESTEXEC_KEY = '-1'
@@ -220,6 +543,10 @@ STATUS_TAG = 'status'
 KW_TAG = 'kw'
 MSG_TAG = 'msg'
 
+# XML PARSER EVENTS
+EVENT_START = 'start'
+EVENT_END = 'end'
+
 # XML ATTRIB
 ATTRIB_NAME = 'name'
 ATTRIB_STARTTIME = 'starttime'
@@ -234,19 +561,22 @@ SETUP = 'setup'
 TEARDOWN = 'teardown'
 
 ## XPATH
-# XPATH TO CLEAR MEMORY
-XPATH_ANCESTOR = 'ancestor-or-self::*'
-# XPATH TO GET TEST TAGS TEXT
-XPATH_TAG_TEXT = 'tags/tag/text()'
+# XPATH TO GET TEST TAGS
+XPATH_TAG = 'tags/tag'
 # XPATH TO FIND EVIDENCE MSG
 XPATH_EVIDENCE_MSG = 'msg[@level="INFO"]'
 # XPATH TO GET ARGUMENTS FROM LOG
 XPATH_LOG_ARGS = 'arguments/arg'
-#XPATH TO GET FIRST SUITE
-XPATH_ANCESTOR_SUITE = 'ancestor::suite'
+
 # TEST TAG SEPARATOR
 TEST_TAG_SEPARATOR = ':'
 
+## PARALLEL PARSING
+# Number of test cases sent to a worker process at a time
+WORKERS_BATCH_SIZE = 16
+# Number of batches waiting to be parsed, per worker process
+WORKERS_QUEUE_SIZE = 4
+
 ## TEST EXECUTION SUMMARY
 # FILTERS
 TEST_EXECUTION_SUMMARY_FILTERS = 'Test Execution {} with filters: {}'
@@ -267,6 +597,9 @@ SRC_REGEX = 'img src="(.*?)"'
 
 # ROBOT FRAMEWORK FORMAT
 DATE_ROBOT_FRAMEWORK_FORMAT = '%Y%m%d %H:%M:%S.%f'
+DATE_ROBOT_FRAMEWORK_REGEX = re.compile(r'(\d{4})(\d{2})(\d{2}) (\d{2}):(\d{2}):(\d{2})\.(\d{1,6})$')
+# Number of parsed timestamps remembered
+DATE_CACHE_ENTRIES = 4096
 # XRAY FORMAT
 DATE_XRAY_FORMAT = '%Y-%m-%dT%H:%M:%S+01:00'
 
@@ -276,9 +609,30 @@ DATE_XRAY_FORMAT = '%Y-%m-%dT%H:%M:%S+01:00'
 CONTENT_TYPE = "Content-Type"
 CONTENT_TYPE_JSON = "application/json"
 # For attachments
+CONTENT_TYPE_MULTIPART = "multipart/form-data; boundary={}"
 CONTENT_ATLASSIAN_TOKEN = "X-Atlassian-Token"
 CONTENT_ATLASSIAN_TOKEN_VALUE = "no-check"
 
+# Retries
+RETRY_AFTER = "Retry-After"
+RETRY_STATUS = (429, 503)
+# Maximum seconds to wait before a retry, when the server does not set Retry-After
+RETRY_BACKOFF_MAX = 60
+RETRY_MESSAGE = 'Request to {} failed ({}), retrying in {:.1f}s ({}/{})'
+
+# Size in bytes of each chunk of the streamed JSON request body
+JSON_CHUNK_SIZE = 64 * 1024
+
+# Types serialized as JSON values
+JSON_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+# Size in bytes of each block of an evidence file that is base64 encoded at a time (multiple of 3)
+EVIDENCE_BLOCK_SIZE = 3 * 16 * 1024
+# Maximum size in bytes of the base64 encoded evidences kept in cache
+EVIDENCE_CACHE_SIZE = 64 * 1024 * 1024
+# Maximum number of evidence files whose content digest is kept in cache
+EVIDENCE_CACHE_ENTRIES = 100000
+
 
 # TEST EXECUTION ISSUE
 TEST_EXEC_ISSUE = 'testExecIssue'
@@ -288,6 +642,7 @@ KEY = 'key'
 ##DEBUG LOG
 DEBUG_UPDATE = 'Update {} tests of test execution {}. Test keys: {}'
 DEBUG_CREATE = 'Create a new test execution with name: \"{}\" and \"{}\" tests. Test keys: {}'
+DEBUG_EVIDENCES = 'Evidences: {} files read ({} bytes), {} bytes deduplicated'
 
 
 # TEST PLAN
@@ -306,5 +661,164 @@ TEST_PLAN_ISSUE_NAME = 'Test Plan'
 # ATTACHMENTS
 # Attachment endpoint
 ATTACHMENT_ENDPOINT = '/rest/api/2/issue/{}/attachments'
-
-
+ATTACHMENT_CONTENT_TYPE = 'text/plain'
+# Compressed attachments
+ATTACHMENT_COMPRESSION_EXTENSIONS = {ATTACHMENT_COMPRESSION_GZIP: '.gz', ATTACHMENT_COMPRESSION_ZIP: '.zip'}
+ATTACHMENT_COMPRESSION_CONTENT_TYPES = {ATTACHMENT_COMPRESSION_GZIP: 'application/gzip',
+                                        ATTACHMENT_COMPRESSION_ZIP: 'application/zip'}
+ATTACHMENT_COMPRESSION_LEVEL = 6
+# Extensions of the files that compression would not make smaller
+ATTACHMENT_COMPRESSED_EXTENSIONS = ('.gz', '.tgz', '.zip', '.zst', '.bz2', '.xz', '.7z', '.jar', '.png', '.jpg',
+                                    '.jpeg', '.gif', '.webp', '.mp4', '.webm')
+# Size in bytes of each block of the attachment compressed at a time
+ATTACHMENT_BLOCK_SIZE = 64 * 1024
+ATTACHMENT_PART_HEADER = '--{}\r\nContent-Disposition: form-data; name="file"; filename="{}"\r\n' \
+                         'Content-Type: {}\r\n\r\n'
+ATTACHMENT_PART_FOOTER = '\r\n--{}--\r\n'
+# Evidences uploaded as attachments
+EVIDENCE_CONTENT_TYPE_DEFAULT = 'application/octet-stream'
+EVIDENCE_UPLOAD_ERROR = 'Could not add evidence {} to test execution {}. Error: {}'
+EVIDENCE_UPLOAD_MESSAGE = '{} of {} evidences were added to test execution {}'
+
+
+# JOURNAL
+JOURNAL_FINGERPRINT_KEY = 'fingerprint'
+# Maximum seconds between two syncs of the journal file to disk
+JOURNAL_SYNC_INTERVAL = 1.0
+JOURNAL_STEP_KEY = 'step'
+JOURNAL_VALUE_KEY = 'value'
+# Steps
+JOURNAL_CHUNK = 'test exec {} chunk {}'
+JOURNAL_ATTACHMENT = 'attachment {} {}'
+JOURNAL_EVIDENCE = 'evidence {} {} {}'
+JOURNAL_TEST_PLAN = 'test plan of test exec {}'
+JOURNAL_TEST_PLAN_TEST_EXEC = 'test plan {} test exec {}'
+JOURNAL_TEST_PLAN_TESTS = 'test plan {} tests'
+# Arguments that do not change what is imported
+JOURNAL_IGNORED_ARGUMENTS = ['resume', 'journal', 'debug', 'password', 'workers', 'upload_concurrency',
+                             'evidence_cache', 'stats', 'profile', 'trace_memory', 'watch', 'watch_pattern',
+                             'watch_settle', 'serve', 'batch_window', 'batch_size', 'model_cache', 'dry_run',
+                             'evidence_workers']
+
+# STATS
+# Phases of the import
+STATS_PARSE = 'parse'
+STATS_UPLOAD = 'upload'
+# Timers
+STATS_XML_READ = 'xml read'
+STATS_TEST_PARSE = 'test parse'
+STATS_STEP_PARSE = 'step parse'
+STATS_SERIALIZE = 'serialize'
+STATS_EVIDENCE_ENCODE = 'evidence encode'
+STATS_EVIDENCE_PROCESS = 'evidence process'
+# Counters
+STATS_TESTS = 'tests parsed'
+STATS_STEPS = 'steps parsed'
+STATS_EVIDENCES = 'evidences'
+STATS_JSON_BYTES = 'json bytes'
+STATS_EVIDENCE_FILES_READ = 'evidence files read'
+STATS_EVIDENCE_BYTES_READ = 'evidence bytes read'
+STATS_EVIDENCE_BYTES_ENCODED = 'evidence bytes encoded'
+STATS_EVIDENCE_BYTES_DEDUPLICATED = 'evidence bytes deduplicated'
+STATS_EVIDENCES_DROPPED = 'evidences dropped'
+STATS_EVIDENCE_BYTES_SAVED = 'evidence bytes saved'
+# Issue keys in request paths, replaced to group the requests by endpoint
+STATS_ISSUE_KEY_REGEX = re.compile(r'[A-Z][A-Z0-9_]*-\d+')
+STATS_ISSUE_KEY = '{key}'
+TRACE_MEMORY_PEAK = 'Peak traced memory: {} bytes'
+
+
+
+# DAEMON
+# Seconds between scans of the watched directory
+DAEMON_POLL_INTERVAL = 1.0
+# Output files are complete once Robot Framework writes the closing robot tag, looked for at the end of the file
+DAEMON_ROBOT_END = b'</robot>'
+DAEMON_TAIL_SIZE = 64
+DAEMON_SIGNATURE = '{} {} {}'
+# Test executions are recorded in the journal by the signature of their output file
+DAEMON_TEST_EXEC_ID = '{} {}'
+# Number of files whose state is kept for GET /status
+DAEMON_RESULTS_ENTRIES = 1000
+DAEMON_SPOOL_PREFIX = 'rfw2xray_spool_'
+DAEMON_SPOOL_EXTENSION = '.xml'
+DAEMON_SPOOL_BLOCK_SIZE = 64 * 1024
+SERVE_IMPORT_PATH = '/import'
+SERVE_STATUS_PATH = '/status'
+SERVE_PATH_PARAMETER = 'path'
+SERVE_GZIP_ENCODING = 'gzip'
+# States of the files
+DAEMON_STATE_QUEUED = 'queued'
+DAEMON_STATE_IMPORTING = 'importing'
+DAEMON_STATE_IMPORTED = 'imported'
+DAEMON_STATE_FAILED = 'failed'
+# Keys of the responses
+DAEMON_QUEUED_KEY = 'queued'
+DAEMON_FILES_KEY = 'files'
+DAEMON_FILE_KEY = 'file'
+DAEMON_ERROR_KEY = 'error'
+# Messages
+DAEMON_WATCH_MESSAGE = 'Watching {} for output files'
+DAEMON_SERVE_MESSAGE = 'Listening on {}'
+DAEMON_QUEUED_MESSAGE = 'Queued {}'
+DAEMON_BATCH_MESSAGE = 'Importing a batch of {} output files'
+DAEMON_IMPORTED_MESSAGE = 'Imported {}: {}'
+DAEMON_FAILED_MESSAGE = 'Could not import {}: {}'
+DAEMON_ERROR = '{}: {}'
+DAEMON_STOP_MESSAGE = 'Stopping, {} output files were not imported'
+DAEMON_NOT_FOUND = 'Not found'
+DAEMON_NO_FILE = 'No output file {}'
+DAEMON_NO_OUTPUT = 'No output file given, either as the path parameter or as the body'
+DAEMON_INCOMPLETE_BODY = 'The request body ended before its Content-Length'
+DAEMON_NO_INPUT = 'No output file given. Give output files, or run as a daemon with --watch or --serve'
+# the attachments would be added to the last test execution of every output file imported
+DAEMON_ATTACHMENT = '--attachment can not be used with --watch or --serve'
+
+# DRY RUN
+DRY_RUN_MB = 1024.0 * 1024.0
+# Keys of the report
+DRY_RUN_TEST_EXECS_KEY = 'test executions'
+DRY_RUN_REQUESTS_KEY = 'requests'
+DRY_RUN_TOTALS_KEY = 'totals'
+DRY_RUN_ID_KEY = 'id'
+DRY_RUN_PROFILE_KEY = 'profile'
+DRY_RUN_TEST_EXEC_KEY = 'test execution'
+DRY_RUN_SUMMARY_KEY = 'summary'
+DRY_RUN_TESTS_KEY = 'tests'
+DRY_RUN_STEPS_KEY = 'steps'
+DRY_RUN_EVIDENCES_KEY = 'evidences'
+DRY_RUN_EVIDENCE_BYTES_KEY = 'evidence bytes'
+DRY_RUN_ENCODED_EVIDENCE_BYTES_KEY = 'encoded evidence bytes'
+DRY_RUN_JSON_BYTES_KEY = 'json bytes'
+DRY_RUN_REQUEST_BYTES_KEY = 'request bytes'
+DRY_RUN_ENDPOINT_KEY = 'endpoint'
+DRY_RUN_BYTES_KEY = 'bytes'
+DRY_RUN_AFTER_KEY = 'after'
+DRY_RUN_ROUND_KEY = 'round'
+DRY_RUN_ROUNDS_KEY = 'rounds'
+DRY_RUN_CONCURRENCY_KEY = 'concurrency'
+# Counts of the test executions added up in the totals
+DRY_RUN_TOTAL_KEYS = [DRY_RUN_TESTS_KEY, DRY_RUN_STEPS_KEY, DRY_RUN_EVIDENCES_KEY, DRY_RUN_EVIDENCE_BYTES_KEY,
+                      DRY_RUN_ENCODED_EVIDENCE_BYTES_KEY, DRY_RUN_JSON_BYTES_KEY]
+# Messages
+DRY_RUN_TEST_EXEC_MESSAGE = 'Test Exec {}: {} tests, {} steps, {} evidences ({:.2f} MB), {:.2f} MB of JSON in {} ' \
+                            'import requests'
+DRY_RUN_TOTALS_MESSAGE = 'Dry run: {} test executions, {} tests, {} steps, {} evidences ({:.2f} MB). ' \
+                         '{:.2f} MB sent in {} requests, in about {} rounds of up to {} concurrent requests'
+
+# EVIDENCE PROCESSING
+EVIDENCE_PILLOW_MISSING = 'Processing image evidences requires the Pillow package (pip install Pillow)'
+EVIDENCE_PROCESSED_PREFIX = 'rfw2xray_evidences_'
+# Pillow format names, options and extensions
+EVIDENCE_FORMATS = {EVIDENCE_FORMAT_PNG: 'PNG', EVIDENCE_FORMAT_JPEG: 'JPEG', EVIDENCE_FORMAT_WEBP: 'WEBP'}
+EVIDENCE_EXTENSIONS = {'PNG': '.png', 'JPEG': '.jpg', 'WEBP': '.webp'}
+EVIDENCE_LOSSY_FORMATS = ('JPEG', 'WEBP')
+EVIDENCE_SAVE_OPTIONS = {'JPEG': {'optimize': True}, 'WEBP': {'method': 6}}
+# Formats without transparency, and the modes they can save
+EVIDENCE_OPAQUE_FORMATS = ('JPEG',)
+EVIDENCE_OPAQUE_MODES = ('RGB', 'L', 'CMYK')
+EVIDENCE_OPAQUE_MODE = 'RGB'
+# Images over the size cap are downscaled by this factor, at most this number of times
+EVIDENCE_CAP_SCALE = 0.75
+EVIDENCE_CAP_ATTEMPTS = 8
+EVIDENCE_DROPPED_MESSAGE = 'Evidence {} of test {} left out, over the size cap'
@@ -1,4 +1,12 @@
 import json
+import base64
+import gzip
+import zipfile
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 import constants
 # To add attachments
 from requests_toolbelt.multipart.encoder import MultipartEncoder
@@ -6,18 +14,341 @@ import os
 
 class Attachmet:
     """
-    Class that aids in attaching files to JIRA
+    Class that aids in attaching files to JIRA. The multipart body reads the file from disk block by block while
+    it is sent, so the file is never held in memory; it stays open until close is called or the with block ends.
 
+    Args:
+        filepath (str): Path to the file
+        boundary (str): Boundary of the multipart body, a random one if None
+        filename (str): Name the file is attached with, the name of the file if None
+        content_type (str): Content type of the file
     """
-    def __init__(self, filepath):
-        file = os.path.basename(filepath) # get file name
+    def __init__(self, filepath, boundary=None, filename=None, content_type=constants.ATTACHMENT_CONTENT_TYPE):
+        file = filename or os.path.basename(filepath) # get file name
+        # raises OSError if the file can not be opened, so the caller reports it
+        self._file = open(filepath, 'rb')
         try:
-            self.data = MultipartEncoder(fields={'file':(file, open(filepath, 'rb'), 'text/plain')})
-            self.content_type = self.data.content_type
+            self.data = MultipartEncoder(fields={'file':(file, self._file, content_type)}, boundary=boundary)
         except Exception:
-            msg = "Could not find/open " + filepath
-            print(msg)
-            exit(0)
+            self._file.close()
+            raise
+        self.content_type = self.data.content_type
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _StreamSink:
+    """
+    Write-only file object keeping what is written until it is taken, so the output of gzip and zipfile is
+    streamed instead of written to a file
+    """
+
+    def __init__(self):
+        self._blocks = []
+
+    def write(self, data):
+        self._blocks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._blocks)
+        self._blocks = []
+        return data
+
+
+class CompressedAttachment:
+    """
+    Class that attaches a file to JIRA compressed with gzip or zip. The file is compressed block by block while the
+    multipart body is sent, with chunked transfer encoding, so neither the file nor its compressed copy are held in
+    memory or written to disk. The file stays open until close is called or the with block ends.
+
+    Args:
+        filepath (str): Path to the file
+        compression (str): ATTACHMENT_COMPRESSION_GZIP or ATTACHMENT_COMPRESSION_ZIP
+        boundary (str): Boundary of the multipart body
+        filename (str): Name of the file in the attachment, the name of the file if None. The attachment is named
+            after it, with the extension of the compression
+    """
+
+    def __init__(self, filepath, compression, boundary, filename=None):
+        self.filename = filename or os.path.basename(filepath)
+        self.compression = compression
+        self.boundary = boundary
+        self.content_type = constants.CONTENT_TYPE_MULTIPART.format(boundary)
+        self._mtime = os.path.getmtime(filepath)
+        self._file = open(filepath, 'rb')
+        self.data = self._iter_body()
+
+    def close(self):
+        self.data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _iter_body(self):
+        name = self.filename + constants.ATTACHMENT_COMPRESSION_EXTENSIONS[self.compression]
+        yield constants.ATTACHMENT_PART_HEADER.format(
+            self.boundary, name.replace('"', '%22'),
+            constants.ATTACHMENT_COMPRESSION_CONTENT_TYPES[self.compression]).encode('utf-8')
+        sink = _StreamSink()
+        if self.compression == constants.ATTACHMENT_COMPRESSION_ZIP:
+            archive = zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED,
+                                      compresslevel=constants.ATTACHMENT_COMPRESSION_LEVEL)
+            # zip does not keep dates before 1980
+            entry = zipfile.ZipInfo(self.filename, max(time.localtime(self._mtime)[:6], (1980, 1, 1, 0, 0, 0)))
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            # the size is not known before the entry is written, so it is only set to zip64 when it may need it
+            stream = archive.open(entry, 'w', force_zip64=os.fstat(self._file.fileno()).st_size > zipfile.ZIP64_LIMIT)
+        else:
+            archive = None
+            stream = gzip.GzipFile(self.filename, 'wb', constants.ATTACHMENT_COMPRESSION_LEVEL, sink, self._mtime)
+
+        for block in iter(lambda: self._file.read(constants.ATTACHMENT_BLOCK_SIZE), b''):
+            stream.write(block)
+            data = sink.take()
+            # an empty chunk would end the chunked body
+            if data:
+                yield data
+        stream.close()
+        if archive is not None:
+            archive.close()
+        yield sink.take()
+        yield constants.ATTACHMENT_PART_FOOTER.format(self.boundary).encode('utf-8')
+
+
+class TokenBucket:
+    """
+    Class that limits the rate of requests, allowing bursts of up to capacity requests. Thread safe.
+
+    Args:
+        rate (float): Requests per second, 0 for no limit
+        capacity (int): Maximum number of requests sent in a burst, by default the requests of one second
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Waits until a request can be sent
+        """
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # the token is taken right away, requests waiting after this one wait for the next tokens
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class UploadLimiter:
+    """
+    Class that bounds the requests of an upload with a semaphore, that may be shared with other uploads, and keeps
+    it from sending new requests once it failed
+
+    Args:
+        semaphore (asyncio.Semaphore): Semaphore bounding the requests sent at the same time
+    """
+
+    def __init__(self, semaphore):
+        self.semaphore = semaphore
+        self.stopped = False
+
+
+class Stats:
+    """
+    Class that collects timers and counters of an import, to tell where its time goes. Thread safe.
+    Timers add up seconds and the number of times they ran, counters add up values, and requests are recorded
+    by endpoint with their latency, retries and status codes.
+    Worker processes send their timers and counters back with pop, to be merged in the main process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+            self.requests = {}
+
+    def add(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def add_time(self, timer, seconds, count=1):
+        with self._lock:
+            timer_stats = self.timers.setdefault(timer, [0.0, 0])
+            timer_stats[0] += seconds
+            timer_stats[1] += count
+
+    @contextmanager
+    def timer(self, timer):
+        """
+        Times a block of code
+
+        :param timer: Name of the timer
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(timer, time.perf_counter() - start)
+
+    def record_request(self, endpoint, seconds, status, attempt):
+        """
+        Records an attempt of a request
+
+        :param endpoint: Endpoint of the request
+        :param seconds: Seconds until the response, or the error
+        :param status: HTTP status code, or name of the error
+        :param attempt: Number of the attempt, 0 for the first one
+        """
+        with self._lock:
+            request_stats = self.requests.setdefault(endpoint, {'requests': 0, 'retries': 0, 'seconds': 0.0,
+                                                                'max seconds': 0.0, 'status': {}})
+            request_stats['requests' if not attempt else 'retries'] += 1
+            request_stats['seconds'] += seconds
+            request_stats['max seconds'] = max(request_stats['max seconds'], seconds)
+            request_stats['status'][str(status)] = request_stats['status'].get(str(status), 0) + 1
+
+    def pop(self):
+        """
+        Get the timers and counters collected so far, and reset them
+
+        :return:
+            Tuple with the timers and counters
+        """
+        with self._lock:
+            timers, counters = self.timers, self.counters
+            self.timers, self.counters = {}, {}
+        return timers, counters
+
+    def merge(self, timers, counters):
+        for timer, (seconds, count) in timers.items():
+            self.add_time(timer, seconds, count)
+        for counter, value in counters.items():
+            self.add(counter, value)
+
+    def summary(self):
+        """
+        Get the stats as a dict that can be dumped as JSON
+
+        :return:
+            Dict with timers, counters and requests
+        """
+        with self._lock:
+            requests = {}
+            for endpoint, request_stats in self.requests.items():
+                request_stats = dict(request_stats, status=dict(request_stats['status']))
+                for key in ('seconds', 'max seconds'):
+                    request_stats[key] = round(request_stats[key], 6)
+                requests[endpoint] = request_stats
+            return {
+                'timers': dict((timer, {'seconds': round(seconds, 6), 'count': count})
+                               for timer, (seconds, count) in self.timers.items()),
+                'counters': dict(self.counters),
+                'requests': requests,
+            }
+
+
+class Journal:
+    """
+    Class that records the requests already committed to JIRA-XRAY (test executions and their chunks, attachments
+    and test plan links) with the keys returned, so that an interrupted import can be resumed.
+    Each step is appended to the journal file as a JSON line and flushed, so it survives a crash of the process.
+    The file is synced to disk at most every JOURNAL_SYNC_INTERVAL seconds, and when it is closed, so recording
+    many steps does not block the uploads on disk writes.
+
+    Args:
+        path (str): Path to the journal file, None to keep the journal in memory only
+        fingerprint (str): Identification of the import the journal belongs to
+        resume (bool): Whether to keep the steps recorded by a previous run of the same import
+    """
+
+    def __init__(self, path=None, fingerprint='', resume=False):
+        self.path = path
+        self.steps = {}
+        # steps that failed without failing the import, as attachments, to be retried on resume
+        self.failures = 0
+        self._file = None
+        self._synced = 0.0
+        if path is None:
+            return
+
+        if resume and os.path.exists(path):
+            with open(path) as journal_file:
+                entries = []
+                for line in journal_file:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # the last line may be incomplete if the previous run was killed while writing it
+                        break
+            if entries and entries[0].get(constants.JOURNAL_FINGERPRINT_KEY) != fingerprint:
+                raise Exception("Journal " + path + " belongs to a different import, it can not be resumed")
+            for entry in entries[1:]:
+                self.steps[entry[constants.JOURNAL_STEP_KEY]] = entry[constants.JOURNAL_VALUE_KEY]
+            self._file = open(path, 'a')
+            if not entries:
+                self._write({constants.JOURNAL_FINGERPRINT_KEY: fingerprint})
+        else:
+            self._file = open(path, 'w')
+            self._write({constants.JOURNAL_FINGERPRINT_KEY: fingerprint})
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        now = time.time()
+        if now - self._synced >= constants.JOURNAL_SYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._synced = now
+
+    def get(self, step):
+        return self.steps.get(step)
+
+    def record(self, step, value=True):
+        self.steps[step] = value
+        if self._file:
+            self._write({constants.JOURNAL_STEP_KEY: step, constants.JOURNAL_VALUE_KEY: value})
+
+    def close(self):
+        if self._file:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """
+        Closes the journal and deletes its file, once the import it records is complete. The file is kept if some
+        step failed, so that the import can be resumed to retry it
+        """
+        self.close()
+        if not self.failures and self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
 
 
 class TestPlan:
@@ -48,13 +379,24 @@ class TestExec:
     Args:
         tests (:obj:`list` of :obj:`TestCase`): Test Execution's test cases
     """
+    __slots__ = ('tests', 'testExecutionKey', 'info')
 
-    def __init__(self, tests=[]):
-        self.tests = tests
+    def __init__(self, tests=None):
+        self.tests = tests if tests is not None else []
+        self.testExecutionKey = None
+        self.info = None
 
     def add_test(self, test):
         self.tests.append(test)
 
+    def _ast(self):
+        data = {"tests": self.tests}
+        if self.testExecutionKey is not None:
+            data["testExecutionKey"] = self.testExecutionKey
+        if self.info is not None:
+            data["info"] = self.info
+        return data
+
 
 class TestExecInfo:
     """
@@ -69,6 +411,9 @@ class TestExecInfo:
         for key in kwargs:
             setattr(self, key, kwargs[key])
 
+    def _ast(self):
+        return dict(self.__dict__)
+
 
 class TestCase:
     """
@@ -77,14 +422,19 @@ class TestCase:
     Args:
         test_key (str): Jira's Test Issue key
         status (str); Test Case Execution status
+        start (str): Start date, in XRAY format
+        finish (str): Finish date, in XRAY format
     """
+    __slots__ = ('testKey', 'status', 'steps', 'evidences', 'comment', 'start', 'finish')
 
-    def __init__(self, test_key, status):
+    def __init__(self, test_key, status, start=None, finish=None):
         self.testKey = test_key
         self.status = status
         self.steps = []
         self.evidences = []
         self.comment = ''
+        self.start = start
+        self.finish = finish
 
     def add_step(self, step):
         self.steps.append(step)
@@ -92,6 +442,15 @@ class TestCase:
     def add_evidence(self, evidence):
         self.evidences.append(evidence)
 
+    def _ast(self):
+        data = {"testKey": self.testKey, "status": self.status, "steps": self.steps, "evidences": self.evidences,
+                "comment": self.comment}
+        if self.start is not None:
+            data["start"] = self.start
+        if self.finish is not None:
+            data["finish"] = self.finish
+        return data
+
 
 class TestStep:
     """
@@ -100,6 +459,7 @@ class TestStep:
     Args:
         status (str): Test step execution status
     """
+    __slots__ = ('status', 'evidences', 'comment')
 
     def __init__(self, status):
         self.status = status
@@ -112,16 +472,261 @@ class TestStep:
     def add_to_comment(self, comment):
         self.comment += comment
 
+    def _ast(self):
+        return {"status": self.status, "evidences": self.evidences, "comment": self.comment}
+
 
 class TestEvidence:
     """
-    Class that represents a Test Execution evidence
+    Class that represents a Test Execution evidence. Only the path of the evidence file is kept,
+    its content is base64 encoded in blocks when the evidence is serialized.
+
+    Args:
+        path (str): Path to the evidence file
+    """
+    __slots__ = ('_path', '_size', 'filename', '_processed')
+
+    def __init__(self, path):
+        self._path = path
+        # fails right away if the evidence file does not exist, as when it was read on parsing
+        self._size = os.path.getsize(path)
+        self.filename = os.path.basename(path)
+        # None until it is processed, the future of the processed file while it is processed, True once done
+        self._processed = None
+
+    def process(self, processor):
+        """
+        Starts processing the evidence file with an EvidenceProcessor, unless it was already started
+
+        :param processor: EvidenceProcessor
+        """
+        if self._processed is None:
+            self._processed = processor.submit(self._path)
+
+    def wait_processed(self):
+        """
+        Waits for the evidence file to be processed, and uses the processed file from then on
+
+        :return:
+            Boolean value, False if the evidence was dropped by the processor
+        """
+        if self._processed is None or self._processed is True:
+            return True
+        processed = self._processed.result()
+        self._processed = True
+        if processed is None:
+            return False
+        self._path, self._size, self.filename = processed
+        return True
+
+    def iter_base64(self, block_size=constants.EVIDENCE_BLOCK_SIZE):
+        """
+        Base64 encodes the evidence file block by block, going through the evidence cache
+
+        :param block_size: Size in bytes of each block read, must be a multiple of 3
+        :return:
+            Generator of base64 encoded strings
+        """
+        return evidence_cache.iter_base64(self._path, block_size)
+
+    @property
+    def data(self):
+        return ''.join(self.iter_base64())
+
+    @property
+    def path(self):
+        return self._path
+
+    def digest(self):
+        """
+        SHA-1 digest of the content of the evidence file, read block by block
+
+        :return:
+            Hexadecimal digest
+        """
+        digest = hashlib.sha1()
+        with open(self._path, 'rb') as evidence_file:
+            for block in iter(lambda: evidence_file.read(constants.EVIDENCE_BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @property
+    def size(self):
+        return self._size
+
+    def _ast(self):
+        return {"data": self.data, "filename": self.filename}
+
+    def _encoded_size(self):
+        # size of the JSON written by _iterencode, base64 takes 4 characters for each 3 bytes (or part of them)
+        return len('{"data": "", "filename": }') + 4 * ((self._size + 2) // 3) + \
+            len(json.dumps(self.filename).encode('utf-8'))
+
+    def _iterencode(self):
+        yield '{"data": "'
+        for block in self.iter_base64():
+            yield block
+        yield '", "filename": ' + json.dumps(self.filename) + '}'
+
+
+def _iter_file_base64(path, block_size):
+    """
+    Reads a file and base64 encodes it block by block
+
+    :param path: Path to the file
+    :param block_size: Size in bytes of each block read, must be a multiple of 3
+    :return:
+        Generator of base64 encoded strings
+    """
+    with open(path, "rb") as evidence_file:
+        block = evidence_file.read(block_size)
+        while block:
+            # Need to add decode because of Python3. In Python3, without decode, this would be a <class 'bytes'>
+            yield base64.b64encode(block).decode("utf-8")
+            block = evidence_file.read(block_size)
+
+
+class EvidenceCache:
+    """
+    Content addressed cache of base64 encoded evidences, so that each unique evidence file is read and encoded
+    once per run. Files are identified by path, size and modification time, and their content by its SHA-1 digest,
+    so identical screenshots saved to different files share the same encoded data.
+    Both maps are LRU, bounded by number of files and by size of the encoded data. Files whose encoded data can not
+    fit in the cache are streamed, without the cache.
+    The files and bytes read and encoded are counted, with or without cache.
 
     Args:
-        data (str): Base64 encoded string with the evidence data
-        filename (str): Evidence file name
+        max_bytes (int): Maximum size of the encoded evidences kept in cache. 0 disables the cache
+        max_entries (int): Maximum number of files whose digest is remembered
     """
 
-    def __init__(self, data, filename):
-        self.data = data
-        self.filename = filename
\ No newline at end of file
+    def __init__(self, max_bytes=constants.EVIDENCE_CACHE_SIZE, max_entries=constants.EVIDENCE_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.files_read = 0
+        self.bytes_read = 0
+        self.encoded_bytes = 0
+        self.deduplicated_bytes = 0
+        self._digests = OrderedDict()  # (path, size, mtime) -> digest
+        self._encoded = OrderedDict()  # digest -> base64 encoded content
+        self._encoded_bytes = 0
+        self._lock = threading.Lock()
+
+    def _touch(self, cache, key):
+        value = cache.pop(key, None)
+        if value is not None:
+            cache[key] = value
+        return value
+
+    def _store(self, digest, encoded):
+        if len(encoded) > self.max_bytes or digest in self._encoded:
+            return
+        self._encoded[digest] = encoded
+        self._encoded_bytes += len(encoded)
+        while self._encoded_bytes > self.max_bytes:
+            _, evicted = self._encoded.popitem(last=False)
+            self._encoded_bytes -= len(evicted)
+
+    def _lookup(self, path, stat, block_size):
+        """
+        Get the base64 encoded content of a file that fits in the cache, reading and encoding it only if it is not
+        cached. The file is hashed, then encoded if its content is not cached, block by block, so its raw content is
+        never held in memory
+
+        :param path: Path to the file
+        :param stat: Result of os.stat of the file
+        :param block_size: Size in bytes of each block read, must be a multiple of 3
+        :return:
+            Base64 encoded string
+        """
+        key = (path, stat.st_size, stat.st_mtime)
+
+        with self._lock:
+            digest = self._touch(self._digests, key)
+            encoded = self._touch(self._encoded, digest) if digest is not None else None
+            if encoded is not None:
+                self.deduplicated_bytes += stat.st_size
+                return encoded
+
+        start = time.perf_counter()
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as evidence_file:
+            for block in iter(lambda: evidence_file.read(block_size), b''):
+                sha1.update(block)
+        digest = sha1.hexdigest()
+        stats.add_time(constants.STATS_EVIDENCE_ENCODE, time.perf_counter() - start)
+
+        with self._lock:
+            self.files_read += 1
+            self.bytes_read += stat.st_size
+            self._digests[key] = digest
+            if len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+            encoded = self._touch(self._encoded, digest)
+            if encoded is not None:
+                # same content already encoded from another file
+                self.deduplicated_bytes += stat.st_size
+                return encoded
+
+        start = time.perf_counter()
+        encoded = ''.join(_iter_file_base64(path, block_size))
+        # the file was already counted when it was hashed
+        stats.add_time(constants.STATS_EVIDENCE_ENCODE, time.perf_counter() - start, 0)
+        with self._lock:
+            self.encoded_bytes += len(encoded)
+            self._store(digest, encoded)
+        return encoded
+
+    def _iter_uncached(self, path, size, block_size):
+        """
+        Base64 encodes a file block by block, without the cache
+
+        :param path: Path to the file
+        :param size: Size in bytes of the file
+        :param block_size: Size in bytes of each block read, must be a multiple of 3
+        :return:
+            Generator of base64 encoded strings
+        """
+        with self._lock:
+            self.files_read += 1
+            self.bytes_read += size
+        # only the time spent reading and encoding is counted, not the time the blocks are waiting to be sent
+        seconds = 0.0
+        encoded_bytes = 0
+        start = time.perf_counter()
+        for block in _iter_file_base64(path, block_size):
+            seconds += time.perf_counter() - start
+            encoded_bytes += len(block)
+            yield block
+            start = time.perf_counter()
+        stats.add_time(constants.STATS_EVIDENCE_ENCODE, seconds + time.perf_counter() - start)
+        with self._lock:
+            self.encoded_bytes += encoded_bytes
+
+    def iter_base64(self, path, block_size=constants.EVIDENCE_BLOCK_SIZE):
+        """
+        Base64 encodes a file, yielding the encoded data in blocks
+
+        :param path: Path to the file
+        :param block_size: Size in bytes of each block read, must be a multiple of 3
+        :return:
+            Generator of base64 encoded strings
+        """
+        stat = os.stat(path)
+        if not self.max_bytes or (stat.st_size + 2) // 3 * 4 > self.max_bytes:
+            # files that can not fit in the cache are streamed, without reading them whole
+            for block in self._iter_uncached(path, stat.st_size, block_size):
+                yield block
+            return
+
+        encoded = self._lookup(path, stat, block_size)
+        encoded_block_size = block_size // 3 * 4
+        for start in range(0, len(encoded), encoded_block_size):
+            yield encoded[start:start + encoded_block_size]
+
+
+# Evidence cache shared by every evidence of the run
+evidence_cache = EvidenceCache()
+
+# Stats of the run
+stats = Stats()
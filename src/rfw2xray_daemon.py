@@ -0,0 +1,427 @@
+import os
+import json
+import time
+import uuid
+import fnmatch
+import threading
+from collections import deque, OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+import constants
+
+
+def file_signature(xml_file):
+    """
+    Identify the content of an output file by its path, size and modification time
+
+    :param xml_file: Path to the output file
+    :return:
+        Signature string
+    """
+    stat = os.stat(xml_file)
+    return constants.DAEMON_SIGNATURE.format(os.path.abspath(xml_file), stat.st_size, stat.st_mtime_ns)
+
+
+def is_complete(xml_file):
+    """
+    Check if Robot Framework finished writing an output file, which it writes while the tests run.
+    Compressed files are taken as complete, as they are only compressed once the run is over
+
+    :param xml_file: Path to the output file
+    :return:
+        Boolean value, True if the file ends with the closing robot tag
+    """
+    if xml_file.endswith((constants.INPUT_GZIP_EXTENSION, constants.INPUT_ZSTANDARD_EXTENSION)):
+        return True
+    with open(xml_file, 'rb') as output_file:
+        output_file.seek(0, os.SEEK_END)
+        output_file.seek(max(0, output_file.tell() - constants.DAEMON_TAIL_SIZE))
+        return constants.DAEMON_ROBOT_END in output_file.read()
+
+
+class ModelCache:
+    """
+    Class that keeps the test executions parsed from the last output files, by file signature, so that a file
+    submitted again unchanged (e.g. after an upload that failed) is not parsed again
+
+    Args:
+        max_entries (int): Maximum number of output files kept, the least recently used are dropped. 0 disables it
+    """
+
+    def __init__(self, max_entries=constants.MODEL_CACHE_DEFAULT):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, signature):
+        with self._lock:
+            test_execs = self._entries.get(signature)
+            if test_execs is not None:
+                self._entries.move_to_end(signature)
+            return test_execs
+
+    def put(self, signature, test_execs):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[signature] = test_execs
+            self._entries.move_to_end(signature)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class ImportQueue:
+    """
+    Class that queues the output files to import, handing them out in batches. A file already waiting is not
+    queued twice
+    """
+
+    def __init__(self):
+        self._files = deque()
+        self._condition = threading.Condition()
+        self.closed = False
+
+    def __len__(self):
+        return len(self._files)
+
+    def put(self, xml_file):
+        """
+        Queue an output file
+
+        :param xml_file: Path to the output file
+        :return:
+            Boolean value, False if the file was already waiting
+        """
+        with self._condition:
+            if xml_file in self._files:
+                return False
+            self._files.append(xml_file)
+            self._condition.notify()
+            return True
+
+    def get_batch(self, window, max_files):
+        """
+        Wait for the next batch of output files: once a file is queued, the files queued during the batch window
+        are imported with it, up to max_files
+
+        :param window: Seconds waited for more files after the first one
+        :param max_files: Maximum number of files in a batch
+        :return:
+            List of output files, None once the queue is closed
+        """
+        with self._condition:
+            while not self._files and not self.closed:
+                self._condition.wait()
+            deadline = time.monotonic() + window
+            while len(self._files) < max_files and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if self.closed:
+                return None
+            return [self._files.popleft() for _ in range(min(max_files, len(self._files)))]
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class ImportDaemon:
+    """
+    Class that imports the output files queued by the watcher and the HTTP endpoint, a batch at a time, keeping
+    the state of the last files imported
+
+    Args:
+        import_batch (callable): Function importing a list of output files, returning for each file the keys of
+            its test executions or the exception that made it fail
+        batch_window (float): Seconds waited for more files once a file is queued
+        batch_size (int): Maximum number of files imported in a batch
+    """
+
+    def __init__(self, import_batch, batch_window=constants.BATCH_WINDOW_DEFAULT,
+                 batch_size=constants.BATCH_SIZE_DEFAULT):
+        self.import_batch = import_batch
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.queue = ImportQueue()
+        self.results = OrderedDict()
+        self._spooled = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _set_result(self, xml_file, state, **values):
+        with self._lock:
+            self.results.pop(xml_file, None)
+            self.results[xml_file] = dict(values, state=state)
+            while len(self.results) > constants.DAEMON_RESULTS_ENTRIES:
+                self.results.popitem(last=False)
+
+    def result(self, xml_file):
+        with self._lock:
+            return self.results.get(xml_file)
+
+    def status(self):
+        with self._lock:
+            return {constants.DAEMON_QUEUED_KEY: len(self.queue), constants.DAEMON_FILES_KEY: dict(self.results)}
+
+    def submit(self, xml_file, spooled=False):
+        """
+        Queue an output file to import
+
+        :param xml_file: Path to the output file
+        :param spooled: Whether the file was written by the daemon, and is removed once imported
+        """
+        xml_file = os.path.abspath(xml_file)
+        if spooled:
+            self._spooled.add(xml_file)
+        # the state is set first, the file may be imported as soon as it is queued
+        self._set_result(xml_file, constants.DAEMON_STATE_QUEUED)
+        if self.queue.put(xml_file):
+            print(constants.DAEMON_QUEUED_MESSAGE.format(xml_file))
+        return xml_file
+
+    def run(self):
+        """
+        Import the queued files, a batch at a time, until the daemon is stopped
+        """
+        while True:
+            batch = self.queue.get_batch(self.batch_window, self.batch_size)
+            if batch is None:
+                return
+            for xml_file in batch:
+                self._set_result(xml_file, constants.DAEMON_STATE_IMPORTING)
+            print(constants.DAEMON_BATCH_MESSAGE.format(len(batch)))
+
+            try:
+                results = self.import_batch(batch)
+            except Exception as e:
+                results = [e] * len(batch)
+
+            for xml_file, result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    error = constants.DAEMON_ERROR.format(type(result).__name__, result)
+                    self._set_result(xml_file, constants.DAEMON_STATE_FAILED, error=error)
+                    print(constants.DAEMON_FAILED_MESSAGE.format(xml_file, error))
+                else:
+                    self._set_result(xml_file, constants.DAEMON_STATE_IMPORTED, keys=result)
+                    print(constants.DAEMON_IMPORTED_MESSAGE.format(xml_file, ', '.join(result)))
+                if xml_file in self._spooled:
+                    self._spooled.discard(xml_file)
+                    os.remove(xml_file)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the daemon once the batch being imported is done. Files still queued are not imported
+        """
+        self.queue.close()
+        if self._thread:
+            self._thread.join()
+
+
+class DirectoryWatcher:
+    """
+    Class that polls a directory, and its subdirectories, for output files, and submits them to the daemon once
+    Robot Framework finished writing them. Files found on the first scan were imported before, and are only
+    imported again if they change
+
+    Args:
+        daemon (ImportDaemon): Daemon the output files are submitted to
+        directory (str): Directory watched
+        patterns (list): Glob patterns of the names of the output files
+        settle (float): Seconds an output file must be left unchanged before it is imported
+        interval (float): Seconds between scans of the directory
+    """
+
+    def __init__(self, daemon, directory, patterns=None, settle=constants.WATCH_SETTLE_DEFAULT,
+                 interval=constants.DAEMON_POLL_INTERVAL):
+        self.daemon = daemon
+        self.directory = directory
+        self.patterns = patterns or constants.WATCH_PATTERN_DEFAULT
+        self.settle = settle
+        self.interval = interval
+        self._imported = {}  # path -> signature submitted
+        self._changing = {}  # path -> (signature, time it was first seen)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _output_files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns):
+                    yield os.path.abspath(os.path.join(root, name))
+
+    def scan(self, first=False):
+        """
+        Scan the directory once, submitting the output files left unchanged for the settle time
+
+        :param first: Whether it is the first scan, which takes the complete files found as imported
+        """
+        now = time.monotonic()
+        found = set()
+        for xml_file in self._output_files():
+            try:
+                signature = file_signature(xml_file)
+            except OSError:
+                # removed while scanning
+                continue
+            found.add(xml_file)
+            if self._imported.get(xml_file) == signature:
+                continue
+            if first and is_complete(xml_file):
+                self._imported[xml_file] = signature
+                continue
+
+            changing = self._changing.get(xml_file)
+            if changing is None or changing[0] != signature:
+                self._changing[xml_file] = (signature, now)
+            elif now - changing[1] >= self.settle and is_complete(xml_file):
+                del self._changing[xml_file]
+                self._imported[xml_file] = signature
+                self.daemon.submit(xml_file)
+
+        for xml_file in set(self._imported) - found:
+            del self._imported[xml_file]
+        for xml_file in set(self._changing) - found:
+            del self._changing[xml_file]
+
+    def run(self):
+        self.scan(first=True)
+        while not self._stopped.wait(self.interval):
+            self.scan()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ImportServer:
+    """
+    Class that runs the local HTTP endpoint of the daemon in a background thread:
+        POST /import?path=FILE queues an output file the daemon can read
+        POST /import with the output XML as body (gzip compressed with Content-Encoding: gzip) queues it
+        GET /status returns the files queued and the state of the last files imported; GET /status?path=FILE
+        returns the state of a file
+
+    Args:
+        daemon (ImportDaemon): Daemon the output files are submitted to
+        address (str): [HOST:]PORT to listen on, HOST defaults to the local interface only
+        spool (str): Directory where the output XML bodies are written until they are imported
+    """
+
+    def __init__(self, daemon, address, spool):
+        host, _, port = address.rpartition(':')
+        self.daemon = daemon
+        self.spool = spool
+        self.server = _ThreadingHTTPServer((host or constants.SERVE_HOST_DEFAULT, int(port)), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server.server_address[:2])
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _spool_body(self, rfile, length, compressed):
+        """
+        Write a request body to the spool directory, a block at a time
+
+        :return:
+            Path to the spooled output file
+        """
+        extension = constants.DAEMON_SPOOL_EXTENSION + (constants.INPUT_GZIP_EXTENSION if compressed else '')
+        xml_file = os.path.join(self.spool, uuid.uuid4().hex + extension)
+        with open(xml_file, 'wb') as spool_file:
+            while length > 0:
+                block = rfile.read(min(length, constants.DAEMON_SPOOL_BLOCK_SIZE))
+                if not block:
+                    raise IOError(constants.DAEMON_INCOMPLETE_BODY)
+                spool_file.write(block)
+                length -= len(block)
+        return xml_file
+
+    def _handler(self):
+        import_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, code, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get('Content-Length', 0))
+                if url.path != constants.SERVE_IMPORT_PATH:
+                    self.rfile.read(length)
+                    self._send_json(404, {constants.DAEMON_ERROR_KEY: constants.DAEMON_NOT_FOUND})
+                    return
+
+                paths = parse_qs(url.query).get(constants.SERVE_PATH_PARAMETER)
+                if paths:
+                    self.rfile.read(length)
+                    if not os.path.isfile(paths[0]):
+                        self._send_json(404, {constants.DAEMON_ERROR_KEY: constants.DAEMON_NO_FILE.format(paths[0])})
+                        return
+                    xml_file = import_server.daemon.submit(paths[0])
+                elif length:
+                    compressed = self.headers.get('Content-Encoding', '').lower() == constants.SERVE_GZIP_ENCODING
+                    xml_file = import_server.daemon.submit(
+                        import_server._spool_body(self.rfile, length, compressed), spooled=True)
+                else:
+                    self._send_json(400, {constants.DAEMON_ERROR_KEY: constants.DAEMON_NO_OUTPUT})
+                    return
+                self._send_json(202, dict(import_server.daemon.result(xml_file) or {},
+                                          **{constants.DAEMON_FILE_KEY: xml_file}))
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != constants.SERVE_STATUS_PATH:
+                    self._send_json(404, {constants.DAEMON_ERROR_KEY: constants.DAEMON_NOT_FOUND})
+                    return
+                paths = parse_qs(url.query).get(constants.SERVE_PATH_PARAMETER)
+                if not paths:
+                    self._send_json(200, import_server.daemon.status())
+                    return
+                result = import_server.daemon.result(os.path.abspath(paths[0]))
+                if result is None:
+                    self._send_json(404, {constants.DAEMON_ERROR_KEY: constants.DAEMON_NO_FILE.format(paths[0])})
+                else:
+                    self._send_json(200, result)
+
+        return Handler
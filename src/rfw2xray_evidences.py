@@ -0,0 +1,158 @@
+import os
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import constants
+from rfw2xray_classes import stats
+
+# Optional, only needed to recompress, downscale or convert image evidences
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class EvidenceProcessor:
+    """
+    Class that makes evidence files smaller before they are base64 encoded, in a pool of threads, so that the
+    output file is parsed while its evidences are processed. Images are downscaled to a maximum dimension,
+    converted to another format or recompressed losslessly, and written to a temporary directory; the original
+    file is kept when processing does not make it smaller. Evidences still bigger than the size cap, after being
+    downscaled further, are dropped.
+    Each evidence file is processed once, however many times it is referenced.
+
+    Args:
+        max_dimension (int): Maximum width and height of the images, in pixels. 0 for no limit
+        image_format (str): Format the images are converted to, one of EVIDENCE_FORMAT_CHOICES. None keeps it
+        quality (int): Quality of the lossy formats, from 1 to 100
+        optimize (bool): Whether to recompress the images losslessly, as small as the format allows
+        max_bytes (int): Maximum size of an evidence file, in bytes. 0 for no limit
+        workers (int): Number of threads processing evidences. 0 for one per CPU
+    """
+
+    def __init__(self, max_dimension=0, image_format=None, quality=constants.EVIDENCE_QUALITY_DEFAULT,
+                 optimize=False, max_bytes=0, workers=0):
+        if Image is None and (max_dimension or image_format or optimize):
+            raise ImportError(constants.EVIDENCE_PILLOW_MISSING)
+        self.max_dimension = max_dimension
+        self.image_format = constants.EVIDENCE_FORMATS[image_format] if image_format else None
+        self.quality = quality
+        self.optimize = optimize
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+        self._directory = tempfile.mkdtemp(prefix=constants.EVIDENCE_PROCESSED_PREFIX)
+        self._futures = {}  # (path, size, mtime) -> future of the processed evidence
+        self._lock = threading.Lock()
+
+    def submit(self, path):
+        """
+        Start processing an evidence file, unless it was already started
+
+        :param path: Path to the evidence file
+        :return:
+            Future of a tuple with the path, size and filename of the processed evidence, None if it is dropped
+        """
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._executor.submit(self._process, path, stat.st_size)
+                self._futures[key] = future
+            return future
+
+    def close(self):
+        """
+        Stop the threads and remove the processed evidences
+        """
+        self._executor.shutdown()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _process(self, path, size):
+        start = time.perf_counter()
+        try:
+            processed = self._process_image(path, size)
+        except (OSError, ValueError):
+            # not an image Pillow can read and write
+            processed = self._unprocessed(path, size)
+        finally:
+            stats.add_time(constants.STATS_EVIDENCE_PROCESS, time.perf_counter() - start)
+
+        if processed is None:
+            stats.add(constants.STATS_EVIDENCES_DROPPED)
+        else:
+            stats.add(constants.STATS_EVIDENCE_BYTES_SAVED, size - processed[1])
+        return processed
+
+    def _unprocessed(self, path, size):
+        """
+        Keep an evidence file as it is, unless it is bigger than the size cap
+
+        :return:
+            Tuple with the path, size and filename of the evidence, None if it is dropped
+        """
+        if self.max_bytes and size > self.max_bytes:
+            return None
+        return path, size, os.path.basename(path)
+
+    def _process_image(self, path, size):
+        if Image is None:
+            return self._unprocessed(path, size)
+        filename = os.path.basename(path)
+        original = path, size, filename
+
+        with Image.open(path) as image:
+            image_format = self.image_format or image.format
+            scale = 1.0
+            if self.max_dimension and max(image.size) > self.max_dimension:
+                scale = float(self.max_dimension) / max(image.size)
+            downscaled = scale < 1.0
+            fits = not self.max_bytes or size <= self.max_bytes
+            # saving a lossy format again is not lossless, so only lossless formats are recompressed in place
+            recompressed = self.optimize and image_format not in constants.EVIDENCE_LOSSY_FORMATS
+            if fits and not downscaled and image_format == image.format and not recompressed:
+                return original
+
+            processed = self._save(image, image_format, scale, filename)
+            for _ in range(constants.EVIDENCE_CAP_ATTEMPTS):
+                if not self.max_bytes or processed[1] <= self.max_bytes:
+                    break
+                os.remove(processed[0])
+                scale *= constants.EVIDENCE_CAP_SCALE
+                processed = self._save(image, image_format, scale, filename)
+
+        if self.max_bytes and processed[1] > self.max_bytes:
+            os.remove(processed[0])
+            return None
+        if fits and not downscaled and processed[1] >= size:
+            # processing did not make it smaller
+            os.remove(processed[0])
+            return original
+        return processed
+
+    def _save(self, image, image_format, scale, filename):
+        """
+        Write an image scaled and in the given format to the temporary directory
+
+        :return:
+            Tuple with the path, size and filename of the image written
+        """
+        if scale < 1.0:
+            image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                                 Image.LANCZOS)
+        if image_format in constants.EVIDENCE_OPAQUE_FORMATS and image.mode not in constants.EVIDENCE_OPAQUE_MODES:
+            image = image.convert(constants.EVIDENCE_OPAQUE_MODE)
+
+        options = constants.EVIDENCE_SAVE_OPTIONS.get(image_format, {})
+        if image_format in constants.EVIDENCE_LOSSY_FORMATS:
+            options = dict(options, quality=self.quality)
+        elif self.optimize:
+            options = dict(options, optimize=True)
+
+        extension = constants.EVIDENCE_EXTENSIONS.get(image_format, os.path.splitext(filename)[1])
+        path = os.path.join(self._directory, uuid.uuid4().hex + extension)
+        image.save(path, image_format, **options)
+        return path, os.path.getsize(path), os.path.splitext(filename)[0] + extension
@@ -27,22 +27,42 @@ import argparse
 from argparse import RawTextHelpFormatter
 import sys 
 if sys.version_info[0] < 3: # Python 2
-    from urlparse import urljoin
+    from urlparse import urljoin, urlparse
 else:
-    from urllib.parse import urljoin
+    from urllib.parse import urljoin, urlparse
 import requests
+import urllib3
 import json
 import os
 import lxml.etree as ET
 import re
-import base64
 import time
 from datetime import datetime
-from functools import reduce # Needed for Python 3
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
+import random
+import uuid
+import email.utils
+import glob
+import cProfile
+import tracemalloc
+import signal
+import shutil
+import tempfile
+import atexit
+import copy
+import mimetypes
 
 # Imports
 import constants
 from rfw2xray_classes import *
+from rfw2xray_filters import ProfilesFilter, compile_expression, read_filter_profiles
+import rfw2xray_input
+from rfw2xray_evidences import EvidenceProcessor
+from rfw2xray_daemon import DirectoryWatcher, ImportDaemon, ImportServer, ModelCache, file_signature
 
 
 
@@ -68,6 +88,9 @@ __status__ = "Development"
 evidence_KWs = ['Capture Page Screenshot']
 log_KWs = ['Log']
 
+# Processor making the evidences smaller while the output file is parsed, None to import them as they are
+evidence_processor = None
+
 
 def todict(obj, classkey=None):
     """
@@ -84,19 +107,186 @@ def todict(obj, classkey=None):
         for (k, v) in obj.items():
             data[k] = todict(v, classkey)
         return data
-    elif hasattr(obj, "_ast"):
-        return todict(obj._ast())
-    elif hasattr(obj, "__iter__") and not isinstance(obj, str):
+    elif isinstance(obj, (list, tuple)):
         return [todict(v, classkey) for v in obj]
-    elif hasattr(obj, "__dict__"):
-        data = dict([(key, todict(value, classkey))
-                     for key, value in obj.__dict__.items()
-                     if not callable(value) and not key.startswith('_')])
-        if classkey is not None and hasattr(obj, "__class__"):
+    elif isinstance(obj, constants.JSON_SCALAR_TYPES):
+        return obj
+    else:
+        # Classes serialize themselves with _ast, as a dict of their JSON fields
+        data = todict(obj._ast(), classkey)
+        if classkey is not None:
             data[classkey] = obj.__class__.__name__
         return data
+
+
+def iterencode(obj, sizes=False):
+    """
+    Generator that serializes Classes to JSON text incrementally, following the same rules as todict.
+    Nothing bigger than a single scalar value is built in memory.
+
+    :param obj: Class to serialize
+    :param sizes: If True, Classes that know the size of their JSON (evidences) give that size, in bytes,
+        instead of being serialized
+    :return:
+        Generator of JSON text fragments (or sizes)
+    """
+
+    if isinstance(obj, dict):
+        yield '{'
+        first = True
+        for (k, v) in obj.items():
+            yield ('' if first else ', ') + json.dumps(k) + ': '
+            for chunk in iterencode(v, sizes):
+                yield chunk
+            first = False
+        yield '}'
+    elif isinstance(obj, (list, tuple)):
+        yield '['
+        first = True
+        for v in obj:
+            if not first:
+                yield ', '
+            for chunk in iterencode(v, sizes):
+                yield chunk
+            first = False
+        yield ']'
+    elif isinstance(obj, constants.JSON_SCALAR_TYPES):
+        yield json.dumps(obj)
+    elif sizes and hasattr(obj, "_encoded_size"):
+        yield obj._encoded_size()
+    elif hasattr(obj, "_iterencode"):
+        for chunk in obj._iterencode():
+            yield chunk
     else:
-        return obj
+        for chunk in iterencode(obj._ast(), sizes):
+            yield chunk
+
+
+def encoded_size(obj):
+    """
+    Computes the size of the UTF-8 encoded JSON of a Class, without reading or encoding evidences
+
+    :param obj: Class to serialize
+    :return:
+        Size in bytes
+    """
+    size = 0
+    for fragment in iterencode(obj, sizes=True):
+        if isinstance(fragment, int):
+            size += fragment
+        else:
+            size += len(fragment.encode('utf-8'))
+    return size
+
+
+def _test_exec_chunk(test_exec, tests, first):
+    """
+    Create a test execution with part of the tests of another one. Only the first chunk carries the test execution info
+
+    :param test_exec: Test execution to split
+    :param tests: Tests of the chunk
+    :param first: Whether it is the first chunk
+    :return:
+        Test execution chunk
+    """
+    chunk = TestExec(tests)
+    chunk.testExecutionKey = test_exec.testExecutionKey
+    if first:
+        chunk.info = test_exec.info
+    return chunk
+
+
+def detach_evidences(test_exec):
+    """
+    Copy a test execution without the evidences of its tests and steps, so its results are imported without the
+    evidence data and the evidences are uploaded on their own. The test execution is left as it is.
+
+    :param test_exec: Test execution
+    :return:
+        Tuple with the copy of the test execution and its evidences, each evidence file once
+    """
+    evidences = OrderedDict()  # path -> evidence
+    tests = []
+    for test in test_exec.tests:
+        for evidence in _iter_evidences(test):
+            evidences.setdefault(evidence.path, evidence)
+        detached_test = copy.copy(test)
+        detached_test.evidences = []
+        detached_test.steps = []
+        for step in test.steps:
+            detached_step = copy.copy(step)
+            detached_step.evidences = []
+            detached_test.steps.append(detached_step)
+        tests.append(detached_test)
+    return _test_exec_chunk(test_exec, tests, True), list(evidences.values())
+
+
+def split_test_exec(test_exec, max_tests=0, max_bytes=0):
+    """
+    Split a test execution in chunks bounded by number of tests and by size of their JSON.
+    Sizes are estimated with encoded_size, so evidences are not encoded to compute them.
+    A single test bigger than max_bytes makes a chunk of its own.
+
+    :param test_exec: Test execution to split
+    :param max_tests: Maximum number of tests in a chunk. 0 for no limit
+    :param max_bytes: Maximum size in bytes of the JSON of a chunk. 0 for no limit
+    :return:
+        List of test executions. The first one creates the test execution, if it has no key, and the others
+        have to be imported with its key
+    """
+    if not max_tests and not max_bytes:
+        return [test_exec]
+
+    chunks = []
+    tests = []
+    overhead = encoded_size(_test_exec_chunk(test_exec, [], True)) if max_bytes else 0
+    chunk_bytes = overhead
+
+    for test in test_exec.tests:
+        test_bytes = encoded_size(test) + len(', ') if max_bytes else 0
+        if tests and ((max_tests and len(tests) >= max_tests) or
+                      (max_bytes and chunk_bytes + test_bytes > max_bytes)):
+            chunks.append(_test_exec_chunk(test_exec, tests, not chunks))
+            tests = []
+            chunk_bytes = overhead
+        tests.append(test)
+        chunk_bytes += test_bytes
+
+    if not chunks:
+        return [test_exec]
+    chunks.append(_test_exec_chunk(test_exec, tests, False))
+    return chunks
+
+
+def stream_json(obj, chunk_size=constants.JSON_CHUNK_SIZE):
+    """
+    Serializes a Class to UTF-8 encoded JSON, grouping the fragments of iterencode in chunks
+    of roughly chunk_size bytes so they can be used as a chunked request body
+
+    :param obj: Class to serialize
+    :param chunk_size: Minimum size in bytes of each chunk (except the last one)
+    :return:
+        Generator of bytes
+    """
+    buffer = []
+    buffered = 0
+    # only the time spent serializing is counted, not the time the chunks are waiting to be sent
+    start = time.perf_counter()
+    for fragment in iterencode(obj):
+        fragment = fragment.encode('utf-8')
+        buffer.append(fragment)
+        buffered += len(fragment)
+        if buffered >= chunk_size:
+            stats.add_time(constants.STATS_SERIALIZE, time.perf_counter() - start, 0)
+            stats.add(constants.STATS_JSON_BYTES, buffered)
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+            start = time.perf_counter()
+    stats.add_time(constants.STATS_SERIALIZE, time.perf_counter() - start)
+    stats.add(constants.STATS_JSON_BYTES, buffered)
+    if buffer:
+        yield b''.join(buffer)
 
 
 def _log_step(step, kw_xml, kw_name):
@@ -150,12 +340,9 @@ def _evidence_step(step, xml, kw_name, evidence_dir):
             # get path to the evidence
             evidence_src = os.path.join(os.path.dirname(evidence_dir), evidence_src_search.group(1))
 
-            # opens evidence file to encode to base64
-            with open(evidence_src, "rb") as evidence_file:
-                # Need to add decode because of Python3. In Python3, without decode, this would be a <class 'bytes'>, while in Pytho2 would be <type 'str'>. Because of that, in Python3 we would have b'string'
-                evidence_base64 = base64.b64encode(evidence_file.read()).decode("utf-8") 
-
-            step.add_evidence(TestEvidence(evidence_base64, os.path.basename(evidence_src)))
+            # the evidence file is only base64 encoded when the test execution is serialized
+            step.add_evidence(TestEvidence(evidence_src))
+            stats.add(constants.STATS_EVIDENCES)
         
         return True
     else:
@@ -178,6 +365,47 @@ def get_log_and_evidences_from_teststep(step_xml, teststep, xml_file):
         _evidence_step(teststep, kw_xml, kw_xml.attrib[constants.ATTRIB_NAME], xml_file)
 
 
+# Robot Framework timestamps already parsed
+_robot_dates = {}
+
+
+def _parse_robot_date(value):
+    """
+    Parse a Robot Framework timestamp in DATE_ROBOT_FRAMEWORK_FORMAT. The fixed format is matched with a precompiled
+    regular expression, much faster than strptime, and timestamps are memoized as keywords often share them
+
+    :param value: Timestamp string
+    :return:
+        Datetime of the timestamp
+    """
+    date = _robot_dates.get(value)
+    if date is None:
+        match = constants.DATE_ROBOT_FRAMEWORK_REGEX.match(value)
+        if match:
+            year, month, day, hour, minute, second, fraction = match.groups()
+            date = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                            int(fraction.ljust(6, '0')))
+        else:
+            # strptime reports the error, or parses the values the regular expression does not expect
+            date = datetime.strptime(value, constants.DATE_ROBOT_FRAMEWORK_FORMAT)
+        if len(_robot_dates) >= constants.DATE_CACHE_ENTRIES:
+            _robot_dates.clear()
+        _robot_dates[value] = date
+    return date
+
+
+def _status_times(status_elem):
+    """
+    Get the start and end times of a status XML element, parsed once for both dates and duration
+
+    :param status_elem: Status XML element
+    :return:
+        Tuple with the start and end datetimes
+    """
+    return (_parse_robot_date(status_elem.attrib[constants.ATTRIB_STARTTIME]),
+            _parse_robot_date(status_elem.attrib[constants.ATTRIB_ENDTIME]))
+
+
 def _parse_test_steps(xml_file, test_xml, test, test_steps_filter, evidences_import):
     """
     Parse a test xml element and add steps to test case class
@@ -193,9 +421,11 @@ def _parse_test_steps(xml_file, test_xml, test, test_steps_filter, evidences_imp
     if test_steps_filter or evidences_import != constants.EVIDENCES_SELECTION_NONE:
 
         previous_step = None
+        steps = 0
 
         # parse XML test case steps
         for step_xml in test_xml.findall(constants.KW_TAG):
+            steps += 1
             if constants.ATTRIB_TYPE in step_xml.attrib and step_xml.attrib[constants.ATTRIB_TYPE] == constants.SETUP:
                  #  Take into accoun if setup of test failed
                 if step_xml.find(constants.STATUS_TAG).attrib[constants.ATTRIB_STATUS] == constants.FAIL:
@@ -206,7 +436,8 @@ def _parse_test_steps(xml_file, test_xml, test, test_steps_filter, evidences_imp
             teststep_name = step_xml.attrib[constants.ATTRIB_NAME].replace("{", "\{").replace("}", "\}")
 
             # get test step status
-            teststep_status = step_xml.find(constants.STATUS_TAG).attrib[constants.ATTRIB_STATUS]
+            teststep_status_elem = step_xml.find(constants.STATUS_TAG)
+            teststep_status = teststep_status_elem.attrib[constants.ATTRIB_STATUS]
 
             teststep = TestStep(teststep_status)
 
@@ -298,11 +529,13 @@ def _parse_test_steps(xml_file, test_xml, test, test_steps_filter, evidences_imp
                     test.comment += teststep.comment
 
             # Start of Changing
-            test_status_elem = step_xml.find(constants.STATUS_TAG)
-            test_step_duration = datetime.strptime(test_status_elem.attrib[constants.ATTRIB_ENDTIME], constants.DATE_ROBOT_FRAMEWORK_FORMAT) - datetime.strptime(test_status_elem.attrib[constants.ATTRIB_STARTTIME], constants.DATE_ROBOT_FRAMEWORK_FORMAT)
+            test_step_start, test_step_end = _status_times(teststep_status_elem)
+            test_step_duration = test_step_end - test_step_start
             teststep.add_to_comment("\nDuration of test step (h:m:s.ms) = " + str(test_step_duration)[:-3]) # present the milisseconds with only 3 digits
             # End of Changing
 
+        stats.add(constants.STATS_STEPS, steps)
+
     return test
 
 
@@ -316,24 +549,20 @@ def _create_test_case(test_xml, test_key):
     # get test status
     test_status_elem = test_xml.find(constants.STATUS_TAG)
     test_status_value = test_status_elem.attrib[constants.ATTRIB_STATUS]
-    test_status_text = test_xml.find(constants.STATUS_TAG).text
+    test_status_text = test_status_elem.text
 
-    # get stat date time
-    test_start_date = datetime.strptime(test_status_elem.attrib[constants.ATTRIB_STARTTIME],
-                                        constants.DATE_ROBOT_FRAMEWORK_FORMAT).strftime(constants.DATE_XRAY_FORMAT)
-    # get end date time
-    test_finish_date = datetime.strptime(test_status_elem.attrib[constants.ATTRIB_ENDTIME],
-                                         constants.DATE_ROBOT_FRAMEWORK_FORMAT).strftime(constants.DATE_XRAY_FORMAT)
+    # get start and end date times
+    test_start, test_end = _status_times(test_status_elem)
+    test_start_date = test_start.strftime(constants.DATE_XRAY_FORMAT)
+    test_finish_date = test_end.strftime(constants.DATE_XRAY_FORMAT)
 
     # create a new TestClass object
-    test = TestCase(test_key, test_status_value)
-    test.start = test_start_date
-    test.finish = test_finish_date
+    test = TestCase(test_key, test_status_value, test_start_date, test_finish_date)
     if test_status_text:
         test.comment = test_status_text
 
     # Start of Changing
-    test_duration = datetime.strptime(test_status_elem.attrib[constants.ATTRIB_ENDTIME], constants.DATE_ROBOT_FRAMEWORK_FORMAT) - datetime.strptime(test_status_elem.attrib[constants.ATTRIB_STARTTIME], constants.DATE_ROBOT_FRAMEWORK_FORMAT)
+    test_duration = test_end - test_start
     if (test.comment) : # Something was already written
         test.comment += "\n\nDuration of test execution (h:m:s.ms) = " + str(test_duration)[:-3] # present the milisseconds with only 3 digits
     else:
@@ -343,27 +572,28 @@ def _create_test_case(test_xml, test_key):
     return test
 
 
-def _parse_test(element, tag_filter, filter_tests, test_steps_filter, evidences_import, xml_file):
+def _test_tags(element):
+    """
+    Get the tags of a test case XML element
+
+    :param element: Test XML element
+    :return: List with the tags text
+    """
+    return [tag_xml.text for tag_xml in element.iterfind(constants.XPATH_TAG) if tag_xml.text is not None]
+
+
+def _parse_test(element, test_steps_filter, evidences_import, xml_file):
     """
     Parse a test case XML element and create a Test Case class with its steps
     :param element: Current test XML element
-    :param tag_filter: Filtering of tags
-    :param filter_tests: Dict to add the filtered tests
     :param test_steps_filter: Filtering of test steps
     :param evidences_import: Evidences selection
     :param xml_file: XML file
     :return: A test case class with all its steps; a JIRA test execution key if found
     """
-    tag_found = ''
     testexec_key = constants.NO_TESTEXEC_KEY
     test_key = ''
-    tags_text = element.xpath(constants.XPATH_TAG_TEXT)
-
-    for tag_text in tags_text:
-
-        if tag_filter:
-            if tag_text in import_filters[constants.FILTER_TAG_KEY]:
-                tag_found = tag_text
+    for tag_text in _test_tags(element):
 
         splitted_tag_text = tag_text.split(constants.TEST_TAG_SEPARATOR)
         # verify if tag has the label JIRA_TEST
@@ -374,149 +604,298 @@ def _parse_test(element, tag_filter, filter_tests, test_steps_filter, evidences_
         if constants.JIRA_TESTEXEC_TAG == splitted_tag_text[0]:
             testexec_key = splitted_tag_text[1]
 
+    start = time.perf_counter()
     test_case = _create_test_case(element, test_key)
+    step_start = time.perf_counter()
     test_case = _parse_test_steps(xml_file, element, test_case, test_steps_filter,
                                   evidences_import)  # create a test case object and adds steps to it
+    end = time.perf_counter()
+    stats.add_time(constants.STATS_STEP_PARSE, end - step_start)
+    stats.add_time(constants.STATS_TEST_PARSE, end - start)
+    stats.add(constants.STATS_TESTS)
 
-    if tag_filter:
-        if tag_found:
-            filter_tests[constants.FILTER_TAG_KEY].append(test_case)
+    return test_case, testexec_key
 
 
-    return test_case, testexec_key
+def _parse_tests_xml(tests_xml, test_steps_filter, evidences_import, xml_file):
+    """
+    Parse a batch of serialized test case XML elements. Runs in the worker processes
+
+    :param tests_xml: List of test XML elements serialized as bytes
+    :param test_steps_filter: Filtering of test steps
+    :param evidences_import: Evidences selection
+    :param xml_file: XML file
+    :return: List with the result of _parse_test for each test; timers and counters of the worker for the batch
+    """
+    results = [_parse_test(ET.fromstring(test_xml), test_steps_filter, evidences_import, xml_file)
+               for test_xml in tests_xml]
+    return results, stats.pop()
 
 
-def _get_test_date(element, date_attrib):
-    status = element.find(constants.STATUS_TAG)
-    if status is not None:
-        if status.attrib[constants.ATTRIB_ENDTIME] != constants.NO_VALUE:
-            # get end date time
-            return datetime.strptime(status.attrib[date_attrib],
-                                                  constants.DATE_ROBOT_FRAMEWORK_FORMAT).strftime(
-                constants.DATE_XRAY_FORMAT)
+def _init_worker():
+    """
+    Starts the stats of a worker process empty, as it may be forked with the stats of the main process.
+    Evidences are processed by the main process only
+    """
+    global evidence_processor
+    evidence_processor = None
+    stats.reset()
 
 
-def filtering_import(xml_file, test_steps_filter, evidences_import, import_filters, filter_option, **kwargs):
+def _iter_evidences(test):
     """
-    Imports with filtering and return a test execution
-    :param xml_file: Robot Framework output XML file
-    :param test_steps_filter: Filtering of test steps
-    :param evidences_import: Evidences Selection
-    :param import_filters: Importation filters
-    :param filter_option: Filter option, either intersaction or union
-    :return: Test execution with the filters applied
+    Get the evidences of a test case and of its steps
+
+    :param test: Test case
+    :return:
+        Generator of evidences
     """
-    filters_tests = {}
+    for evidence in test.evidences:
+        yield evidence
+    for step in test.steps:
+        for evidence in step.evidences:
+            yield evidence
 
-    test_suite_filter = False
-    test_case_filter = False
-    tag_filter = False
 
-    if constants.FILTER_TEST_SUITE_KEY in import_filters:
-        test_suite_filter = True
-        filters_tests[constants.FILTER_TEST_SUITE_KEY] = []
+def _process_evidences(test):
+    """
+    Starts processing the evidences of a test case, if there is an evidence processor
 
-    if constants.FILTER_TEST_CASE_KEY in import_filters:
-        test_case_filter = True
-        filters_tests[constants.FILTER_TEST_CASE_KEY] = []
+    :param test: Test case
+    """
+    if evidence_processor is not None:
+        for evidence in _iter_evidences(test):
+            evidence.process(evidence_processor)
 
-    if constants.FILTER_TAG_KEY in import_filters:
-        tag_filter = True
-        filters_tests[constants.FILTER_TAG_KEY] = []
 
+def _iter_parsed_elements(xml_file, test_filter, test_steps_filter, evidences_import, workers=0):
+    """
+    Parse the test and suite XML elements of a Robot Framework output XML file.
+    Test cases not selected by the test filter are not parsed.
+    With workers, the test elements are cut out of the file and parsed by a pool of processes, in batches,
+    while the file is read. The results are always given in document order.
 
-    tests = []
+    :param xml_file: Robot Framework output XML file, compressed or INPUT_STDIN as read by rfw2xray_input
+    :param test_filter: Function selecting test cases by name, tags and suite names. None selects every test case
+    :param test_steps_filter: Filtering of test steps
+    :param evidences_import: Evidences selection
+    :param workers: Number of worker processes. 0 parses the tests in this process
+    :return:
+        Generator of (tag, suite names, parsed test) for each element, where suite names are the names of the suites
+        that contain the element (or the element itself) and parsed test is the result of _parse_test (None for
+        suites and test cases not selected)
+    """
+
+    def _selected(element, suite_names):
+        return test_filter is None or test_filter(element.get(constants.ATTRIB_NAME), _test_tags(element),
+                                                  suite_names)
+
+    def _iter_elements():
+        """
+        Reads the test and suite elements when they end, keeping a stack with the names of the open suites.
+        Once handled, an element is cleared and removed from its parent with the siblings before it (already
+        handled as well), so each element is released in constant time.
+        """
+        suite_names = []
+        # the time spent reading the file, without the time the elements are handled by the caller
+        read_seconds = 0.0
+        start = time.perf_counter()
+        for event, element in rfw2xray_input.iterparse(xml_file, events=(constants.EVENT_START, constants.EVENT_END),
+                                                       tag=(constants.TEST_TAG, constants.SUITE_TAG)):
+            if event == constants.EVENT_START:
+                if element.tag == constants.SUITE_TAG:
+                    suite_names.append(element.get(constants.ATTRIB_NAME))
+                continue
+
+            read_seconds += time.perf_counter() - start
+            yield element, tuple(suite_name for suite_name in suite_names if suite_name is not None)
+            start = time.perf_counter()
+
+            if element.tag == constants.SUITE_TAG:
+                suite_names.pop()
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+        stats.add_time(constants.STATS_XML_READ, read_seconds + time.perf_counter() - start)
+
+    if not workers:
+        for element, suite_names in _iter_elements():
+            parsed = None
+            if element.tag == constants.TEST_TAG and _selected(element, suite_names):
+                parsed = _parse_test(element, test_steps_filter, evidences_import, xml_file)
+                _process_evidences(parsed[0])
+            yield element.tag, suite_names, parsed
+        return
+
+    # entries waiting to be given in document order: [tag, suite names, batch future, index in batch]
+    pending = deque()
+    batch, batch_entries = [], []
+    in_flight = deque()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+
+        def _submit():
+            future = executor.submit(_parse_tests_xml, batch[:], test_steps_filter, evidences_import, xml_file)
+            for entry in batch_entries:
+                entry[2] = future
+            in_flight.append(future)
+            del batch[:], batch_entries[:]
+
+        def _ready(limit):
+            while pending and (pending[0][0] != constants.TEST_TAG or pending[0][2] is not None):
+                tag, suite_names, future, index = pending[0]
+                if future is not None:
+                    if len(in_flight) <= limit and not future.done():
+                        return
+                    results, worker_stats = future.result()
+                    if index == len(results) - 1:
+                        in_flight.popleft()
+                        stats.merge(*worker_stats)
+                    _process_evidences(results[index][0])
+                    yield tag, suite_names, results[index]
+                else:
+                    yield tag or constants.TEST_TAG, suite_names, None
+                pending.popleft()
+
+        for element, suite_names in _iter_elements():
+            entry = [element.tag, suite_names, None, None]
+            if element.tag == constants.TEST_TAG and not _selected(element, suite_names):
+                # given as a suite would be, there is nothing to wait for
+                entry[0] = None
+            elif element.tag == constants.TEST_TAG:
+                entry[3] = len(batch)
+                batch.append(ET.tostring(element))
+                batch_entries.append(entry)
+            pending.append(entry)
+
+            if len(batch) >= constants.WORKERS_BATCH_SIZE:
+                _submit()
+            for result in _ready(workers * constants.WORKERS_QUEUE_SIZE):
+                yield result
+
+        if batch:
+            _submit()
+        for result in _ready(0):
+            yield result
+
+
+def _filtered_test_execs(tests, test_testexec_key, import_filters, name, profile=None, **kwargs):
+    """
+    Group the test cases selected by the filters in test executions, by test execution key
+    :param tests: Test cases selected
+    :param test_testexec_key: Test execution key by test key
+    :param import_filters: Importation filters
+    :param name: Name of the top suite, for the summary of new test executions
+    :param profile: Name of the filter profile, None when filtering without profiles
+    :return: Test executions with the test cases selected
+    """
     test_execs = {}
-    test_testexec_key = {}
-    name = ''
 
-    for event, element in ET.iterparse(xml_file, tag=(constants.TEST_TAG, constants.SUITE_TAG)):
+    filter_key_value = []
+    if profile is not None:
+        filter_key_value.append('{}_{}'.format(constants.FILTER_PROFILE_KEY, profile))
+    for key, value in import_filters.items():
+        value_filters = '_'.join(value)
+        filter_key_value.append('{}_{}'.format(key, value_filters))
 
-        if element.tag == constants.TEST_TAG:
-            test_case, testexec_key = _parse_test(element, tag_filter, filters_tests, test_steps_filter,
-                                                  evidences_import, xml_file)
+    tests = sorted(tests, key=lambda test: test.testKey)
 
-            test_testexec_key[test_case.testKey] = testexec_key
+    for test in tests:
+        testexec_key = test_testexec_key[test.testKey]
+        if testexec_key in test_execs:
+            test_execs[testexec_key].tests.append(test)
+        else:
+            test_exec = TestExec([test])
+            if testexec_key != constants.NO_TESTEXEC_KEY:
+                test_exec.testExecutionKey = testexec_key
+            else:
+                test_exec_info = TestExecInfo(**kwargs)
 
-            if test_case_filter:
-                if element.attrib[constants.ATTRIB_NAME] in import_filters[constants.FILTER_TEST_CASE_KEY]:
-                    filters_tests[constants.FILTER_TEST_CASE_KEY].append(test_case)
-            tests.append(test_case)
+                test_exec_info.summary = test_exec_info.summary.format(name, ':'.join(filter_key_value) + '-' +
+                                                                       str(time.time()))
+                test_exec.info = test_exec_info
 
-        if element.tag == constants.SUITE_TAG and constants.ATTRIB_NAME in element.attrib:
-            if test_suite_filter:
-                for ancestor in element.xpath(constants.XPATH_ANCESTOR):
-                    if constants.ATTRIB_NAME in ancestor.attrib:
-                        if ancestor.attrib[constants.ATTRIB_NAME] in import_filters[constants.FILTER_TEST_SUITE_KEY]:
-                            filters_tests[constants.FILTER_TEST_SUITE_KEY] += tests
+            test_execs[testexec_key] = test_exec
 
-            tests = []
+    return test_execs
 
-        #get test execution name
-        if not name:
-            for ancestor in element.xpath(constants.XPATH_ANCESTOR_SUITE):
-                name = ancestor.attrib[constants.ATTRIB_NAME]
-                break
-
-        element.clear()
-        for ancestor in element.xpath(constants.XPATH_ANCESTOR):
-            while ancestor.getprevious() is not None:
-                del ancestor.getparent()[0]
-
-    if test_suite_filter or test_case_filter or tag_filter:
-        filter_key_value = []
-        tests = []
-        for key, value in import_filters.items():
-            value_filters = '_'.join(value)
-            filter_key_value.append('{}_{}'.format(key, value_filters))
-            tests.append(set(filters_tests[key]))
-        
 
-        if filter_option == constants.FILTER_OPTION_AND:
-            result = reduce(set.intersection, tests)
-        else:
-            result = reduce(set.union,tests)
+def profiles_import(xml_file, test_steps_filter, evidences_import, profiles, workers=0, **kwargs):
+    """
+    Imports with several filter profiles from a single parse of the output file. Each test case is parsed once and
+    given to every profile that selects it, so the profiles share the test cases and their encoded evidences
+    :param xml_file: Robot Framework output XML file
+    :param test_steps_filter: Filtering of test steps
+    :param evidences_import: Evidences Selection
+    :param profiles: Importation filters and filter option, by profile name
+    :param workers: Number of processes parsing test cases. 0 parses them in this process
+    :return: Test executions with the filters of each profile applied, by profile name
+    """
+    profiles_filter = ProfilesFilter(profiles)
 
-        result = sorted(list(result), key=lambda test: test.testKey)
+    results = OrderedDict((profile, []) for profile in profiles)
+    test_testexec_key = {}
+    name = ''
 
-        for test in result:
-            testexec_key = test_testexec_key[test.testKey]
-            if testexec_key in test_execs:
-                test_execs[testexec_key].tests.append(test)
-            else:
-                test_exec = TestExec([test])
-                if testexec_key != constants.NO_TESTEXEC_KEY:
-                    test_exec.testExecutionKey = testexec_key
-                else:
-                    test_exec_info = TestExecInfo(**kwargs)
+    for tag, suite_names, parsed in _iter_parsed_elements(xml_file, profiles_filter, test_steps_filter,
+                                                          evidences_import, workers):
 
-                    test_exec_info.summary = test_exec_info.summary.format(name, ':'.join(filter_key_value) + '-' +
-                                                                           str(time.time()))
-                    test_exec.info = test_exec_info
+        if tag == constants.TEST_TAG and parsed is not None:
+            test_case, testexec_key = parsed
+            test_testexec_key[test_case.testKey] = testexec_key
+            for profile in profiles_filter.pop_selection():
+                results[profile].append(test_case)
 
-                test_execs[testexec_key] = test_exec
+        #get test execution name
+        if not name:
+            # the names of the enclosing suites, without the suite itself
+            ancestor_suites = suite_names if tag == constants.TEST_TAG else suite_names[:-1]
+            if ancestor_suites:
+                name = ancestor_suites[0]
 
-    return test_execs
+    return OrderedDict((profile, _filtered_test_execs(results[profile], test_testexec_key, profiles[profile][0],
+                                                      name, profile, **kwargs))
+                       for profile in profiles)
 
 
-def no_filtering_import(xml_file, test_steps_filter, evidences_import, **kwargs):
+def filtering_import(xml_file, test_steps_filter, evidences_import, import_filters, filter_option, workers=0,
+                     **kwargs):
+    """
+    Imports with filtering and return a test execution
+    :param xml_file: Robot Framework output XML file
+    :param test_steps_filter: Filtering of test steps
+    :param evidences_import: Evidences Selection
+    :param import_filters: Importation filters
+    :param filter_option: Filter option, either intersaction or union
+    :param workers: Number of processes parsing test cases. 0 parses them in this process
+    :return: Test execution with the filters applied
+    """
+    if not import_filters:
+        return {}
+    return profiles_import(xml_file, test_steps_filter, evidences_import, {None: (import_filters, filter_option)},
+                           workers, **kwargs)[None]
+
+
+def no_filtering_import(xml_file, test_steps_filter, evidences_import, workers=0, **kwargs):
     """
     Import XML file with no filtering
     :param xml_file: Robot Framework XML output file
     :param test_steps_filter: Filtering of test steps
     :param evidences_import: Evidences selection
+    :param workers: Number of processes parsing test cases. 0 parses them in this process
     :return: Test executions to import
     """
     test_execs = {}
-    test_case_list = []
 
-    for event, element in ET.iterparse(xml_file, tag=(constants.TEST_TAG, constants.SUITE_TAG)):
+    for tag, suite_names, parsed in _iter_parsed_elements(xml_file, None, test_steps_filter, evidences_import,
+                                                          workers):
 
-        if element.tag == constants.TEST_TAG:
-            test_case, testexec_key = _parse_test(element, False, {},
-                                                  test_steps_filter, evidences_import, xml_file)
+        if tag == constants.TEST_TAG:
+            test_case, testexec_key = parsed
             if testexec_key in test_execs:
-                test_exec.add_test(test_case)
+                test_execs[testexec_key].add_test(test_case)
 
             else:
                 test_exec = TestExec([test_case])
@@ -525,58 +904,360 @@ def no_filtering_import(xml_file, test_steps_filter, evidences_import, **kwargs)
                     test_exec.testExecutionKey = testexec_key
                 else:
                     test_exec_info = TestExecInfo(**kwargs)
+                    # the test case already holds the dates of its status element
                     if not hasattr(test_exec_info, constants.TEST_EXECUTION_INFO_STARTDATE_KEY):
-                        test_exec_info.startDate = _get_test_date(element, constants.ATTRIB_STARTTIME)
+                        test_exec_info.startDate = test_case.start
                     if not hasattr(test_exec_info, constants.TEST_EXECUTION_INFO_FINISHDATE_KEY):
-                        test_exec_info.finishDate = _get_test_date(element, constants.ATTRIB_ENDTIME)
+                        test_exec_info.finishDate = test_case.finish
 
                     name = ''
-                    for ancestor in element.xpath(constants.XPATH_ANCESTOR_SUITE):
-                        name = ancestor.attrib[constants.ATTRIB_NAME]
+                    for suite_name in suite_names:
+                        name = suite_name
                         break
                     test_exec_info.summary = test_exec_info.summary.format(name + ' ' + str(time.time()))
                     test_exec.info = test_exec_info
                 test_execs[testexec_key] = test_exec 
 
-        element.clear()
-        for ancestor in element.xpath(constants.XPATH_ANCESTOR):
-            while ancestor.getprevious() is not None:
-                del ancestor.getparent()[0]
-
     return test_execs
 
 
-def create_test_exec(data, cert):
+def import_file(xml_file, test_steps_filter, evidences_import, import_filters=None, filter_option=None, profiles=None,
+                workers=0, **kwargs):
+    """
+    Import an output file, with the filter profiles, the filters or no filtering
+    :param xml_file: Robot Framework XML output file
+    :param test_steps_filter: Filtering of test steps
+    :param evidences_import: Evidences selection
+    :param import_filters: Importation filters, None for no filtering
+    :param filter_option: Filter option, either intersaction or union
+    :param profiles: Importation filters and filter option by profile name, None for no profiles
+    :param workers: Number of processes parsing test cases. 0 parses them in this process
+    :return: Test executions to import, by filter profile (None without profiles)
+    """
+    if profiles:
+        return profiles_import(xml_file, test_steps_filter, evidences_import, profiles, workers=workers, **kwargs)
+    if import_filters:
+        return {None: filtering_import(xml_file, test_steps_filter, evidences_import, import_filters, filter_option,
+                                       workers=workers, **kwargs)}
+    return {None: no_filtering_import(xml_file, test_steps_filter, evidences_import, workers=workers, **kwargs)}
+
+
+def _import_file_stats(*args, **kwargs):
+    """
+    Import an output file in a worker process, with the timers and counters of the worker
+
+    :return: Result of import_file; timers and counters of the worker
+    """
+    return import_file(*args, **kwargs), stats.pop()
+
+
+def _replaces(test, previous_test, duplicate_tests):
+    """
+    Check if the result of a test found in a later output file replaces its previous result
+
+    :param test: Test case of the later output file
+    :param previous_test: Test case kept so far
+    :param duplicate_tests: Rule choosing the result kept, one of DUPLICATE_TESTS_CHOICES
+    :return: Boolean value, True if the later result is kept
+    """
+    if duplicate_tests == constants.DUPLICATE_TESTS_FIRST:
+        return False
+    if duplicate_tests == constants.DUPLICATE_TESTS_LAST:
+        return True
+    status_rank = constants.DUPLICATE_TESTS_STATUS_RANK[duplicate_tests]
+    return status_rank.get(test.status, 0) >= status_rank.get(previous_test.status, 0)
+
+
+def merge_test_execs(test_execs_list, duplicate_tests=constants.DUPLICATE_TESTS_DEFAULT):
+    """
+    Merge the test executions imported from several output files by test execution key. New test executions are
+    merged in one, with the info of the first file. A test found more than once in the same test execution keeps
+    the position of its first result, and the result chosen by the duplicate tests rule
+    :param test_execs_list: Test executions imported from each output file, in the order of the files
+    :param duplicate_tests: Rule choosing the result kept, one of DUPLICATE_TESTS_CHOICES
+    :return: Merged test executions
+    """
+    merged = {}
+    positions = {}  # (test execution key, test key) -> index of the test in the merged test execution
+
+    for test_execs in test_execs_list:
+        for testexec_key, test_exec in test_execs.items():
+            merged_test_exec = merged.get(testexec_key)
+            if merged_test_exec is None:
+                merged_test_exec = TestExec()
+                merged_test_exec.testExecutionKey = test_exec.testExecutionKey
+                merged_test_exec.info = test_exec.info
+                merged[testexec_key] = merged_test_exec
+
+            for test in test_exec.tests:
+                position = positions.get((testexec_key, test.testKey)) if test.testKey else None
+                if position is None:
+                    positions[(testexec_key, test.testKey)] = len(merged_test_exec.tests)
+                    merged_test_exec.add_test(test)
+                elif _replaces(test, merged_test_exec.tests[position], duplicate_tests):
+                    merged_test_exec.tests[position] = test
+
+    return merged
+
+
+def import_files(xml_files, test_steps_filter, evidences_import, import_filters=None, filter_option=None,
+                 profiles=None, workers=0, duplicate_tests=constants.DUPLICATE_TESTS_DEFAULT, **kwargs):
+    """
+    Import several output files, as import_file, and merge their test executions by test execution key.
+    With workers, each file is parsed by a worker process, so files are parsed concurrently; a single file is
+    parsed by the workers instead
+    :param xml_files: Robot Framework XML output files
+    :param duplicate_tests: Rule choosing the result kept when a test is found in several files
+    :return: Test executions to import, by filter profile (None without profiles)
+    """
+    if len(xml_files) == 1:
+        return import_file(xml_files[0], test_steps_filter, evidences_import, import_filters, filter_option,
+                           profiles, workers, **kwargs)
+
+    if workers:
+        with ProcessPoolExecutor(max_workers=min(workers, len(xml_files)), initializer=_init_worker) as executor:
+            futures = [executor.submit(_import_file_stats, xml_file, test_steps_filter, evidences_import,
+                                       import_filters, filter_option, profiles, 0, **kwargs)
+                       for xml_file in xml_files]
+            results = []
+            for future in futures:
+                result, worker_stats = future.result()
+                stats.merge(*worker_stats)
+                results.append(result)
+    else:
+        results = [import_file(xml_file, test_steps_filter, evidences_import, import_filters, filter_option,
+                               profiles, **kwargs)
+                   for xml_file in xml_files]
+
+    return OrderedDict((profile, merge_test_execs([result[profile] for result in results], duplicate_tests))
+                       for profile in results[0])
+
+
+def expand_files(patterns):
+    """
+    Expand the glob patterns of the output files given
+
+    :param patterns: Output files and glob patterns
+    :return:
+        List of output files
+    """
+    xml_files = []
+    for pattern in patterns:
+        if glob.escape(pattern) == pattern:
+            xml_files.append(pattern)
+            continue
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise Exception(constants.INPUT_NO_MATCH.format(pattern))
+        xml_files.extend(matches)
+    return xml_files
+
+
+def process_evidences(profile_test_execs, max_test_exec_bytes=0):
+    """
+    Waits for the evidences of the test executions to be processed, starting the ones that were not started while
+    parsing (parsed by another process), and leaves out the evidences dropped by the processor and the ones over
+    the size cap of their test execution. The evidences of failed tests are kept first, then the others in order.
+
+    :param profile_test_execs: Test executions to import, by filter profile (None without profiles)
+    :param max_test_exec_bytes: Maximum size of the evidence files of a test execution, in bytes. 0 for no limit
+    """
+    for test_execs in profile_test_execs.values():
+        for test_exec in test_execs.values():
+            for test in test_exec.tests:
+                _process_evidences(test)
+
+    for test_execs in profile_test_execs.values():
+        for test_exec in test_execs.values():
+            failed = [test for test in test_exec.tests if test.status == constants.FAIL]
+            others = [test for test in test_exec.tests if test.status != constants.FAIL]
+            remaining = max_test_exec_bytes
+            for test in failed + others:
+                for evidences in [test.evidences] + [step.evidences for step in test.steps]:
+                    kept = []
+                    for evidence in evidences:
+                        if evidence.wait_processed() and (not max_test_exec_bytes or evidence.size <= remaining):
+                            remaining -= evidence.size
+                            kept.append(evidence)
+                        else:
+                            print(constants.EVIDENCE_DROPPED_MESSAGE.format(evidence.filename, test.testKey))
+                    evidences[:] = kept
+
+
+def create_session(pool_size=constants.UPLOAD_CONCURRENCY_DEFAULT):
+    """
+    Creates a HTTP session that keeps its connections to JIRA alive, so they are reused by every request
+
+    :param pool_size: Maximum number of connections kept open to the same server
+    :return:
+        requests Session
+    """
+    new_session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+    new_session.mount('http://', adapter)
+    new_session.mount('https://', adapter)
+    return new_session
+
+
+# Session used by the requests to JIRA-XRAY API
+session = create_session()
+
+# Retry policy and rate limit of the requests to JIRA-XRAY API
+retries = constants.RETRIES_DEFAULT
+retry_backoff = constants.RETRY_BACKOFF_DEFAULT
+rate_limiter = TokenBucket(constants.RATE_LIMIT_DEFAULT)
+
+# Compression of the attachments from the threshold size, in bytes, None to attach them as they are
+attachment_compression = None
+attachment_compression_bytes = constants.ATTACHMENT_COMPRESSION_THRESHOLD_DEFAULT * 1024 * 1024
+
+
+def _retry_after(response):
+    """
+    Get the delay asked by the server in the Retry-After header of a response, either in seconds or as a HTTP date
+
+    :param response: API Response
+    :return:
+        Delay in seconds, None if the header is not set or not valid
+    """
+    retry_after = response.headers.get(constants.RETRY_AFTER)
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.mktime_tz(email.utils.parsedate_tz(retry_after)) - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _not_sent(error):
+    """
+    Whether a connection error happened before the request was sent, connecting to the server
+
+    :param error: requests ConnectionError
+    :return:
+        Boolean value
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    # NewConnectionError, raised when the connection is refused or the host is not found, is a ConnectTimeoutError
+    return isinstance(reason, urllib3.exceptions.ConnectTimeoutError)
+
+
+def _send_request(url, headers, data, cert, idempotent=False):
+    """
+    Sends a POST request to JIRA-XRAY API, within the rate limit. Requests refused because of the server load
+    (status in RETRY_STATUS) or that could not connect are retried, waiting what the server asks in Retry-After
+    or an exponential backoff with jitter. Requests that lost their connection after being sent, whose answer is
+    unknown, are only retried if sending them twice does not create anything twice.
+
+    :param url: Request URL
+    :param headers: Request headers
+    :param data: Request body, or a function returning a new request body for each attempt (for bodies that can
+        only be read once, as generators and files)
+    :param cert: Path to SSL certificate or False
+    :param idempotent: Whether the request can be sent again once the server may have processed it
+    :return:
+        API Response
+    """
+    stats_endpoint = constants.STATS_ISSUE_KEY_REGEX.sub(constants.STATS_ISSUE_KEY, urlparse(url).path)
+    attempt = 0
+    while True:
+        rate_limiter.acquire()
+        body = data() if callable(data) else data
+        start = time.perf_counter()
+        try:
+            response = session.post(url, headers=headers, data=body, auth=(username, password), verify=cert)
+        except requests.exceptions.ConnectionError as error:
+            stats.record_request(stats_endpoint, time.perf_counter() - start, type(error).__name__, attempt)
+            if attempt >= retries or not (idempotent or _not_sent(error)):
+                raise
+            reason = type(error).__name__
+            delay = None
+        else:
+            stats.record_request(stats_endpoint, time.perf_counter() - start, response.status_code, attempt)
+            if response.status_code not in constants.RETRY_STATUS or attempt >= retries:
+                return response
+            reason = str(response.status_code)
+            delay = _retry_after(response)
+
+        if delay is None:
+            delay = min(constants.RETRY_BACKOFF_MAX, retry_backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+        attempt += 1
+        print(constants.RETRY_MESSAGE.format(url, reason, delay, attempt, retries))
+        time.sleep(delay)
+
+
+def create_test_exec(data, cert, idempotent=False):
     """
     Sends a request to import test execution via JIRA-XRAY API
 
-    :param data: JSON data
+    :param data: JSON data, either a string or a function returning a generator of chunks (sent with chunked
+        transfer encoding)
+    :param idempotent: Whether the import updates an existing test execution, instead of creating one
     :return:
         API Response
     """
     headers = {constants.CONTENT_TYPE: constants.CONTENT_TYPE_JSON}
     # Endpoit default
     url = urljoin(jira_address, endpoint)
-    response = requests.post(url, headers=headers, data=data, auth=(username, password), verify = cert)
+    response = _send_request(url, headers, data, cert, idempotent)
     return response
 
 
-def add_attachment_test_exec(test_exec_key, file, cert):
+def _attachment_compression(filepath):
+    """
+    Compression of an attachment, according to attachment_compression and its threshold
+
+    :param filepath: Path to the attachment
+    :return:
+        ATTACHMENT_COMPRESSION_GZIP, ATTACHMENT_COMPRESSION_ZIP, or None to attach the file as it is
+    """
+    if attachment_compression is None or filepath.lower().endswith(constants.ATTACHMENT_COMPRESSED_EXTENSIONS):
+        return None
+    return attachment_compression if os.path.getsize(filepath) >= attachment_compression_bytes else None
+
+
+def add_attachment_test_exec(test_exec_key, file, cert, filename=None, content_type=constants.ATTACHMENT_CONTENT_TYPE,
+                             compression=None):
     """
     Sends a request to add attachments to test execution
 
     :param test_exec_key : string
     :param file          : string
+    :param filename      : Name the file is attached with, the name of the file if None
+    :param content_type  : Content type of the file
+    :param compression   : ATTACHMENT_COMPRESSION_GZIP or ATTACHMENT_COMPRESSION_ZIP to compress the file while it is
+        sent, None to send it as it is
     :return:
         API Response
     """
 
-    attachment = Attachmet(file)
+    # the same boundary is used by the multipart body of every attempt
+    boundary = uuid.uuid4().hex
     endpoint = constants.ATTACHMENT_ENDPOINT.format(test_exec_key)
     url = urljoin(jira_address, endpoint)
-    headers = {constants.CONTENT_TYPE: attachment.content_type, constants.CONTENT_ATLASSIAN_TOKEN : constants.CONTENT_ATLASSIAN_TOKEN_VALUE}
-    response = requests.post(url, headers=headers, data=attachment.data, auth=(username, password), verify=cert)
-    return response
+    headers = {constants.CONTENT_TYPE: constants.CONTENT_TYPE_MULTIPART.format(boundary), constants.CONTENT_ATLASSIAN_TOKEN : constants.CONTENT_ATLASSIAN_TOKEN_VALUE}
+    attachments = []
+
+    def _body():
+        # each attempt reads the file again, from a new handle
+        if compression:
+            attachment = CompressedAttachment(file, compression, boundary, filename)
+        else:
+            attachment = Attachmet(file, boundary, filename, content_type)
+        attachments.append(attachment)
+        return attachment.data
+
+    try:
+        return _send_request(url, headers, _body, cert)
+    finally:
+        for attachment in attachments:
+            attachment.close()
 
 def create_test_plan(data, cert):
     """
@@ -589,7 +1270,7 @@ def create_test_plan(data, cert):
     headers = {constants.CONTENT_TYPE: constants.CONTENT_TYPE_JSON}
     endpoint = constants.TEST_PLAN_ENDPOINT
     url = urljoin(jira_address, endpoint)
-    response = requests.post(url, headers=headers, data=data, auth=(username, password), verify = cert)
+    response = _send_request(url, headers, data, cert)
     return response
 
 
@@ -606,7 +1287,8 @@ def add_test_exec_to_test_plan(data, test_plan_key, cert):
     headers = {constants.CONTENT_TYPE: constants.CONTENT_TYPE_JSON}
     endpoint = constants.TEST_PLAN_TEST_EXECS_ENDPOINT.format(test_plan_key)
     url = urljoin(jira_address, endpoint)
-    response = requests.post(url, headers=headers, data=data, auth=(username, password), verify = cert)
+    # linking again what is already linked changes nothing
+    response = _send_request(url, headers, data, cert, idempotent=True)
     return response
 
 
@@ -623,10 +1305,868 @@ def add_tests_to_test_plan(data, test_plan_key, cert):
     headers = {constants.CONTENT_TYPE: constants.CONTENT_TYPE_JSON}
     endpoint = constants.TEST_PLAN_TESTS_ENDPOINT.format(test_plan_key)
     url = urljoin(jira_address, endpoint)
-    response = requests.post(url, headers=headers, data=data, auth=(username, password), verify = cert)
+    # linking again what is already linked changes nothing
+    response = _send_request(url, headers, data, cert, idempotent=True)
     return response
 
 
+def _check_response(response):
+    """
+    Raises an exception with the response content if the request failed
+
+    :param response: API Response
+    :return:
+        JSON content of the response
+    """
+    if not response:
+        # Prepare msg before print. Makes python2 more readable
+        msg = "Error: " + str(response.status_code)
+        print(msg)
+        #sys.exit(1) Does not work with executable
+        raise Exception(response.text)
+    return json.loads(response.text)
+
+
+def _project_key(test_exec):
+    """
+    Get the Jira project of a test execution before it is imported, from its key or from the key of its first test
+
+    :param test_exec: Test execution
+    :return:
+        Project key, None if it is not known
+    """
+    issue_key = test_exec.testExecutionKey or ''
+    if not issue_key and test_exec.tests:
+        issue_key = test_exec.tests[0].testKey
+    if '-' in issue_key:
+        return issue_key.split('-')[0]
+
+
+async def _call(limiter, func, *args):
+    """
+    Runs a blocking request helper in the executor of the event loop, bounded by the limiter
+
+    :param limiter: UploadLimiter of the upload. Once it is stopped, the request is not sent and CancelledError
+        is raised
+    :param func: Request helper
+    :param args: Arguments of the request helper
+    :return:
+        API Response
+    """
+    async with limiter.semaphore:
+        # the request that released the semaphore may have just failed: its task stops the limiter when it is done,
+        # which runs after this one is woken
+        await asyncio.sleep(0)
+        if limiter.stopped:
+            raise asyncio.CancelledError()
+        return await asyncio.get_event_loop().run_in_executor(None, functools.partial(func, *args))
+
+
+def _stop_on_failure(limiter, task):
+    """
+    Stops the limiter when a task fails, so no new request is sent
+    """
+    if not task.cancelled() and task.exception() is not None:
+        limiter.stopped = True
+
+
+async def _gather(limiter, *aws):
+    """
+    Runs awaitables at the same time, as asyncio.gather. When one fails, the limiter is stopped and the others are
+    waited for before its exception is raised: cancelling them would not stop the requests already running in the
+    executor, only the journal records of what they committed
+
+    :param limiter: UploadLimiter of the upload
+    :param aws: Awaitables
+    :return:
+        Results of the awaitables, in order
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    for task in tasks:
+        task.add_done_callback(functools.partial(_stop_on_failure, limiter))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    _raise_failure(results)
+    return results
+
+
+def _raise_failure(results):
+    """
+    Raises the first exception in the results of asyncio.gather, if any. Failures are raised before the
+    cancellations they caused
+    """
+    for result in sorted((result for result in results if isinstance(result, BaseException)),
+                         key=lambda result: isinstance(result, asyncio.CancelledError)):
+        raise result
+
+
+async def _import_test_exec(limiter, journal, test_exec_id, test_exec, cert, debug_messages=None, max_tests=0,
+                            max_bytes=0):
+    """
+    Imports a test execution, split in chunks bounded by max_tests and max_bytes.
+    When the test execution has to be created, the first chunk creates it and the others are imported with its key.
+    Chunks already imported, according to the journal, are skipped.
+
+    :param debug_messages: List where the debug messages of the chunks are added in chunk order, whatever order
+        they are imported in. None to not log the XRAY responses
+    :return:
+        Key of the test execution issue
+    """
+    chunks = list(enumerate(split_test_exec(test_exec, max_tests, max_bytes)))
+    chunk_messages = [[] if debug_messages is not None else None for _ in chunks]
+    try:
+        test_exec_key = test_exec.testExecutionKey
+        if test_exec_key is None:
+            first_step = constants.JOURNAL_CHUNK.format(test_exec_id, 0)
+            test_exec_key = journal.get(first_step)
+            if test_exec_key is None:
+                test_exec_key = await _import_test_exec_chunk(limiter, chunks[0][1], cert, chunk_messages[0])
+                journal.record(first_step, test_exec_key)
+            chunks = chunks[1:]
+            for _, chunk in chunks:
+                chunk.testExecutionKey = test_exec_key
+
+        async def _import_chunk(index, chunk):
+            step = constants.JOURNAL_CHUNK.format(test_exec_id, index)
+            if journal.get(step) is None:
+                journal.record(step, await _import_test_exec_chunk(limiter, chunk, cert, chunk_messages[index]))
+
+        await _gather(limiter, *[_import_chunk(index, chunk) for index, chunk in chunks])
+    finally:
+        if debug_messages is not None:
+            for messages in chunk_messages:
+                debug_messages.extend(messages)
+    return test_exec_key
+
+
+async def _import_test_exec_chunk(limiter, test_exec, cert, debug_messages=None):
+    """
+    Imports a test execution, as a single request
+
+    :param debug_messages: List where the debug messages of the request are added, None to not log the XRAY response
+    :return:
+        Key of the test execution issue
+    """
+    response = await _call(limiter, create_test_exec, functools.partial(stream_json, test_exec), cert,
+                           test_exec.testExecutionKey is not None)
+    json_response = _check_response(response)
+    if debug_messages is not None:
+        test_keys = []
+        for test in test_exec.tests:
+            test_keys.append(test.testKey)
+        if test_exec.testExecutionKey is not None:
+
+            debug_messages.append(constants.DEBUG_UPDATE.format(len(test_keys), test_exec.testExecutionKey,
+                                                                ",".join(test_keys)))
+        else:
+            debug_messages.append(constants.DEBUG_CREATE.format(test_exec.info.summary, len(test_exec.tests),
+                                                                ",".join(test_keys)))
+        debug_messages.append(json_response)
+    return json_response[constants.TEST_EXEC_ISSUE][constants.KEY]
+
+
+async def _add_attachment(limiter, journal, test_exec_import, filepath, cert):
+    """
+    Adds an attachment to a test execution as soon as its key is known, unless the journal has it as added.
+    An attachment that fails is reported without stopping the others.
+    """
+    test_exec_key = await test_exec_import
+    step = constants.JOURNAL_ATTACHMENT.format(test_exec_key, filepath)
+    if journal.get(step):
+        return
+    file = os.path.basename(filepath) # get file name for better message
+    try:
+        response = await _call(limiter, add_attachment_test_exec, test_exec_key, filepath, cert, None,
+                               constants.ATTACHMENT_CONTENT_TYPE, _attachment_compression(filepath))
+    except (OSError, requests.exceptions.RequestException) as error:
+        # the file could not be read, or the server could not be reached
+        msg = "Could not add " + file + " to test execution. Error: " + type(error).__name__ + ": " + str(error)
+        print(msg)
+        journal.failures += 1
+        return
+    if response:
+        journal.record(step)
+        msg = file + " was added to test execution " + test_exec_key
+        print(msg)
+    else:
+        # Prepare msg before print. Makes python2 more readable
+        msg = "Could not add " + file + " to test execution. Error: " + str(response.status_code)
+        print(msg)
+        print(response.text)
+        journal.failures += 1
+
+
+async def _add_evidences(limiter, journal, test_exec_import, evidences, cert):
+    """
+    Uploads the evidences of a test execution as attachments of its issue, once its results are imported.
+    Evidences already added, according to the journal, are skipped, and an evidence that fails is reported
+    without stopping the others.
+    """
+    test_exec_key = await test_exec_import
+
+    async def _add_evidence(evidence):
+        content_type = mimetypes.guess_type(evidence.filename)[0] or constants.EVIDENCE_CONTENT_TYPE_DEFAULT
+        try:
+            # evidences are told apart by content, as files with the same name and size may come from different
+            # output files, and processed evidences are written to a new path on each run
+            digest = await asyncio.get_event_loop().run_in_executor(None, evidence.digest)
+            step = constants.JOURNAL_EVIDENCE.format(test_exec_key, evidence.filename, digest)
+            if journal.get(step):
+                return True
+            response = await _call(limiter, add_attachment_test_exec, test_exec_key, evidence.path, cert,
+                                   evidence.filename, content_type)
+        except (OSError, requests.exceptions.RequestException) as error:
+            print(constants.EVIDENCE_UPLOAD_ERROR.format(evidence.filename, test_exec_key, type(error).__name__))
+            journal.failures += 1
+            return False
+        if not response:
+            print(constants.EVIDENCE_UPLOAD_ERROR.format(evidence.filename, test_exec_key, response.status_code))
+            journal.failures += 1
+            return False
+        journal.record(step)
+        return True
+
+    added = await _gather(limiter, *[_add_evidence(evidence) for evidence in evidences])
+    print(constants.EVIDENCE_UPLOAD_MESSAGE.format(sum(added), len(added), test_exec_key))
+
+
+async def _test_plan(limiter, journal, test_exec_id, test_exec, test_exec_import, test_plan_summary, cert):
+    """
+    Creates a test plan and links a test execution and its tests to it.
+    The test plan is created while the test execution is imported, if its project is already known,
+    and its tests are linked without waiting for the import. Steps recorded in the journal are skipped.
+    """
+    project_key = _project_key(test_exec)
+    if not project_key:
+        # Get Project Name from text_exec_key. Format: "ROBRX-123", e.g
+        project_key = (await test_exec_import).split('-')[0]
+
+    # Create Test Plan object, taking into account if the name was given as argument
+    if test_plan_summary:
+        newTestPlan = TestPlan(project_key, summary=test_plan_summary)
+    else:
+        newTestPlan = TestPlan(project_key)
+
+    step = constants.JOURNAL_TEST_PLAN.format(test_exec_id)
+    test_plan_key = journal.get(step)
+    if test_plan_key is None:
+        response = await _call(limiter, create_test_plan, newTestPlan.test_plan_json, cert)
+        test_plan_key = _check_response(response)[constants.KEY]
+        journal.record(step, test_plan_key)
+        # Prepare msg before print. Makes python2 more readable
+        msg = "Test Plan created: " + test_plan_key
+        print(msg)
+
+    async def _link_test_exec():
+        test_exec_key = await test_exec_import
+        step = constants.JOURNAL_TEST_PLAN_TEST_EXEC.format(test_plan_key, test_exec_key)
+        if journal.get(step):
+            return
+        # Add test exec created to the test plan created
+        newTestPlan.add_test_exec([test_exec_key])
+        response = await _call(limiter, add_test_exec_to_test_plan, newTestPlan.test_plan_add_test_exec_json,
+                               test_plan_key, cert)
+        _check_response(response)
+        journal.record(step)
+        # Prepare msg before print. Makes python2 more readable
+        msg = "Test Exec " + test_exec_key + " was sucessfully linked to Test Plan " + test_plan_key
+        print(msg)
+
+    async def _link_tests():
+        step = constants.JOURNAL_TEST_PLAN_TESTS.format(test_plan_key)
+        if journal.get(step):
+            return
+        # Get list of test cases
+        list_test_cases = [test_case.testKey for test_case in test_exec.tests]
+
+        # Add test cases, from xml of execution (e.g output.xml), to the test plan created
+        newTestPlan.add_tests(list_test_cases)
+        response = await _call(limiter, add_tests_to_test_plan, newTestPlan.test_plan_add_tests_json, test_plan_key,
+                               cert)
+        _check_response(response)
+        journal.record(step)
+        # Prepare msg before print. Makes python2 more readable
+        msg = "Tests " + str(list_test_cases) + " were sucessfully linked to Test Plan " + test_plan_key
+        print(msg)
+
+    await _gather(limiter, _link_test_exec(), _link_tests())
+
+
+async def _upload_test_execs(semaphore, test_execs, cert, attachments, create_plan, test_plan_summary, debug_mode,
+                             chunk_tests, chunk_bytes, journal, evidence_attachments=False):
+    """
+    Sends test executions, their attachments and test plan, bounded by the semaphore.
+    When a request fails no new request is sent, but the requests already sent are waited for, so what they
+    committed is recorded in the journal and not sent again on resume.
+
+    :return:
+        Keys of the test executions, in order
+    """
+    limiter = UploadLimiter(semaphore)
+    test_exec_items = list(test_execs.items())
+    test_exec_evidences = [()] * len(test_exec_items)
+    if evidence_attachments:
+        detached = [detach_evidences(test_exec) for _, test_exec in test_exec_items]
+        test_exec_items = [(test_exec_id, test_exec) for (test_exec_id, _), (test_exec, _) in zip(test_exec_items,
+                                                                                               detached)]
+        test_exec_evidences = [evidences for _, evidences in detached]
+    # the debug messages of each test execution, printed in order once it is imported
+    test_exec_messages = [[] if debug_mode else None for _ in test_exec_items]
+    imports = [asyncio.ensure_future(_import_test_exec(limiter, journal, test_exec_id, test_exec, cert, messages,
+                                                       chunk_tests, chunk_bytes))
+               for (test_exec_id, test_exec), messages in zip(test_exec_items, test_exec_messages)]
+    tasks = list(imports)
+
+    # evidences are uploaded once the results of their test execution are imported
+    for test_exec_import, evidences in zip(imports, test_exec_evidences):
+        if evidences:
+            tasks.append(asyncio.ensure_future(_add_evidences(limiter, journal, test_exec_import, evidences, cert)))
+
+    # attachments and the test plan refer to the last test execution
+    if imports:
+        last_test_exec_id, last_test_exec = test_exec_items[-1]
+        for filepath in attachments:
+            tasks.append(asyncio.ensure_future(_add_attachment(limiter, journal, imports[-1], filepath, cert)))
+        if create_plan:
+            tasks.append(asyncio.ensure_future(_test_plan(limiter, journal, last_test_exec_id, last_test_exec,
+                                                          imports[-1], test_plan_summary, cert)))
+
+    for task in tasks:
+        task.add_done_callback(functools.partial(_stop_on_failure, limiter))
+    test_exec_keys = []
+    try:
+        # Test executions are reported in order
+        for test_exec_import, messages in zip(imports, test_exec_messages):
+            test_exec_key = await test_exec_import
+            for message in messages or ():
+                print(message)
+            test_exec_keys.append(test_exec_key)
+            # Prepare msg before print. Makes python2 more readable
+            msg = "Test Exec created: " + test_exec_key
+            print(msg)
+        await asyncio.gather(*tasks)
+    except BaseException as error:
+        # no new request is sent, and the ones already sent are waited for, as in _gather
+        limiter.stopped = True
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # the debug messages of the test executions not reported yet, up to the failure
+        for messages in test_exec_messages[len(test_exec_keys):]:
+            for message in messages or ():
+                print(message)
+        if isinstance(error, asyncio.CancelledError):
+            # stopped by the failure of another request, which is raised instead
+            _raise_failure(results)
+        raise
+    return test_exec_keys
+
+
+async def _upload(test_execs, cert, attachments, create_plan, test_plan_summary, concurrency, debug_mode,
+                  chunk_tests, chunk_bytes, journal, evidence_attachments):
+    semaphore = asyncio.Semaphore(concurrency)
+    asyncio.get_event_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    return await _upload_test_execs(semaphore, test_execs, cert, attachments, create_plan, test_plan_summary,
+                                    debug_mode, chunk_tests, chunk_bytes, journal, evidence_attachments)
+
+
+async def _upload_batch(batch, cert, attachments, create_plan, test_plan_summary, concurrency, debug_mode,
+                        chunk_tests, chunk_bytes, journal, evidence_attachments):
+    semaphore = asyncio.Semaphore(concurrency)
+    asyncio.get_event_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    return await asyncio.gather(*[_upload_test_execs(semaphore, test_execs, cert, attachments, create_plan,
+                                                     test_plan_summary, debug_mode, chunk_tests, chunk_bytes,
+                                                     journal, evidence_attachments)
+                                  for test_execs in batch], return_exceptions=True)
+
+
+def upload(test_execs, cert, attachments=(), create_plan=False, test_plan_summary=None,
+           concurrency=constants.UPLOAD_CONCURRENCY_DEFAULT, debug_mode=False, chunk_tests=0, chunk_bytes=0,
+           journal=None, evidence_attachments=False):
+    """
+    Sends test executions, their attachments and test plan to JIRA-XRAY API.
+    The requests are scheduled by their dependencies: attachments are added as soon as the key of the test execution
+    is known, the test plan is created while test executions are imported, and at most concurrency requests are sent
+    at the same time.
+
+    :param test_execs: Test executions to import
+    :param cert: Path to SSL certificate or False
+    :param attachments: Files to add to the last test execution
+    :param create_plan: Whether to create a test plan with the last test execution and its tests
+    :param test_plan_summary: Summary of the test plan, None for the default one
+    :param concurrency: Maximum number of requests sent at the same time
+    :param debug_mode: Whether to log the XRAY responses
+    :param chunk_tests: Maximum number of tests imported in a single request. 0 for no limit
+    :param chunk_bytes: Maximum size in bytes of the JSON of a single import request. 0 for no limit
+    :param journal: Journal where the committed requests are recorded, and skipped if already recorded
+    :param evidence_attachments: Whether to import the results without the evidence data, and upload the evidences
+        as attachments of their test execution once its results are imported
+    :return:
+        Keys of the test executions, in order
+    """
+    if journal is None:
+        journal = Journal()
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(_upload(test_execs, cert, attachments, create_plan, test_plan_summary, concurrency,
+                                        debug_mode, chunk_tests, chunk_bytes, journal, evidence_attachments))
+    finally:
+        loop.close()
+
+
+def upload_batch(batch, cert, attachments=(), create_plan=False, test_plan_summary=None,
+                 concurrency=constants.UPLOAD_CONCURRENCY_DEFAULT, debug_mode=False, chunk_tests=0, chunk_bytes=0,
+                 journal=None, evidence_attachments=False):
+    """
+    Sends the test executions of several imports at the same time, as upload does for each one, sharing the limit
+    of requests sent at the same time. An import that fails does not stop the others.
+
+    :param batch: Test executions of each import
+    :return:
+        For each import, the keys of its test executions or the exception that made it fail
+    """
+    if journal is None:
+        journal = Journal()
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(_upload_batch(batch, cert, attachments, create_plan, test_plan_summary,
+                                                     concurrency, debug_mode, chunk_tests, chunk_bytes, journal,
+                                                     evidence_attachments))
+    finally:
+        loop.close()
+
+
+def _test_exec_counts(test_exec):
+    """
+    Counts the tests, steps and evidences of a test execution, and the size of the evidence files and of their
+    base64 encoded JSON, without reading them
+
+    :param test_exec: Test execution
+    :return:
+        Dict with the counts, by DRY_RUN key
+    """
+    counts = {constants.DRY_RUN_TESTS_KEY: len(test_exec.tests), constants.DRY_RUN_STEPS_KEY: 0,
+              constants.DRY_RUN_EVIDENCES_KEY: 0, constants.DRY_RUN_EVIDENCE_BYTES_KEY: 0,
+              constants.DRY_RUN_ENCODED_EVIDENCE_BYTES_KEY: 0}
+    for test in test_exec.tests:
+        counts[constants.DRY_RUN_STEPS_KEY] += len(test.steps)
+        for evidence in _iter_evidences(test):
+            counts[constants.DRY_RUN_EVIDENCES_KEY] += 1
+            counts[constants.DRY_RUN_EVIDENCE_BYTES_KEY] += evidence.size
+            counts[constants.DRY_RUN_ENCODED_EVIDENCE_BYTES_KEY] += encoded_size(evidence)
+    return counts
+
+
+def _schedule(requests_schedule, endpoint, size, test_exec_id, after=()):
+    """
+    Adds a request to the schedule of a dry run
+
+    :param requests_schedule: Requests scheduled so far
+    :param endpoint: Path of the request
+    :param size: Size in bytes of the request body
+    :param test_exec_id: Test execution the request belongs to
+    :param after: Indexes of the requests that must be answered before this one is sent
+    :return:
+        Index of the request
+    """
+    requests_schedule.append({constants.DRY_RUN_ENDPOINT_KEY: endpoint, constants.DRY_RUN_BYTES_KEY: size,
+                              constants.DRY_RUN_TEST_EXEC_KEY: test_exec_id,
+                              constants.DRY_RUN_AFTER_KEY: list(after)})
+    return len(requests_schedule) - 1
+
+
+def _schedule_rounds(requests_schedule, concurrency, first_round):
+    """
+    Projects the round in which each request is sent, as the upload schedules them: as soon as the requests it
+    depends on are answered, with at most concurrency requests sent at the same time
+
+    :param requests_schedule: Requests scheduled, each one after the requests it depends on
+    :param concurrency: Maximum number of requests sent at the same time
+    :param first_round: Round of the requests that do not depend on others
+    :return:
+        Last round
+    """
+    sent = {}  # round -> number of requests sent in it
+    last_round = first_round - 1
+    for request in requests_schedule:
+        request_round = max([requests_schedule[index][constants.DRY_RUN_ROUND_KEY] + 1
+                             for index in request[constants.DRY_RUN_AFTER_KEY]] + [first_round])
+        while sent.get(request_round, 0) >= concurrency:
+            request_round += 1
+        sent[request_round] = sent.get(request_round, 0) + 1
+        request[constants.DRY_RUN_ROUND_KEY] = request_round
+        last_round = max(last_round, request_round)
+    return last_round
+
+
+def dry_run(profile_test_execs, attachments=(), create_plan=False, test_plan_summary=None,
+            concurrency=constants.UPLOAD_CONCURRENCY_DEFAULT, chunk_tests=0, chunk_bytes=0,
+            import_endpoint=constants.ENDPOINT_DEFAULT, evidence_attachments=False):
+    """
+    Computes what the upload of the test executions would send to JIRA-XRAY API, without sending it: the tests,
+    steps and evidences of each test execution, the size of each request body, computed with encoded_size so no
+    payload is built, and the projected schedule of the requests, with their dependencies and the round in which
+    they would be sent.
+
+    :param profile_test_execs: Test executions to import, by filter profile (None without profiles)
+    :param attachments: Files to add to the last test execution of each profile
+    :param create_plan: Whether to create a test plan with the last test execution of each profile and its tests
+    :param test_plan_summary: Summary of the test plan, None for the default one
+    :param concurrency: Maximum number of requests sent at the same time
+    :param chunk_tests: Maximum number of tests imported in a single request. 0 for no limit
+    :param chunk_bytes: Maximum size in bytes of the JSON of a single import request. 0 for no limit
+    :param import_endpoint: XRAY's API endpoint to import test executions
+    :param evidence_attachments: Whether the evidences are uploaded as attachments, after their test execution is
+        imported without them
+    :return:
+        Dict with the test executions, the requests and the totals
+    """
+    test_exec_reports = []
+    requests_schedule = []
+    rounds = 0
+    for profile, test_execs in profile_test_execs.items():
+        # the profiles are uploaded one after the other
+        profile_requests = []
+        last_requests = []
+        last_test_exec = None
+        for test_exec_id, test_exec in test_execs.items():
+            if profile is not None:
+                test_exec_id = constants.FILTER_PROFILE_TEST_EXEC_ID.format(profile, test_exec_id)
+            evidences = ()
+            imported_test_exec = test_exec
+            if evidence_attachments:
+                imported_test_exec, evidences = detach_evidences(test_exec)
+            chunks = split_test_exec(imported_test_exec, chunk_tests, chunk_bytes)
+            if test_exec.testExecutionKey is None:
+                # the chunks after the first one are sent with the key it creates
+                for chunk in chunks[1:]:
+                    chunk.testExecutionKey = constants.STATS_ISSUE_KEY
+            sizes = [encoded_size(chunk) for chunk in chunks]
+            # without a key, the first chunk creates the test execution and the others wait for its key
+            first = _schedule(profile_requests, import_endpoint, sizes[0], test_exec_id)
+            after = [first] if test_exec.testExecutionKey is None else []
+            last_requests = [first] + [_schedule(profile_requests, import_endpoint, size, test_exec_id, after)
+                                       for size in sizes[1:]]
+            for evidence in evidences:
+                _schedule(profile_requests, constants.ATTACHMENT_ENDPOINT.format(constants.STATS_ISSUE_KEY),
+                          evidence.size, test_exec_id, last_requests)
+            last_test_exec = test_exec_id, test_exec
+
+            report = {constants.DRY_RUN_ID_KEY: test_exec_id, constants.DRY_RUN_PROFILE_KEY: profile,
+                      constants.DRY_RUN_TEST_EXEC_KEY: test_exec.testExecutionKey,
+                      constants.DRY_RUN_SUMMARY_KEY: getattr(test_exec.info, 'summary', None),
+                      constants.DRY_RUN_JSON_BYTES_KEY: sum(sizes), constants.DRY_RUN_REQUESTS_KEY: len(sizes)}
+            report.update(_test_exec_counts(test_exec))
+            test_exec_reports.append(report)
+
+        # attachments and the test plan refer to the last test execution, once all its chunks are imported
+        if last_test_exec is not None:
+            test_exec_id, test_exec = last_test_exec
+            for filepath in attachments:
+                _schedule(profile_requests, constants.ATTACHMENT_ENDPOINT.format(constants.STATS_ISSUE_KEY),
+                          os.path.getsize(filepath), test_exec_id, last_requests)
+            if create_plan:
+                project_key = _project_key(test_exec)
+                test_plan = TestPlan(project_key or constants.STATS_ISSUE_KEY,
+                                     summary=test_plan_summary or constants.TEST_PLAN_SUMMARY_JIRA)
+                test_plan.add_test_exec([constants.STATS_ISSUE_KEY])
+                test_plan.add_tests([test.testKey for test in test_exec.tests])
+                plan = _schedule(profile_requests, constants.TEST_PLAN_ENDPOINT, len(test_plan.test_plan_json),
+                                 test_exec_id, [] if project_key else last_requests)
+                _schedule(profile_requests, constants.TEST_PLAN_TEST_EXECS_ENDPOINT.format(constants.STATS_ISSUE_KEY),
+                          len(test_plan.test_plan_add_test_exec_json), test_exec_id, [plan] + last_requests)
+                _schedule(profile_requests, constants.TEST_PLAN_TESTS_ENDPOINT.format(constants.STATS_ISSUE_KEY),
+                          len(test_plan.test_plan_add_tests_json), test_exec_id, [plan])
+
+        rounds = _schedule_rounds(profile_requests, concurrency, rounds + 1)
+        offset = len(requests_schedule)
+        for request in profile_requests:
+            request[constants.DRY_RUN_AFTER_KEY] = [index + offset for index in request[constants.DRY_RUN_AFTER_KEY]]
+        requests_schedule.extend(profile_requests)
+
+    totals = {constants.DRY_RUN_TEST_EXECS_KEY: len(test_exec_reports),
+              constants.DRY_RUN_REQUESTS_KEY: len(requests_schedule), constants.DRY_RUN_ROUNDS_KEY: rounds,
+              constants.DRY_RUN_CONCURRENCY_KEY: concurrency,
+              constants.DRY_RUN_REQUEST_BYTES_KEY: sum(request[constants.DRY_RUN_BYTES_KEY]
+                                                       for request in requests_schedule)}
+    for key in constants.DRY_RUN_TOTAL_KEYS:
+        totals[key] = sum(report[key] for report in test_exec_reports)
+    return {constants.DRY_RUN_TEST_EXECS_KEY: test_exec_reports, constants.DRY_RUN_REQUESTS_KEY: requests_schedule,
+            constants.DRY_RUN_TOTALS_KEY: totals}
+
+
+def write_dry_run(report, path=None):
+    """
+    Prints the breakdown of a dry run by test execution and its totals, and writes the whole report as JSON
+
+    :param report: Report returned by dry_run
+    :param path: Path to the JSON report, STATS_STDOUT for the standard output, None to not write it
+    """
+    for test_exec_report in report[constants.DRY_RUN_TEST_EXECS_KEY]:
+        print(constants.DRY_RUN_TEST_EXEC_MESSAGE.format(
+            test_exec_report[constants.DRY_RUN_ID_KEY], test_exec_report[constants.DRY_RUN_TESTS_KEY],
+            test_exec_report[constants.DRY_RUN_STEPS_KEY], test_exec_report[constants.DRY_RUN_EVIDENCES_KEY],
+            test_exec_report[constants.DRY_RUN_EVIDENCE_BYTES_KEY] / constants.DRY_RUN_MB,
+            test_exec_report[constants.DRY_RUN_JSON_BYTES_KEY] / constants.DRY_RUN_MB,
+            test_exec_report[constants.DRY_RUN_REQUESTS_KEY]))
+    totals = report[constants.DRY_RUN_TOTALS_KEY]
+    print(constants.DRY_RUN_TOTALS_MESSAGE.format(
+        totals[constants.DRY_RUN_TEST_EXECS_KEY], totals[constants.DRY_RUN_TESTS_KEY],
+        totals[constants.DRY_RUN_STEPS_KEY], totals[constants.DRY_RUN_EVIDENCES_KEY],
+        totals[constants.DRY_RUN_EVIDENCE_BYTES_KEY] / constants.DRY_RUN_MB,
+        totals[constants.DRY_RUN_REQUEST_BYTES_KEY] / constants.DRY_RUN_MB, totals[constants.DRY_RUN_REQUESTS_KEY],
+        totals[constants.DRY_RUN_ROUNDS_KEY], totals[constants.DRY_RUN_CONCURRENCY_KEY]))
+
+    if path:
+        report_json = json.dumps(report, indent=2, sort_keys=True)
+        if path == constants.STATS_STDOUT:
+            print(report_json)
+        else:
+            with open(path, 'w') as report_file:
+                report_file.write(report_json + '\n')
+
+
+def _daemon_parse(xml_files, import_options, executor=None, model_cache=None):
+    """
+    Parses output files for the daemon, reusing the test executions kept in the model cache.
+    With an executor, the files are parsed by its worker processes at the same time.
+
+    :param xml_files: Robot Framework XML output files
+    :param import_options: Arguments of import_file, besides the output file
+    :param executor: Process pool started with _init_worker, None to parse the files in this process
+    :param model_cache: ModelCache of the test executions parsed, by file signature
+    :return:
+        For each file, its signature and its test executions by filter profile, or the exception that made it fail
+    """
+    signatures = []
+    parsed = []
+    futures = {}
+    for xml_file in xml_files:
+        try:
+            signature = file_signature(xml_file)
+        except OSError as e:
+            signatures.append(None)
+            parsed.append(e)
+            continue
+        signatures.append(signature)
+        profile_test_execs = model_cache.get(signature) if model_cache else None
+        if profile_test_execs is None:
+            if executor is not None:
+                futures[len(parsed)] = executor.submit(_import_file_stats, xml_file, workers=0, **import_options)
+            else:
+                try:
+                    profile_test_execs = import_file(xml_file, **import_options)
+                except Exception as e:
+                    profile_test_execs = e
+        parsed.append(profile_test_execs)
+
+    for index, future in futures.items():
+        try:
+            parsed[index], worker_stats = future.result()
+            stats.merge(*worker_stats)
+        except Exception as e:
+            parsed[index] = e
+
+    if model_cache:
+        for signature, profile_test_execs in zip(signatures, parsed):
+            if not isinstance(profile_test_execs, Exception):
+                model_cache.put(signature, profile_test_execs)
+    return list(zip(signatures, parsed))
+
+
+def daemon_import(xml_files, import_options, upload_options, executor=None, model_cache=None, journal=None,
+                  stats_path=None, max_test_exec_bytes=0):
+    """
+    Imports a batch of output files for the daemon, each one as its own test executions. The files are parsed
+    together, and their test executions sent at the same time, bounded by the upload concurrency.
+    Test executions are recorded in the journal by the signature of their output file, so a file submitted again
+    unchanged only sends what was not sent before.
+
+    :param xml_files: Robot Framework XML output files
+    :param import_options: Arguments of import_file, besides the output file
+    :param upload_options: Arguments of upload_batch, besides the batch and the journal
+    :param executor: Process pool started with _init_worker, None to parse the files in this process
+    :param model_cache: ModelCache of the test executions parsed, by file signature
+    :param journal: Journal of the daemon
+    :param stats_path: Path where the stats are written after the batch, None to not write them
+    :param max_test_exec_bytes: Maximum size of the evidence files of a test execution, in bytes. 0 for no limit
+    :return:
+        For each file, the keys of its test executions or the exception that made it fail
+    """
+    with stats.timer(constants.STATS_PARSE):
+        parsed = _daemon_parse(xml_files, import_options, executor, model_cache)
+        if evidence_processor is not None or max_test_exec_bytes:
+            for index, (signature, profile_test_execs) in enumerate(parsed):
+                if not isinstance(profile_test_execs, Exception):
+                    try:
+                        process_evidences(profile_test_execs, max_test_exec_bytes)
+                    except Exception as e:
+                        parsed[index] = signature, e
+
+    results = []
+    batch = []
+    positions = []  # index of the output file of each import of the batch
+    for signature, profile_test_execs in parsed:
+        if isinstance(profile_test_execs, Exception):
+            results.append(profile_test_execs)
+            continue
+        for profile, test_execs in profile_test_execs.items():
+            test_exec_ids = OrderedDict()
+            for test_exec_id, test_exec in test_execs.items():
+                if profile is not None:
+                    test_exec_id = constants.FILTER_PROFILE_TEST_EXEC_ID.format(profile, test_exec_id)
+                test_exec_ids[constants.DAEMON_TEST_EXEC_ID.format(signature, test_exec_id)] = test_exec
+            positions.append(len(results))
+            batch.append(test_exec_ids)
+        results.append([])
+
+    with stats.timer(constants.STATS_UPLOAD):
+        uploaded = upload_batch(batch, journal=journal, **upload_options)
+
+    for index, test_exec_keys in zip(positions, uploaded):
+        if isinstance(results[index], BaseException):
+            continue
+        if isinstance(test_exec_keys, BaseException):
+            results[index] = test_exec_keys
+        else:
+            results[index].extend(test_exec_keys)
+
+    if stats_path:
+        write_stats(stats_path)
+    return results
+
+
+def run_daemon(args, xml_files, import_options, upload_options, journal):
+    """
+    Runs the import daemon until it is interrupted (Ctrl+C or SIGTERM), importing the output files written to the
+    watched directory, posted to the HTTP endpoint or given as arguments. The session to JIRA, the worker processes,
+    the evidence cache and the parsed output files are kept from one batch to the next.
+
+    :param args: Parsed arguments
+    :param xml_files: Output files to import once the daemon starts
+    :param import_options: Arguments of import_file, besides the output file
+    :param upload_options: Arguments of upload_batch, besides the batch and the journal
+    :param journal: Journal of the daemon
+    """
+    if args.watch and not os.path.isdir(args.watch):
+        raise Exception(constants.DAEMON_NO_FILE.format(args.watch))
+
+    executor = None
+    if args.workers:
+        # start the worker processes now, so they are not forked from the threads of the daemon, ignoring Ctrl+C
+        # as the daemon shuts them down
+        handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            executor = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker)
+            executor.submit(_init_worker).result()
+        finally:
+            signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    spool = tempfile.mkdtemp(prefix=constants.DAEMON_SPOOL_PREFIX) if args.serve else None
+    import_batch = functools.partial(daemon_import, import_options=import_options, upload_options=upload_options,
+                                     executor=executor, model_cache=ModelCache(args.model_cache), journal=journal,
+                                     stats_path=args.stats,
+                                     max_test_exec_bytes=int(args.evidence_test_exec_max_size * 1024 * 1024))
+    daemon = ImportDaemon(import_batch, args.batch_window, args.batch_size)
+    services = []
+    try:
+        if args.watch:
+            services.append(DirectoryWatcher(daemon, args.watch, args.watch_pattern, args.watch_settle).start())
+            print(constants.DAEMON_WATCH_MESSAGE.format(os.path.abspath(args.watch)))
+        if args.serve:
+            server = ImportServer(daemon, args.serve, spool).start()
+            services.append(server)
+            print(constants.DAEMON_SERVE_MESSAGE.format(server.url))
+        for xml_file in xml_files:
+            daemon.submit(xml_file)
+        daemon.start()
+        while True:
+            time.sleep(constants.DAEMON_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for service in services:
+            service.stop()
+        print(constants.DAEMON_STOP_MESSAGE.format(len(daemon.queue)))
+        daemon.stop()
+        if executor is not None:
+            executor.shutdown()
+        if spool:
+            shutil.rmtree(spool, ignore_errors=True)
+
+
+def _journal_fingerprint(args, xml_files):
+    """
+    Identifies an import by its output files and by the arguments that change what is sent to JIRA
+
+    :param args: Parsed arguments
+    :param xml_files: Output files, with the glob patterns expanded, already read if one is the standard input
+    :return:
+        Fingerprint string
+    """
+    values = dict((key, value) for key, value in vars(args).items() if key not in constants.JOURNAL_IGNORED_ARGUMENTS)
+    values[constants.FILE] = []
+    for xml_file in xml_files:
+        if xml_file == constants.INPUT_STDIN:
+            # a piped output file has no path nor stat, it is told apart by the digest of its content
+            values[constants.FILE].append([xml_file, rfw2xray_input.stdin_digest.hexdigest()])
+        else:
+            stat = os.stat(xml_file)
+            values[constants.FILE].append([os.path.abspath(xml_file), stat.st_size, stat.st_mtime])
+    if args.filter_profiles_file:
+        with open(args.filter_profiles_file) as profiles_file:
+            values[constants.FILTER_PROFILES_FILE] = profiles_file.read()
+    return hashlib.sha1(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def write_stats(path):
+    """
+    Writes the stats of the import as JSON, with the counters of the evidence cache
+
+    :param path: Path to the stats file, STATS_STDOUT for the standard output
+    """
+    summary = stats.summary()
+    summary['counters'].update({
+        constants.STATS_EVIDENCE_FILES_READ: evidence_cache.files_read,
+        constants.STATS_EVIDENCE_BYTES_READ: evidence_cache.bytes_read,
+        constants.STATS_EVIDENCE_BYTES_ENCODED: evidence_cache.encoded_bytes,
+        constants.STATS_EVIDENCE_BYTES_DEDUPLICATED: evidence_cache.deduplicated_bytes,
+    })
+    stats_json = json.dumps(summary, indent=2, sort_keys=True)
+    if path == constants.STATS_STDOUT:
+        print(stats_json)
+    else:
+        with open(path, 'w') as stats_file:
+            stats_file.write(stats_json + '\n')
+
+
+def write_memory_trace(path):
+    """
+    Writes the peak memory traced by tracemalloc and the lines that allocated the most memory still in use
+
+    :param path: Path to the memory trace file
+    """
+    _, peak = tracemalloc.get_traced_memory()
+    top_stats = tracemalloc.take_snapshot().statistics('lineno')[:constants.TRACE_MEMORY_TOP]
+    with open(path, 'w') as trace_file:
+        trace_file.write(constants.TRACE_MEMORY_PEAK.format(peak) + '\n')
+        for top_stat in top_stats:
+            trace_file.write(str(top_stat) + '\n')
+
+
+def write_instrumentation(args, profiler=None):
+    """
+    Writes the stats, the profile and the memory trace asked for in the arguments
+
+    :param args: Parsed arguments
+    :param profiler: cProfile profiler enabled for the import, None if it is not profiled
+    """
+    if args.stats:
+        write_stats(args.stats)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+    if args.trace_memory:
+        write_memory_trace(args.trace_memory)
+
+
 def parse_arguments():
 
     if sys.version_info[0] < 3: # Python 2
@@ -640,7 +2180,7 @@ def parse_arguments():
         formatter_class=RawTextHelpFormatter
     )
 
-    parser.add_argument(constants.FILE, help=constants.FILE_HELP)
+    parser.add_argument(constants.FILE, nargs=constants.FILE_NARGS, help=constants.FILE_HELP)
     parser.add_argument(constants.URL, help=constants.URL_HELP)
     parser.add_argument(constants.USERNAME, help=constants.USERNAME_HELP)
     parser.add_argument(constants.PASSWORD, help=constants.PASSWORD_HELP)
@@ -660,6 +2200,15 @@ def parse_arguments():
     parser.add_argument(constants.FILTER_TEST_CASE, constants.FILTER_TEST_CASE_EXTENDED,
                         help=constants.FILTER_TEST_CASE_HELP, action=constants.FILTER_TEST_CASE_ACTION)
 
+    parser.add_argument(constants.FILTER_EXPRESSION, constants.FILTER_EXPRESSION_EXTENDED,
+                        help=constants.FILTER_EXPRESSION_HELP, action=constants.FILTER_EXPRESSION_ACTION)
+
+    parser.add_argument(constants.FILTER_PROFILE, constants.FILTER_PROFILE_EXTENDED,
+                        help=constants.FILTER_PROFILE_HELP, action=constants.FILTER_PROFILE_ACTION)
+
+    parser.add_argument(constants.FILTER_PROFILES_FILE, constants.FILTER_PROFILES_FILE_EXTENDED,
+                        help=constants.FILTER_PROFILES_FILE_HELP)
+
     parser.add_argument(constants.FILTER_OPTION, constants.FILTER_OPTION_EXTENDED,
                         default=constants.FILTER_OPTION_DEFAULT, help=constants.FILTER_OPTION_HELP)
 
@@ -714,8 +2263,123 @@ def parse_arguments():
     # Add option to add attachment
     parser.add_argument(constants.ATTACHMENT, constants.ATTACHMENT_EXTENDED, help=constants.ATTACHMENT_HELP)
 
+    parser.add_argument(constants.ATTACHMENT_COMPRESSION, constants.ATTACHMENT_COMPRESSION_EXTENDED,
+                        choices=constants.ATTACHMENT_COMPRESSION_CHOICES, help=constants.ATTACHMENT_COMPRESSION_HELP)
+
+    parser.add_argument(constants.ATTACHMENT_COMPRESSION_THRESHOLD, constants.ATTACHMENT_COMPRESSION_THRESHOLD_EXTENDED,
+                        type=float, default=constants.ATTACHMENT_COMPRESSION_THRESHOLD_DEFAULT,
+                        help=constants.ATTACHMENT_COMPRESSION_THRESHOLD_HELP)
+
+    # Add option to parse test cases in parallel
+    parser.add_argument(constants.WORKERS, constants.WORKERS_EXTENDED, type=int, default=constants.WORKERS_DEFAULT,
+                        help=constants.WORKERS_HELP)
+
+    # Add option to send test executions in parallel
+    parser.add_argument(constants.UPLOAD_CONCURRENCY, constants.UPLOAD_CONCURRENCY_EXTENDED, type=int,
+                        default=constants.UPLOAD_CONCURRENCY_DEFAULT, help=constants.UPLOAD_CONCURRENCY_HELP)
+
+    # Add options to split test executions in several imports
+    parser.add_argument(constants.CHUNK_TESTS, constants.CHUNK_TESTS_EXTENDED, type=int,
+                        default=constants.CHUNK_TESTS_DEFAULT, help=constants.CHUNK_TESTS_HELP)
+
+    parser.add_argument(constants.CHUNK_SIZE, constants.CHUNK_SIZE_EXTENDED, type=float,
+                        default=constants.CHUNK_SIZE_DEFAULT, help=constants.CHUNK_SIZE_HELP)
+
+    # Add options to retry requests and limit their rate
+    parser.add_argument(constants.RETRIES, constants.RETRIES_EXTENDED, type=int, default=constants.RETRIES_DEFAULT,
+                        help=constants.RETRIES_HELP)
+
+    parser.add_argument(constants.RETRY_BACKOFF, constants.RETRY_BACKOFF_EXTENDED, type=float,
+                        default=constants.RETRY_BACKOFF_DEFAULT, help=constants.RETRY_BACKOFF_HELP)
+
+    parser.add_argument(constants.RATE_LIMIT, constants.RATE_LIMIT_EXTENDED, type=float,
+                        default=constants.RATE_LIMIT_DEFAULT, help=constants.RATE_LIMIT_HELP)
+
+    # Add options to resume an interrupted import
+    parser.add_argument(constants.RESUME, constants.RESUME_EXTENDED, action='store_true', help=constants.RESUME_HELP)
+
+    parser.add_argument(constants.JOURNAL, constants.JOURNAL_EXTENDED, help=constants.JOURNAL_HELP)
+
+    # Add option to set the size of the evidence cache
+    parser.add_argument(constants.EVIDENCE_CACHE, constants.EVIDENCE_CACHE_EXTENDED, type=int,
+                        default=constants.EVIDENCE_CACHE_DEFAULT, help=constants.EVIDENCE_CACHE_HELP)
+
+    # Add options to make evidences smaller before they are encoded
+    parser.add_argument(constants.EVIDENCE_MAX_DIMENSION, constants.EVIDENCE_MAX_DIMENSION_EXTENDED, type=int,
+                        default=constants.EVIDENCE_MAX_DIMENSION_DEFAULT, help=constants.EVIDENCE_MAX_DIMENSION_HELP)
+
+    parser.add_argument(constants.EVIDENCE_FORMAT, constants.EVIDENCE_FORMAT_EXTENDED,
+                        choices=constants.EVIDENCE_FORMAT_CHOICES, help=constants.EVIDENCE_FORMAT_HELP)
+
+    parser.add_argument(constants.EVIDENCE_QUALITY, constants.EVIDENCE_QUALITY_EXTENDED, type=int,
+                        default=constants.EVIDENCE_QUALITY_DEFAULT, help=constants.EVIDENCE_QUALITY_HELP)
+
+    parser.add_argument(constants.EVIDENCE_OPTIMIZE, constants.EVIDENCE_OPTIMIZE_EXTENDED, action='store_true',
+                        help=constants.EVIDENCE_OPTIMIZE_HELP)
+
+    parser.add_argument(constants.EVIDENCE_MAX_SIZE, constants.EVIDENCE_MAX_SIZE_EXTENDED, type=float,
+                        default=constants.EVIDENCE_MAX_SIZE_DEFAULT, help=constants.EVIDENCE_MAX_SIZE_HELP)
+
+    parser.add_argument(constants.EVIDENCE_TEST_EXEC_MAX_SIZE, constants.EVIDENCE_TEST_EXEC_MAX_SIZE_EXTENDED,
+                        type=float, default=constants.EVIDENCE_TEST_EXEC_MAX_SIZE_DEFAULT,
+                        help=constants.EVIDENCE_TEST_EXEC_MAX_SIZE_HELP)
+
+    parser.add_argument(constants.EVIDENCE_WORKERS, constants.EVIDENCE_WORKERS_EXTENDED, type=int,
+                        default=constants.EVIDENCE_WORKERS_DEFAULT, help=constants.EVIDENCE_WORKERS_HELP)
+
+    parser.add_argument(constants.EVIDENCE_ATTACHMENTS, constants.EVIDENCE_ATTACHMENTS_EXTENDED, action='store_true',
+                        help=constants.EVIDENCE_ATTACHMENTS_HELP)
+
+    parser.add_argument(constants.DUPLICATE_TESTS, constants.DUPLICATE_TESTS_EXTENDED,
+                        choices=constants.DUPLICATE_TESTS_CHOICES, default=constants.DUPLICATE_TESTS_DEFAULT,
+                        help=constants.DUPLICATE_TESTS_HELP)
+
+    parser.add_argument(constants.STATS, constants.STATS_EXTENDED, nargs='?', const=constants.STATS_STDOUT,
+                        help=constants.STATS_HELP)
+
+    parser.add_argument(constants.PROFILE, constants.PROFILE_EXTENDED, help=constants.PROFILE_HELP)
+
+    parser.add_argument(constants.TRACE_MEMORY, constants.TRACE_MEMORY_EXTENDED, help=constants.TRACE_MEMORY_HELP)
+
+    parser.add_argument(constants.DRY_RUN, constants.DRY_RUN_EXTENDED, nargs='?', const='',
+                        help=constants.DRY_RUN_HELP)
+
+    # Add options to run as a daemon
+    parser.add_argument(constants.WATCH, constants.WATCH_EXTENDED, help=constants.WATCH_HELP)
+
+    parser.add_argument(constants.WATCH_PATTERN, constants.WATCH_PATTERN_EXTENDED,
+                        action=constants.WATCH_PATTERN_ACTION, help=constants.WATCH_PATTERN_HELP)
+
+    parser.add_argument(constants.WATCH_SETTLE, constants.WATCH_SETTLE_EXTENDED, type=float,
+                        default=constants.WATCH_SETTLE_DEFAULT, help=constants.WATCH_SETTLE_HELP)
+
+    parser.add_argument(constants.SERVE, constants.SERVE_EXTENDED, help=constants.SERVE_HELP)
+
+    parser.add_argument(constants.BATCH_WINDOW, constants.BATCH_WINDOW_EXTENDED, type=float,
+                        default=constants.BATCH_WINDOW_DEFAULT, help=constants.BATCH_WINDOW_HELP)
+
+    parser.add_argument(constants.BATCH_SIZE, constants.BATCH_SIZE_EXTENDED, type=int,
+                        default=constants.BATCH_SIZE_DEFAULT, help=constants.BATCH_SIZE_HELP)
+
+    parser.add_argument(constants.MODEL_CACHE, constants.MODEL_CACHE_EXTENDED, type=int,
+                        default=constants.MODEL_CACHE_DEFAULT, help=constants.MODEL_CACHE_HELP)
+
     args = parser.parse_args()
 
+    if not args.file and not args.watch and not args.serve:
+        parser.error(constants.DAEMON_NO_INPUT)
+    if args.dry_run is not None and (args.watch or args.serve):
+        parser.error(constants.DRY_RUN_DAEMON)
+    if args.attachment and (args.watch or args.serve):
+        parser.error(constants.DAEMON_ATTACHMENT)
+    # compiled before the input is read, so that a typo in a filter fails right away with the usage message
+    try:
+        for expression in args.filter_expression or ():
+            compile_expression(expression)
+        read_filter_profiles(args.filter_profiles_file, args.filter_profile or ())
+    except (ValueError, OSError) as error:
+        parser.error(str(error))
+
     return args
 
 def get_list_arguments(attachments):
@@ -730,8 +2394,16 @@ if __name__ == '__main__':
 
     args = parse_arguments()
 
-    # output XML file
-    file = args.file
+    # profiling of the import
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if args.trace_memory:
+        tracemalloc.start(constants.TRACE_MEMORY_FRAMES)
+
+    # output XML files
+    files = expand_files(args.file)
 
     # JIRA server configuration
     jira_address = args.url   # 'http://10.12.7.54:8080'  # CHANGE
@@ -762,9 +2434,19 @@ if __name__ == '__main__':
     if filter_test_case:
         import_filters[constants.FILTER_TEST_CASE_KEY] = filter_test_case  # list with test case filters
 
+    # filter tests by filter expressions
+    filter_expression = args.filter_expression
+    if filter_expression:
+        import_filters[constants.FILTER_EXPRESSION_KEY] = filter_expression  # list with filter expressions
+
     # option for the relationship between filters
     filter_option = args.filter_options
 
+    # named filter profiles, each one imported as a separate test execution
+    profiles = read_filter_profiles(args.filter_profiles_file, args.filter_profile or ())
+    if profiles and import_filters:
+        raise Exception(constants.FILTER_PROFILE_CONFLICT)
+
     # filter evidences. None; Fail only; or All
     evidences_import = args.evidences_selection
 
@@ -774,6 +2456,17 @@ if __name__ == '__main__':
     # path to certicate
     certificate = args.certificate if args.certificate else False
 
+    # size of the cache of encoded evidences, in bytes
+    evidence_cache.max_bytes = args.evidence_cache * 1024 * 1024
+
+    # processing of the evidences, making them smaller while the output file is parsed
+    if args.evidence_max_dimension or args.evidence_format or args.evidence_optimize or args.evidence_max_size:
+        evidence_processor = EvidenceProcessor(args.evidence_max_dimension, args.evidence_format,
+                                               args.evidence_quality, args.evidence_optimize,
+                                               int(args.evidence_max_size * 1024), args.evidence_workers)
+        atexit.register(evidence_processor.close)
+    evidence_test_exec_bytes = int(args.evidence_test_exec_max_size * 1024 * 1024)
+
     # Test Execution Info
     test_exec_info_values = {}
 
@@ -806,123 +2499,105 @@ if __name__ == '__main__':
             split(constants.TEST_EXECUTION_INFO_TESTENVIRONMENTS_SEPERATOR)
 
 
-    if filter_test_suite or filter_test_case or filter_tag:
-        if constants.TEST_EXECUTION_INFO_SUMMARY_KEY not in test_exec_info_values:
+    if constants.TEST_EXECUTION_INFO_SUMMARY_KEY not in test_exec_info_values:
+        if profiles or import_filters:
             test_exec_info_values[constants.TEST_EXECUTION_INFO_SUMMARY_KEY] = constants.TEST_EXECUTION_SUMMARY_FILTERS
-
-        test_execs = filtering_import(file, test_steps_filter,
-                                      evidences_import, import_filters, filter_option, **test_exec_info_values)
-    else:
-
-        if constants.TEST_EXECUTION_INFO_SUMMARY_KEY not in test_exec_info_values:
-            test_exec_info_values[constants.TEST_EXECUTION_INFO_SUMMARY_KEY] = constants.TEST_EXECUTION_SUMMARY
-
-        test_execs = no_filtering_import(file, test_steps_filter, evidences_import, **test_exec_info_values)
-
-
-    # Default value of test_exec_key
-    test_exec_key = "Undefined"
-    list_test_cases = []
-
-    for key, test_exec in test_execs.items():
-        json_data = json.dumps(todict(test_exec))
-        response = create_test_exec(json_data, certificate)
-        if response:
-            json_response = json.loads(response.text)
-            if debug_mode:
-                test_keys = []
-                for test in test_exec.tests:
-                    test_keys.append(test.testKey)
-                if hasattr(test_exec, constants.TEST_EXECUTION_KEY):
-
-                    print(constants.DEBUG_UPDATE.format(len(test_keys), test_exec.testExecutionKey, ",".join(test_keys)))
-                else:
-                    print(constants.DEBUG_CREATE.format(test_exec.info.summary, len(test_exec.tests), ",".join(test_keys)))
-                print(json_response)
-            test_exec_key = json_response[constants.TEST_EXEC_ISSUE][constants.KEY]
-            # Prepare msg before print. Makes python2 more readable
-            msg = "Test Exec created: " + test_exec_key
-            print(msg)
         else:
-            # Prepare msg before print. Makes python2 more readable
-            msg = "Error: " + str(response.status_code)
-            print(msg)
-            #sys.exit(1) Does not work with executable
-            raise Exception(response.text)
+            test_exec_info_values[constants.TEST_EXECUTION_INFO_SUMMARY_KEY] = constants.TEST_EXECUTION_SUMMARY
 
     # Get list of attachments from arguments
     list_arguments = get_list_arguments(args.attachment)
 
-    # Add attachements to test executions if were given as arguments.
-    for filepath in list_arguments:
-        response = add_attachment_test_exec(test_exec_key, filepath, certificate)
-        file = os.path.basename(filepath) # get file name for better message
-        if response:
-            msg = file + " was added to test execution " + test_exec_key
-            print(msg)
-        else:
-            # Prepare msg before print. Makes python2 more readable
-            msg = "Could not add " + file + " to test execution. Error: " + str(response.status_code)
-            print(msg)
-            print(response.text)
-
     # Create test plan if such was not given as argument. Associate test execution created to the test plan
     # The test exec created should be done ad hoc, which means, without associated to any test plan. So, no test plan will be created and no test plan will be associated to the test execution
-    if not args.test_plan_key and not args.ad_hoc:
-
-        # Get Project Name from text_exec_key. Format: "ROBRX-123", e.g
-        project_key = test_exec_key.split('-')[0]
-
-        # Create Test Plan object, taking into account if the name was given as argument
-        if args.test_plan_summary:
-            newTestPlan = TestPlan(project_key,summary=args.test_plan_summary)
-        else:
-            newTestPlan = TestPlan(project_key)
-
-        response = create_test_plan(newTestPlan.test_plan_json, certificate)
-        test_plan_key = "Undefined"
-        if response:
-            json_response = json.loads(response.text)
-            test_plan_key = json_response[constants.KEY]
-            # Prepare msg before print. Makes python2 more readable
-            msg = "Test Plan created: " + test_plan_key
-            print(msg)
-        else:
-            # Prepare msg before print. Makes python2 more readable
-            msg = "Error: " + str(response.status_code)
-            print(msg)
-            #sys.exit(1) Does not work with executable
-            raise Exception(response.text)
-
-        # Add test exec created to the test plan created
-        newTestPlan.add_test_exec([test_exec_key])
-        response = add_test_exec_to_test_plan(newTestPlan.test_plan_add_test_exec_json, test_plan_key, certificate)
-        if response:
-            # Prepare msg before print. Makes python2 more readable
-            msg = "Test Exec " + test_exec_key + " was sucessfully linked to Test Plan " + test_plan_key
-            print(msg)
-        else:
-            # Prepare msg before print. Makes python2 more readable
-            msg = "Error: " + str(response.status_code)
-            print(msg)
-            #sys.exit(1) Does not work with executable
-            raise Exception(response.text)
-
-        # Get list of test cases
-        dict_test_cases = todict(test_exec)
-        for test_case in dict_test_cases.get("tests",""):
-            list_test_cases.append(test_case.get("testKey",""))
-
-        # Add test cases, from xml of execution (e.g output.xml), to the test plan created
-        newTestPlan.add_tests(list_test_cases)
-        response = add_tests_to_test_plan(newTestPlan.test_plan_add_tests_json, test_plan_key, certificate)
-        if response:
-            # Prepare msg before print. Makes python2 more readable
-            msg = "Tests " + str(list_test_cases) + " were sucessfully linked to Test Plan " + test_plan_key
-            print(msg)
-        else:
-            # Prepare msg before print. Makes python2 more readable
-            msg = "Error: " + str(response.status_code)
-            print(msg)
-            #sys.exit(1) Does not work with executable
-            raise Exception(response.text)
\ No newline at end of file
+    create_plan = not args.test_plan_key and not args.ad_hoc
+
+    upload_concurrency = max(1, args.upload_concurrency)
+    session = create_session(upload_concurrency)
+    retries = args.retries
+    retry_backoff = args.retry_backoff
+    rate_limiter = TokenBucket(args.rate_limit)
+    attachment_compression = args.attachment_compression
+    attachment_compression_bytes = int(args.attachment_compression_threshold * 1024 * 1024)
+
+    if args.watch or args.serve:
+        # Run as a daemon, importing each output file on its own as it is produced
+        import_options = dict(test_exec_info_values, test_steps_filter=test_steps_filter,
+                              evidences_import=evidences_import, import_filters=import_filters,
+                              filter_option=filter_option, profiles=profiles)
+        upload_options = dict(cert=certificate, attachments=list_arguments, create_plan=create_plan,
+                              test_plan_summary=args.test_plan_summary, concurrency=upload_concurrency,
+                              debug_mode=debug_mode, chunk_tests=args.chunk_tests,
+                              chunk_bytes=args.chunk_size * 1024 * 1024,
+                              evidence_attachments=args.evidence_attachments)
+        # the journal of the daemon is kept in memory, unless a journal file is given
+        journal = Journal(args.journal, _journal_fingerprint(args, []), args.resume)
+        try:
+            run_daemon(args, files, import_options, upload_options, journal)
+        finally:
+            journal.close()
+            write_instrumentation(args, profiler)
+        sys.exit(0)
+
+    # Test executions to import, by filter profile (None without profiles)
+    parse_start = time.perf_counter()
+    profile_test_execs = import_files(files, test_steps_filter, evidences_import, import_filters, filter_option,
+                                      profiles, args.workers, args.duplicate_tests, **test_exec_info_values)
+    if evidence_processor is not None or evidence_test_exec_bytes:
+        process_evidences(profile_test_execs, evidence_test_exec_bytes)
+    stats.add_time(constants.STATS_PARSE, time.perf_counter() - parse_start)
+
+    if args.dry_run is not None:
+        # Report what the upload would send, without sending it
+        try:
+            write_dry_run(dry_run(profile_test_execs, list_arguments, create_plan, args.test_plan_summary,
+                                  upload_concurrency, args.chunk_tests, args.chunk_size * 1024 * 1024, endpoint,
+                                  args.evidence_attachments),
+                          args.dry_run)
+        finally:
+            write_instrumentation(args, profiler)
+        sys.exit(0)
+
+
+    # Record the requests committed to JIRA, so that the import can be resumed if it fails
+    if args.journal:
+        journal_path = args.journal
+    elif files[0] == constants.INPUT_STDIN:
+        journal_path = constants.JOURNAL_STDIN
+    else:
+        journal_path = files[0] + constants.JOURNAL_EXTENSION
+    journal_fingerprint = _journal_fingerprint(args, files)
+    try:
+        journal = Journal(journal_path, journal_fingerprint, args.resume)
+    except OSError as error:
+        if args.resume:
+            raise
+        # as a read-only directory of output files, the import goes on without a journal file
+        print(constants.JOURNAL_UNAVAILABLE.format(journal_path, error))
+        journal = Journal(None, journal_fingerprint)
+
+    upload_start = time.perf_counter()
+    try:
+        for profile, test_execs in profile_test_execs.items():
+            if profile is not None:
+                print(constants.FILTER_PROFILE_MESSAGE.format(profile))
+                # the test executions of each profile are recorded apart in the journal
+                test_execs = OrderedDict(
+                    (constants.FILTER_PROFILE_TEST_EXEC_ID.format(profile, test_exec_id), test_exec)
+                    for test_exec_id, test_exec in test_execs.items())
+            upload(test_execs, certificate, list_arguments, create_plan, args.test_plan_summary, upload_concurrency,
+                   debug_mode, args.chunk_tests, args.chunk_size * 1024 * 1024, journal, args.evidence_attachments)
+        # once everything was sent there is nothing to resume, unless an attachment or an evidence failed
+        journal.remove()
+        if journal.failures and journal.path is not None:
+            print(constants.JOURNAL_KEPT.format(journal.path, journal.failures))
+    finally:
+        journal.close()
+        stats.add_time(constants.STATS_UPLOAD, time.perf_counter() - upload_start)
+
+        # the stats and profiles are written even if the upload failed
+        write_instrumentation(args, profiler)
+
+    if debug_mode:
+        print(constants.DEBUG_EVIDENCES.format(evidence_cache.files_read, evidence_cache.bytes_read,
+                                               evidence_cache.deduplicated_bytes))
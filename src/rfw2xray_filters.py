@@ -0,0 +1,254 @@
+import re
+import json
+import fnmatch
+from collections import OrderedDict, deque
+import constants
+
+
+def _compile_pattern(pattern):
+    """
+    Compile a filter pattern into a function that matches a string. Patterns between slashes are regular expressions,
+    patterns with wildcards (*, ?, [...]) are globs, and any other pattern is an exact value
+
+    :param pattern: Filter pattern, optionally quoted
+    :return:
+        Function matching a string with the pattern
+    """
+    if len(pattern) >= 2 and pattern[0] == pattern[-1] == '"':
+        pattern = pattern[1:-1].replace('\\"', '"')
+    if len(pattern) >= 2 and pattern[0] == pattern[-1] == '/':
+        try:
+            return re.compile(pattern[1:-1]).search
+        except re.error as error:
+            raise ValueError(constants.FILTER_EXPRESSION_ERROR.format('invalid regular expression ' + pattern + ': ' +
+                                                                      str(error)))
+    if any(wildcard in pattern for wildcard in constants.FILTER_GLOB_WILDCARDS):
+        return re.compile(fnmatch.translate(pattern)).match
+    return pattern.__eq__
+
+
+def _compile_term(field, pattern):
+    """
+    Compile a field:pattern term of a filter expression
+
+    :return:
+        Function selecting test cases by name, tags and suites (names and dotted paths of the enclosing suites)
+    """
+    match = _compile_pattern(pattern)
+    if field == constants.FILTER_FIELD_TAG:
+        return lambda name, tags, suites: any(match(tag) for tag in tags)
+    if field == constants.FILTER_FIELD_SUITE:
+        return lambda name, tags, suites: any(match(suite) for suite in suites)
+    if field == constants.FILTER_FIELD_TEST:
+        return lambda name, tags, suites: bool(match(name))
+    raise ValueError(constants.FILTER_EXPRESSION_ERROR.format('unknown field "' + field + '"'))
+
+
+def compile_expression(expression):
+    """
+    Compile a filter expression into a function selecting test cases, with its patterns compiled once.
+
+    Grammar, with NOT binding tighter than AND, and AND tighter than OR:
+        expression := and_expression (OR and_expression)*
+        and_expression := not_expression (AND not_expression)*
+        not_expression := NOT not_expression | '(' expression ')' | field:pattern
+    Fields are tag, suite (matched against each enclosing suite name and dotted path, e.g. Top.Legacy) and test.
+    Example: tag:smoke* AND NOT suite:Legacy.*
+
+    :param expression: Filter expression
+    :return:
+        Function selecting test cases by name, tags and suites (names and dotted paths of the enclosing suites)
+    """
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        token = constants.FILTER_TOKEN_REGEX.match(expression, position)
+        if not token:
+            raise ValueError(constants.FILTER_EXPRESSION_ERROR.format('unexpected "' + expression[position:] + '"'))
+        tokens.append(token)
+        position = token.end()
+    tokens.reverse()
+
+    def _next(operator=None):
+        if tokens and (operator is None or (tokens[-1].group('word') or '').upper() == operator or
+                       tokens[-1].group('paren') == operator):
+            return tokens.pop()
+
+    def _or():
+        operands = [_and()]
+        while _next(constants.FILTER_OPERATOR_OR):
+            operands.append(_and())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda name, tags, suites: any(operand(name, tags, suites) for operand in operands)
+
+    def _and():
+        operands = [_not()]
+        while _next(constants.FILTER_OPERATOR_AND):
+            operands.append(_not())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda name, tags, suites: all(operand(name, tags, suites) for operand in operands)
+
+    def _not():
+        if _next(constants.FILTER_OPERATOR_NOT):
+            operand = _not()
+            return lambda name, tags, suites: not operand(name, tags, suites)
+        if _next('('):
+            operand = _or()
+            if not _next(')'):
+                raise ValueError(constants.FILTER_EXPRESSION_ERROR.format('missing ")"'))
+            return operand
+        token = _next()
+        if token is None or token.group('field') is None:
+            found = token.group(0).strip() if token else 'end of expression'
+            raise ValueError(constants.FILTER_EXPRESSION_ERROR.format('expected field:pattern, found ' + found))
+        return _compile_term(token.group('field').lower(), token.group('pattern'))
+
+    selector = _or()
+    if tokens:
+        raise ValueError(constants.FILTER_EXPRESSION_ERROR.format('unexpected "' + tokens[-1].group(0).strip() + '"'))
+    return selector
+
+
+class TestFilter:
+    """
+    Class that selects the test cases to import, compiled once from the importation filters.
+    Each kind of exact filter is kept as a set, so a test case is matched with a few hash lookups,
+    before its steps and evidences are parsed. Filter expressions are compiled with compile_expression,
+    and must all select the test case as well.
+
+    Args:
+        import_filters (dict): Importation filters, lists of values by filter key (tag, test suite, test case,
+            expression)
+        filter_option (str): Filter option, either intersection (AND) or union (OR) of the exact filters
+    """
+
+    def __init__(self, import_filters, filter_option=constants.FILTER_OPTION_AND):
+        self.tags = self._index(import_filters, constants.FILTER_TAG_KEY)
+        self.suites = self._index(import_filters, constants.FILTER_TEST_SUITE_KEY)
+        self.names = self._index(import_filters, constants.FILTER_TEST_CASE_KEY)
+        self.union = filter_option != constants.FILTER_OPTION_AND
+        self.expressions = [compile_expression(expression)
+                            for expression in import_filters.get(constants.FILTER_EXPRESSION_KEY, [])]
+
+    def _index(self, import_filters, key):
+        if key in import_filters:
+            return frozenset(import_filters[key])
+
+    def __call__(self, name, tags, suite_names):
+        """
+        Check if a test case is selected by the filters
+
+        :param name: Test case name
+        :param tags: Test case tags
+        :param suite_names: Names of the suites that contain the test case
+        :return:
+            Boolean value, True if the test case is selected
+        """
+        if self.expressions:
+            # suites are matched by name and by dotted path
+            suites = list(suite_names)
+            for index in range(1, len(suite_names)):
+                suites.append(constants.SUITE_PATH_SEPARATOR.join(suite_names[:index + 1]))
+            for expression in self.expressions:
+                if not expression(name, tags, suites):
+                    return False
+
+        matches = []
+        if self.tags is not None:
+            matches.append(not self.tags.isdisjoint(tags))
+        if self.suites is not None:
+            matches.append(not self.suites.isdisjoint(suite_names))
+        if self.names is not None:
+            matches.append(name in self.names)
+
+        if not matches:
+            return True
+        if self.union:
+            return any(matches)
+        return all(matches)
+
+
+class ProfilesFilter:
+    """
+    Class that selects the test cases matched by any of several named filter profiles, so that one parse of the
+    output file serves every profile. The profiles matching each selected test case are queued in document order,
+    which is the order in which the selected test cases are parsed and given back, even by a pool of workers.
+
+    Args:
+        profiles (dict): Importation filters and filter option, by profile name
+    """
+
+    def __init__(self, profiles):
+        self.filters = [(profile, TestFilter(import_filters, filter_option))
+                        for profile, (import_filters, filter_option) in profiles.items()]
+        self.selections = deque()
+
+    def __call__(self, name, tags, suite_names):
+        """
+        Check if a test case is selected by any profile, queuing the profiles that select it
+
+        :param name: Test case name
+        :param tags: Test case tags
+        :param suite_names: Names of the suites that contain the test case
+        :return:
+            Boolean value, True if the test case is selected
+        """
+        selection = [profile for profile, test_filter in self.filters if test_filter(name, tags, suite_names)]
+        if selection:
+            self.selections.append(selection)
+        return bool(selection)
+
+    def pop_selection(self):
+        """
+        Get the profiles that select the next parsed test case
+
+        :return:
+            List of profile names
+        """
+        return self.selections.popleft()
+
+
+def read_filter_profiles(profiles_file=None, profile_expressions=()):
+    """
+    Read the named filter profiles, from a JSON file and from NAME=EXPRESSION arguments.
+    In the file, each profile is either a filter expression or an object with lists of values by filter key
+    (tag, test suite, test case, expression) and the filter option, e.g.
+        {"payments": {"test suite": ["Payments"], "tag": ["smoke"], "option": "AND"}, "ui": "tag:ui-*"}
+
+    :param profiles_file: Path to the JSON file with the filter profiles, None for no file
+    :param profile_expressions: List of NAME=EXPRESSION profiles
+    :return:
+        Ordered dict with (importation filters, filter option) by profile name
+    """
+    profiles = OrderedDict()
+
+    if profiles_file:
+        with open(profiles_file) as profiles_json:
+            file_profiles = json.load(profiles_json, object_pairs_hook=OrderedDict)
+        for profile, profile_filters in file_profiles.items():
+            if not isinstance(profile_filters, dict):
+                profile_filters = {constants.FILTER_EXPRESSION_KEY: profile_filters}
+            import_filters = OrderedDict()
+            for key in constants.FILTER_KEYS:
+                if key in profile_filters:
+                    values = profile_filters[key]
+                    import_filters[key] = [values] if not isinstance(values, list) else values
+            if not import_filters:
+                raise ValueError(constants.FILTER_PROFILE_ERROR.format(profile, 'no filters'))
+            profiles[profile] = (import_filters,
+                                 profile_filters.get(constants.FILTER_PROFILE_OPTION_KEY, constants.FILTER_OPTION_AND))
+
+    for profile_expression in profile_expressions:
+        profile, separator, expression = profile_expression.partition(constants.FILTER_PROFILE_SEPARATOR)
+        if not separator or not profile:
+            raise ValueError(constants.FILTER_PROFILE_ERROR.format(profile_expression, 'expected NAME=EXPRESSION'))
+        profiles[profile] = ({constants.FILTER_EXPRESSION_KEY: [expression]}, constants.FILTER_OPTION_AND)
+
+    for profile, (import_filters, filter_option) in profiles.items():
+        # compiled right away, so that errors are reported before parsing
+        TestFilter(import_filters, filter_option)
+
+    return profiles
@@ -0,0 +1,88 @@
+import sys
+import gzip
+import hashlib
+import mmap
+from contextlib import contextmanager
+import lxml.etree as ET
+import constants
+
+# Optional, only needed to read Zstandard compressed output files
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# SHA-1 of the bytes read from the standard input, the only way to identify a piped output file
+stdin_digest = hashlib.sha1()
+
+
+class _DigestReader:
+    """
+    Binary stream that updates stdin_digest with every block read from the wrapped stream
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        stdin_digest.update(data)
+        return data
+
+
+@contextmanager
+def open_output_file(xml_file):
+    """
+    Open a Robot Framework output XML file as a binary stream, decompressing it on the fly.
+    Plain files are memory mapped, so the parser reads them straight from the page cache.
+
+    :param xml_file: Path to the output file, compressed if it ends with .gz or .zst, or INPUT_STDIN for the
+        standard input
+    :return:
+        Context manager of a binary file-like object
+    """
+    if xml_file == constants.INPUT_STDIN:
+        yield _DigestReader(sys.stdin.buffer)
+        return
+
+    if xml_file.endswith(constants.INPUT_GZIP_EXTENSION):
+        with gzip.open(xml_file, 'rb') as stream:
+            yield stream
+        return
+
+    if xml_file.endswith(constants.INPUT_ZSTANDARD_EXTENSION):
+        if zstandard is None:
+            raise ImportError(constants.INPUT_ZSTANDARD_MISSING.format(xml_file))
+        with open(xml_file, 'rb') as compressed:
+            with zstandard.ZstdDecompressor().stream_reader(compressed) as stream:
+                yield stream
+        return
+
+    with open(xml_file, 'rb') as stream:
+        try:
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty files and files that can not be mapped (pipes, some network file systems) are read as usual
+            yield stream
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def iterparse(xml_file, events, tag):
+    """
+    Parse a Robot Framework output XML file incrementally, as lxml's iterparse, from any input open_output_file
+    can read. The stream is fed to the parser block by block, so compressed files and the standard input are never
+    held in memory or written to disk
+
+    :param xml_file: Path to the output file, compressed if it ends with .gz or .zst, or INPUT_STDIN
+    :param events: Parser events to report
+    :param tag: Tags of the elements to report
+    :return:
+        Generator of (event, element)
+    """
+    with open_output_file(xml_file) as stream:
+        for event, element in ET.iterparse(stream, events=events, tag=tag):
+            yield event, element
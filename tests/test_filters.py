@@ -0,0 +1,172 @@
+"""
+    Unit tests of the filter expressions and filter profiles of rfw2xray_filters.
+
+    Run from the repository root with:
+
+        python -m unittest discover tests
+
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+sys.path.insert(0, SRC_DIR)
+
+import constants
+import rfw2xray_filters
+from rfw2xray_filters import compile_expression, read_filter_profiles
+
+
+def select(expression, name='Login', tags=(), suites=()):
+    return compile_expression(expression)(name, list(tags), list(suites))
+
+
+class PrecedenceTest(unittest.TestCase):
+
+    def test_and_binds_tighter_than_or(self):
+        # tag:a OR (tag:b AND tag:c)
+        self.assertTrue(select('tag:a OR tag:b AND tag:c', tags=['a']))
+        self.assertFalse(select('tag:a OR tag:b AND tag:c', tags=['b']))
+        self.assertTrue(select('tag:a OR tag:b AND tag:c', tags=['b', 'c']))
+
+    def test_not_binds_tighter_than_and(self):
+        # (NOT tag:a) AND tag:b
+        self.assertTrue(select('NOT tag:a AND tag:b', tags=['b']))
+        self.assertFalse(select('NOT tag:a AND tag:b', tags=['a', 'b']))
+        self.assertFalse(select('NOT tag:a AND tag:b', tags=[]))
+
+    def test_not_binds_tighter_than_or(self):
+        # (NOT tag:a) OR tag:b
+        self.assertTrue(select('NOT tag:a OR tag:b', tags=['a', 'b']))
+        self.assertTrue(select('NOT tag:a OR tag:b', tags=[]))
+        self.assertFalse(select('NOT tag:a OR tag:b', tags=['a']))
+
+    def test_parentheses_override_precedence(self):
+        self.assertFalse(select('(tag:a OR tag:b) AND tag:c', tags=['a']))
+        self.assertTrue(select('(tag:a OR tag:b) AND tag:c', tags=['a', 'c']))
+        self.assertTrue(select('NOT (tag:a AND tag:b)', tags=['a']))
+        self.assertFalse(select('NOT (tag:a AND tag:b)', tags=['a', 'b']))
+
+    def test_double_negation(self):
+        self.assertTrue(select('NOT NOT tag:a', tags=['a']))
+
+    def test_operators_are_case_insensitive(self):
+        self.assertTrue(select('tag:a or not tag:b', tags=[]))
+        self.assertFalse(select('tag:a and tag:b', tags=['a']))
+
+
+class PatternTest(unittest.TestCase):
+
+    def test_exact_value(self):
+        self.assertTrue(select('tag:smoke', tags=['smoke']))
+        self.assertFalse(select('tag:smoke', tags=['smoke-ui']))
+
+    def test_glob_matches_the_whole_value(self):
+        self.assertTrue(select('tag:smoke*', tags=['smoke-ui']))
+        self.assertTrue(select('tag:smoke-?i', tags=['smoke-ui']))
+        self.assertTrue(select('tag:[ab]', tags=['b']))
+        self.assertFalse(select('tag:moke*', tags=['smoke-ui']))
+
+    def test_regex_searches_the_value(self):
+        self.assertTrue(select('tag:/moke/', tags=['smoke-ui']))
+        self.assertTrue(select('test:/^Log(in|out)$/', name='Logout'))
+        self.assertFalse(select('test:/^Log(in|out)$/', name='Login page'))
+
+    def test_quoted_pattern_with_spaces_and_operators(self):
+        self.assertTrue(select('test:"Login page"', name='Login page'))
+        self.assertTrue(select('test:"a AND b"', name='a AND b'))
+        self.assertFalse(select('test:"Login page"', name='Login'))
+
+    def test_quoted_pattern_with_escaped_quote(self):
+        self.assertTrue(select(r'test:"say \"hi\""', name='say "hi"'))
+
+    def test_quoted_glob(self):
+        self.assertTrue(select('test:"Login *"', name='Login page'))
+
+    def test_fields(self):
+        self.assertTrue(select('test:Login', name='Login'))
+        self.assertTrue(select('suite:Payments', suites=['Top', 'Payments']))
+        self.assertFalse(select('suite:Payments', suites=['Top']))
+        self.assertTrue(select('TAG:a', tags=['a']))
+
+    def test_suites_match_by_dotted_path(self):
+        test_filter = rfw2xray_filters.TestFilter({constants.FILTER_EXPRESSION_KEY: ['suite:Top.Legacy*']})
+        self.assertTrue(test_filter('Login', [], ['Top', 'Legacy API']))
+        self.assertFalse(test_filter('Login', [], ['Other', 'Legacy API']))
+
+
+class ErrorTest(unittest.TestCase):
+
+    def assertInvalid(self, expression, message):
+        with self.assertRaises(ValueError) as context:
+            compile_expression(expression)
+        self.assertEqual(str(context.exception), constants.FILTER_EXPRESSION_ERROR.format(message))
+
+    def test_empty_expression(self):
+        self.assertInvalid('', 'expected field:pattern, found end of expression')
+
+    def test_dangling_operator(self):
+        self.assertInvalid('tag:a AND', 'expected field:pattern, found end of expression')
+        self.assertInvalid('tag:a OR', 'expected field:pattern, found end of expression')
+        self.assertInvalid('NOT', 'expected field:pattern, found end of expression')
+
+    def test_missing_operator(self):
+        self.assertInvalid('tag:a tag:b', 'unexpected "tag:b"')
+
+    def test_term_without_field(self):
+        self.assertInvalid('smoke', 'expected field:pattern, found smoke')
+        self.assertInvalid('tag:a AND OR tag:b', 'expected field:pattern, found OR')
+
+    def test_unbalanced_parentheses(self):
+        self.assertInvalid('(tag:a', 'missing ")"')
+        self.assertInvalid('tag:a)', 'unexpected ")"')
+
+    def test_unknown_field(self):
+        self.assertInvalid('owner:me', 'unknown field "owner"')
+
+    def test_invalid_regex(self):
+        with self.assertRaises(ValueError) as context:
+            compile_expression('tag:/[a/')
+        self.assertTrue(str(context.exception).startswith(
+            constants.FILTER_EXPRESSION_ERROR.format('invalid regular expression /[a/: ')))
+
+
+class ProfilesTest(unittest.TestCase):
+
+    def write_profiles(self, profiles):
+        descriptor, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(descriptor, 'w') as profiles_file:
+            profiles_file.write(profiles if isinstance(profiles, str) else json.dumps(profiles))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_profiles_from_file_and_arguments(self):
+        path = self.write_profiles({'payments': {'test suite': 'Payments', 'option': 'OR'}, 'ui': 'tag:ui-*'})
+        profiles = read_filter_profiles(path, ['smoke=tag:smoke'])
+        self.assertEqual(list(profiles), ['payments', 'ui', 'smoke'])
+        self.assertEqual(profiles['payments'], ({constants.FILTER_TEST_SUITE_KEY: ['Payments']}, 'OR'))
+        self.assertEqual(profiles['ui'], ({constants.FILTER_EXPRESSION_KEY: ['tag:ui-*']},
+                                          constants.FILTER_OPTION_AND))
+
+    def test_invalid_expression_in_profile(self):
+        with self.assertRaises(ValueError):
+            read_filter_profiles(None, ['smoke=tag:smoke AND'])
+        with self.assertRaises(ValueError):
+            read_filter_profiles(self.write_profiles({'ui': 'tag:/(/'}))
+
+    def test_profile_without_name_or_filters(self):
+        with self.assertRaises(ValueError):
+            read_filter_profiles(None, ['tag:smoke'])
+        with self.assertRaises(ValueError):
+            read_filter_profiles(self.write_profiles({'empty': {}}))
+
+    def test_malformed_profiles_file(self):
+        with self.assertRaises(ValueError):
+            read_filter_profiles(self.write_profiles('{"ui": '))
+
+
+if __name__ == '__main__':
+    unittest.main()